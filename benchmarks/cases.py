@@ -0,0 +1,102 @@
+# benchmarks/cases.py
+# What the suite times. Each case names the code it loads ("bundle": the strategy package in
+# market_ai_5pct_variant, "app": the root Streamlit app modules), the sizes it runs on and a
+# setup(df) returning the zero-argument callable to time. Cases that hit the forecast cache
+# use a new ticker name per call, so every timed call does the full work.
+import itertools
+import os
+import tempfile
+
+def _letters(i: int) -> str:
+    # Ticker-like name route_intent() can pick out of a message (A-Z only, 5 chars).
+    out = ""
+    for _ in range(5):
+        i, r = divmod(i, 26)
+        out = chr(65 + r) + out
+    return out
+
+def _features(df):
+    from modules.signal import build_features
+    return lambda: build_features(df)
+
+def _backtest(df):
+    from modules.strategy import RiskManagedStrategy
+    strat = RiskManagedStrategy()
+    return lambda: strat.backtest(df)
+
+def _app_env():
+    # Keep warm-start parameters out of the working tree and every fit cold.
+    os.environ.setdefault("PROPHET_PARAMS_DIR", tempfile.mkdtemp(prefix="bench_prophet_"))
+    os.environ.setdefault("PROPHET_WARM_START", "0")
+
+def _forecast(precision=None, latency_budget_ms=None):
+    def setup(df):
+        _app_env()
+        from data import yf_history
+        import tools
+        hist, seq = yf_history(df), itertools.count()
+        return lambda: tools.forecast(f"BENCH{next(seq)}", "7d", hist=hist, precision=precision,
+                                      latency_budget_ms=latency_budget_ms)
+    return setup
+
+def _chat(df):
+    _app_env()
+    from data import yf_history
+    import tools
+    from llm import respond
+    hist, seq = yf_history(df), itertools.count()
+    toolkit = {
+        "get_quote": tools.get_quote,
+        "forecast": lambda t, h="7d": tools.forecast(t, h, hist=hist, precision="analytic"),
+        "news_sentiment": tools.news_sentiment,
+        "screen_top_movers": tools.screen_top_movers,
+        "default_universe": tools.default_universe,
+    }
+    return lambda: respond(f"forecast {_letters(next(seq))}", toolkit)
+
+def _simulated(call):
+    # Polygon / Alpha Vantage / yfinance answered by the local simulation (see simulation/);
+    # the server thread is a daemon and goes away with the worker process.
+    def setup(df):
+        import simulation
+        from simulation.http_server import SimHTTPServer
+        _app_env()
+        os.environ.update(simulation.environ(SimHTTPServer(simulation.MarketSim(0)).start(), seed=0))
+        return call()
+    return setup
+
+def _news():
+    import tools
+    return lambda: tools.news_sentiment("AAPL")
+
+def _gainers():
+    from intent_hotfix_top_gainers.tools_additions import top_gainers_today
+    return lambda: top_gainers_today(10)
+
+def _av_payload(df, fmt):
+    # The bars as an Alpha Vantage TIME_SERIES_INTRADAY body (newest first), parsed each call.
+    from modules import av_parse
+    bars = df.rename(columns=str.lower)[["open", "high", "low", "close", "volume"]].iloc[::-1]
+    if fmt == "csv":
+        text = bars.rename_axis("timestamp").to_csv(date_format="%Y-%m-%d %H:%M:%S").encode()
+        return lambda: av_parse.parse_csv(text)
+    series = {f"{t:%Y-%m-%d %H:%M:%S}": {f"{i}. {k}": str(v) for i, (k, v) in enumerate(row.items(), 1)}
+              for t, row in zip(bars.index, bars.to_dict("records"))}
+    payload = {"Meta Data": {}, "Time Series (1min)": series}
+    return lambda: av_parse.parse_json(payload)
+
+ALL_SIZES = ("1y_daily", "90d_1min", "5y_1min")
+
+# name -> (code, sizes, setup)
+CASES = {
+    "signal.build_features": ("bundle", ALL_SIZES, _features),
+    "strategy.backtest": ("bundle", ALL_SIZES, _backtest),
+    "av_parse.parse_csv": ("bundle", ("90d_1min",), lambda df: _av_payload(df, "csv")),
+    "av_parse.parse_json": ("bundle", ("90d_1min",), lambda df: _av_payload(df, "json")),
+    "tools.forecast[analytic]": ("app", ("1y_daily",), _forecast(precision="analytic")),
+    "tools.forecast[full]": ("app", ("1y_daily",), _forecast(precision="full")),
+    "tools.forecast[fallback]": ("app", ("1y_daily",), _forecast(latency_budget_ms=0)),
+    "llm.respond[forecast]": ("app", ("1y_daily",), _chat),
+    "tools.news_sentiment[sim]": ("app", ("1y_daily",), _simulated(_news)),
+    "tools_additions.top_gainers_today[sim]": ("app", ("1y_daily",), _simulated(_gainers)),
+}
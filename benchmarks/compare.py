@@ -0,0 +1,92 @@
+# benchmarks/compare.py
+# Compare two benchmark result files and flag regressions:
+#   python benchmarks/compare.py                         # newest benchmarks/results/*.json vs baseline.json
+#   python benchmarks/compare.py BASELINE CURRENT --time-tol 0.2 --mem-tol 0.3
+#   python benchmarks/compare.py --allow-missing         # after run.py --cases ... (a subset)
+# Exits 1 when a case got slower than best_s * (1 + time_tol) or its peak memory grew past
+# peak_mb * (1 + mem_tol), and when a case that ran in the baseline errors or is missing now;
+# differences under MIN_DELTA_S / MIN_DELTA_MB are treated as noise.
+import argparse
+import glob
+import json
+import os
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BASELINE_PATH = os.path.join(HERE, "baseline.json")
+RESULTS_DIR = os.path.join(HERE, "results")
+TIME_TOL = float(os.getenv("BENCH_TIME_TOL", "0.15"))
+MEM_TOL = float(os.getenv("BENCH_MEM_TOL", "0.25"))
+MIN_DELTA_S = 0.002
+MIN_DELTA_MB = 1.0
+
+def _load(path: str) -> dict:
+    with open(path) as fh:
+        doc = json.load(fh)
+    return {(r["case"], r["size"]): r for r in doc["results"]}
+
+def compare(baseline: dict, current: dict, time_tol: float = TIME_TOL, mem_tol: float = MEM_TOL,
+            allow_missing: bool = False) -> list:
+    """One row per (case, size) in either file: timings, memory and a status of ok /
+    regression / improved / new / skipped. A case with timings in the baseline that now
+    errors, is skipped or is missing is a regression (missing is only reported as "missing"
+    with allow_missing, for runs of a subset of the cases)."""
+    rows = []
+    for key in list(baseline) + [k for k in current if k not in baseline]:
+        base, cur = baseline.get(key), current.get(key)
+        row = {"case": key[0], "size": key[1]}
+        if base is None:
+            row["status"] = "new"
+        elif cur is None and allow_missing:
+            row["status"] = "missing"
+        elif "best_s" in base and (cur is None or "best_s" not in cur):
+            row["status"] = "regression"
+            row["note"] = "missing" if cur is None else (cur.get("error") or cur.get("skipped"))
+        elif cur is None or "best_s" not in cur or "best_s" not in base:
+            row["status"] = "skipped"
+            row["note"] = (cur or {}).get("skipped") or (cur or {}).get("error") or base.get("skipped") or base.get("error")
+        else:
+            t0, t1, m0, m1 = base["best_s"], cur["best_s"], base["peak_mb"], cur["peak_mb"]
+            row.update(base_s=t0, cur_s=t1, time_ratio=t1 / t0 if t0 else float("inf"),
+                       base_mb=m0, cur_mb=m1)
+            slower = t1 > t0 * (1 + time_tol) and t1 - t0 > MIN_DELTA_S
+            bigger = m1 > m0 * (1 + mem_tol) and m1 - m0 > MIN_DELTA_MB
+            faster = t1 * (1 + time_tol) < t0 and t0 - t1 > MIN_DELTA_S
+            row["status"] = "regression" if slower or bigger else "improved" if faster else "ok"
+            if slower or bigger:
+                row["note"] = ", ".join(s for s, on in (("time", slower), ("memory", bigger)) if on)
+        rows.append(row)
+    return rows
+
+def _latest() -> str:
+    files = sorted(glob.glob(os.path.join(RESULTS_DIR, "*.json")))
+    if not files:
+        raise SystemExit(f"no results in {RESULTS_DIR}; run benchmarks/run.py first")
+    return files[-1]
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Flag benchmark regressions against a baseline.")
+    ap.add_argument("baseline", nargs="?", default=BASELINE_PATH)
+    ap.add_argument("current", nargs="?")
+    ap.add_argument("--time-tol", type=float, default=TIME_TOL)
+    ap.add_argument("--mem-tol", type=float, default=MEM_TOL)
+    ap.add_argument("--allow-missing", action="store_true",
+                    help="do not fail on baseline cases absent from the current run (--cases subsets)")
+    ap.add_argument("--json", action="store_true", help="print the comparison as JSON")
+    args = ap.parse_args(argv)
+    rows = compare(_load(args.baseline), _load(args.current or _latest()), args.time_tol, args.mem_tol,
+                   args.allow_missing)
+    if args.json:
+        print(json.dumps(rows, indent=2))
+    else:
+        for r in rows:
+            if "cur_s" in r:
+                print(f"{r['status']:10s} {r['case']:40s} {r['size']:9s} {r['base_s'] * 1e3:10.1f} -> "
+                      f"{r['cur_s'] * 1e3:10.1f} ms ({r['time_ratio']:.2f}x)  {r['base_mb']:8.1f} -> "
+                      f"{r['cur_mb']:8.1f} MB  {r.get('note', '')}")
+            else:
+                print(f"{r['status']:10s} {r['case']:40s} {r['size']:9s} {r.get('note', '')}")
+    return 1 if any(r["status"] == "regression" for r in rows) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
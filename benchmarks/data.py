@@ -0,0 +1,40 @@
+# benchmarks/data.py
+# Synthetic OHLCV histories for the benchmark suite; deterministic per (size, seed) so runs
+# on different commits time the same inputs.
+import numpy as np
+import pandas as pd
+
+MINUTES_PER_DAY = 390
+
+# name -> (bars, bar frequency)
+SIZES = {
+    "1y_daily": (252, "B"),
+    "90d_1min": (63 * MINUTES_PER_DAY, "min"),
+    "5y_1min": (5 * 252 * MINUTES_PER_DAY, "min"),
+}
+
+def synthetic_ohlcv(size: str, seed: int = 0) -> pd.DataFrame:
+    """Lowercase open/high/low/close/volume bars for one of SIZES (a geometric random walk;
+    minute bars are 09:30-16:00 sessions on business days)."""
+    n, freq = SIZES[size]
+    rng = np.random.default_rng(seed)
+    step = 0.015 if freq == "B" else 0.015 / np.sqrt(MINUTES_PER_DAY)
+    close = 100 * np.exp(np.cumsum(rng.normal(0.0002 if freq == "B" else 0.0, step, n)))
+    if freq == "B":
+        idx = pd.bdate_range("2024-01-02", periods=n)
+    else:
+        days = pd.bdate_range("2020-01-02", periods=-(-n // MINUTES_PER_DAY))
+        minutes = pd.to_timedelta(np.arange(MINUTES_PER_DAY), unit="min") + pd.Timedelta("09:30:00")
+        idx = pd.DatetimeIndex((days.values[:, None] + minutes.values[None, :]).reshape(-1)[:n])
+    wick = rng.uniform(0, step, (2, n))
+    return pd.DataFrame({"open": close * (1 + rng.normal(0, step / 4, n)),
+                         "high": close * (1 + wick[0]),
+                         "low": close * (1 - wick[1]),
+                         "close": close,
+                         "volume": rng.integers(100, 10000, n).astype(float)}, index=idx)
+
+def yf_history(df: pd.DataFrame) -> pd.DataFrame:
+    """The same bars shaped like tools._download_yf output (Date column, capitalised fields)."""
+    out = df.rename(columns=str.capitalize)
+    out.index.name = "Date"
+    return out.reset_index()
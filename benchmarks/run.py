@@ -0,0 +1,130 @@
+# benchmarks/run.py
+# Offline performance baseline for the strategy bundle and the app's forecast / chat path.
+# Run from the repo root:
+#   python benchmarks/run.py                          # every case and size -> benchmarks/results/<time>.json
+#   python benchmarks/run.py --sizes 1y_daily --repeat 3 --cases strategy.backtest
+#   python benchmarks/run.py --save-baseline          # also store it as benchmarks/baseline.json
+#   python benchmarks/compare.py                      # newest result vs the baseline
+# Each (case, size) runs in its own process: the bundle and the app both have a `modules`
+# package, and peak memory is then per case. Timings are the best / median of --repeat
+# calls after one warm-up call; peak_mb is the traced allocation peak (Python and NumPy) of
+# one more call, max_rss_mb the process high-water mark.
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+BUNDLE = os.path.join(ROOT, "market_ai_5pct_variant")
+RESULTS_DIR = os.path.join(HERE, "results")
+BASELINE_PATH = os.path.join(HERE, "baseline.json")
+REPEAT = int(os.getenv("BENCH_REPEAT", "5"))
+CASE_TIMEOUT = float(os.getenv("BENCH_CASE_TIMEOUT", "900"))
+
+def _worker(case: str, size: str, repeat: int) -> dict:
+    import tracemalloc
+    import numpy as np
+    from cases import CASES
+    from data import SIZES, synthetic_ohlcv
+    code, _, setup = CASES[case]
+    # Appended, not prepended: the repo root has a signal.py that would shadow the stdlib.
+    sys.path.append(BUNDLE if code == "bundle" else ROOT)
+    row = {"case": case, "size": size, "bars": SIZES[size][0]}
+    df = synthetic_ohlcv(size)
+    try:
+        fn = setup(df)
+    except ImportError as e:
+        return {**row, "skipped": f"{type(e).__name__}: {e}"}
+    fn()
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    row.update(repeat=repeat, best_s=min(times), median_s=float(np.median(times)), peak_mb=peak / 1e6)
+    try:
+        import resource
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        row["max_rss_mb"] = rss / (1e6 if sys.platform == "darwin" else 1e3)
+    except ImportError:
+        pass
+    return row
+
+def _run_case(case: str, size: str, repeat: int) -> dict:
+    cmd = [sys.executable, os.path.abspath(__file__), "--worker", case, size, str(repeat)]
+    try:
+        proc = subprocess.run(cmd, capture_output=True, text=True, timeout=CASE_TIMEOUT, cwd=ROOT)
+    except subprocess.TimeoutExpired:
+        return {"case": case, "size": size, "error": f"timed out after {CASE_TIMEOUT:.0f}s"}
+    lines = proc.stdout.strip().splitlines()
+    if proc.returncode != 0 or not lines:
+        tail = (proc.stderr or proc.stdout).strip().splitlines()[-1:] or ["no output"]
+        return {"case": case, "size": size, "error": tail[0]}
+    return json.loads(lines[-1])
+
+def _meta() -> dict:
+    import numpy as np
+    import pandas as pd
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=ROOT).stdout.strip()
+    except OSError:
+        commit = ""
+    return {"created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()), "commit": commit,
+            "python": platform.python_version(), "numpy": np.__version__, "pandas": pd.__version__,
+            "platform": platform.platform(), "cpus": os.cpu_count()}
+
+def run(cases=None, sizes=None, repeat: int = REPEAT) -> dict:
+    """Run the selected cases (default all) on their sizes; returns the results document."""
+    from cases import CASES
+    results = []
+    for case in cases or list(CASES):
+        if case not in CASES:
+            raise SystemExit(f"unknown case {case!r}; choose from {', '.join(CASES)}")
+        for size in CASES[case][1]:
+            if sizes and size not in sizes:
+                continue
+            row = _run_case(case, size, repeat)
+            results.append(row)
+            if "best_s" in row:
+                print(f"{case:40s} {size:9s} best {row['best_s'] * 1e3:10.1f} ms  "
+                      f"median {row['median_s'] * 1e3:10.1f} ms  peak {row['peak_mb']:8.1f} MB", flush=True)
+            else:
+                print(f"{case:40s} {size:9s} {row.get('skipped') or row.get('error')}", flush=True)
+    return {"meta": _meta(), "results": results}
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Run the offline benchmark suite.")
+    ap.add_argument("--cases", help="comma-separated case names (default: all)")
+    ap.add_argument("--sizes", help="comma-separated sizes (default: each case's sizes)")
+    ap.add_argument("--repeat", type=int, default=REPEAT)
+    ap.add_argument("--out", help="results file (default: benchmarks/results/<time>.json)")
+    ap.add_argument("--save-baseline", action="store_true", help=f"also copy the results to {BASELINE_PATH}")
+    ap.add_argument("--worker", nargs=3, metavar=("CASE", "SIZE", "REPEAT"), help=argparse.SUPPRESS)
+    args = ap.parse_args(argv)
+    if args.worker:
+        case, size, repeat = args.worker
+        print(json.dumps(_worker(case, size, int(repeat))))
+        return
+    doc = run(args.cases.split(",") if args.cases else None, args.sizes.split(",") if args.sizes else None,
+              args.repeat)
+    out = args.out or os.path.join(RESULTS_DIR, time.strftime("%Y%m%d-%H%M%S") + ".json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w") as fh:
+        json.dump(doc, fh, indent=2)
+    print(f"wrote {out}")
+    if args.save_baseline:
+        shutil.copyfile(out, BASELINE_PATH)
+        print(f"baseline -> {BASELINE_PATH}")
+
+if __name__ == "__main__":
+    main()
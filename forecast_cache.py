@@ -0,0 +1,156 @@
+
+import hashlib
+import os
+import pickle
+import shutil
+import threading
+import time
+from collections import OrderedDict
+
+CACHE_SIZE = int(os.getenv("FORECAST_CACHE_SIZE", "256"))
+CACHE_TTL = float(os.getenv("FORECAST_CACHE_TTL_SECONDS", str(6 * 3600)))
+CACHE_DIR = os.getenv("FORECAST_CACHE_DIR", "")
+
+class ForecastCache:
+    """LRU + TTL cache for forecast results keyed by (ticker, last bar, model params).
+
+    With `disk_dir` set, entries are also pickled to disk so they survive Streamlit reruns
+    and restarts. Storing a result for a newer bar drops everything cached for that ticker
+    on older bars.
+    """
+
+    def __init__(self, maxsize: int = CACHE_SIZE, ttl: float = CACHE_TTL, disk_dir: str = CACHE_DIR):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.disk_dir = disk_dir or None
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._latest = {}
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def make_key(ticker: str, last_bar, **params) -> tuple:
+        return (ticker.upper(), str(last_bar), tuple(sorted(params.items())))
+
+    @staticmethod
+    def _safe(name: str) -> str:
+        return "".join(ch if ch.isalnum() or ch in ".-_" else "_" for ch in name)
+
+    def _ticker_dir(self, ticker: str) -> str:
+        return os.path.join(self.disk_dir, self._safe(ticker))
+
+    def _disk_path(self, key) -> str:
+        digest = hashlib.sha1(repr(key).encode()).hexdigest()
+        return os.path.join(self._ticker_dir(key[0]), self._safe(key[1]), digest + ".pkl")
+
+    def _prune_disk(self, ticker: str, keep_bar: str):
+        # Entries written by earlier processes on older bars are dropped once a newer bar is stored.
+        if not self.disk_dir:
+            return
+        root = self._ticker_dir(ticker)
+        keep = self._safe(keep_bar)
+        try:
+            names = os.listdir(root)
+        except OSError:
+            return
+        for name in names:
+            if name != keep:
+                shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+
+    def _expired(self, stored_at: float) -> bool:
+        return self.ttl > 0 and (time.time() - stored_at) > self.ttl
+
+    def _load_disk(self, key):
+        if not self.disk_dir:
+            return None
+        p = self._disk_path(key)
+        try:
+            with open(p, "rb") as fh:
+                stored_at, stored_key, value = pickle.load(fh)
+        except Exception:
+            return None
+        if stored_key != key or self._expired(stored_at):
+            try:
+                os.remove(p)
+            except OSError:
+                pass
+            return None
+        return stored_at, value
+
+    def _save_disk(self, key, stored_at, value):
+        if not self.disk_dir:
+            return
+        p = self._disk_path(key)
+        try:
+            os.makedirs(os.path.dirname(p), exist_ok=True)
+            tmp = f"{p}.{os.getpid()}.tmp"
+            with open(tmp, "wb") as fh:
+                pickle.dump((stored_at, key, value), fh)
+            os.replace(tmp, p)
+        except Exception:
+            pass
+
+    def get(self, key):
+        with self._lock:
+            latest = self._latest.get(key[0])
+            entry = None
+            if latest is None or key[1] >= latest:
+                entry = self._data.get(key)
+                if entry is not None and self._expired(entry[0]):
+                    del self._data[key]
+                    entry = None
+                if entry is None:
+                    entry = self._load_disk(key)
+                    if entry is not None:
+                        self._data[key] = entry
+                        self._evict()
+            if entry is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, value):
+        ticker, last_bar = key[0], key[1]
+        with self._lock:
+            latest = self._latest.get(ticker)
+            if latest is not None and last_bar < latest:
+                return
+            if latest != last_bar:
+                for k in [k for k in self._data if k[0] == ticker and k[1] != last_bar]:
+                    del self._data[k]
+                self._prune_disk(ticker, last_bar)
+            self._latest[ticker] = last_bar
+            stored_at = time.time()
+            self._data[key] = (stored_at, value)
+            self._data.move_to_end(key)
+            self._evict()
+        self._save_disk(key, stored_at, value)
+
+    def _evict(self):
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def invalidate(self, ticker: str):
+        ticker = ticker.upper()
+        with self._lock:
+            for k in [k for k in self._data if k[0] == ticker]:
+                del self._data[k]
+            self._latest.pop(ticker, None)
+            if self.disk_dir:
+                shutil.rmtree(self._ticker_dir(ticker), ignore_errors=True)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._latest.clear()
+            if self.disk_dir:
+                shutil.rmtree(self.disk_dir, ignore_errors=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._data),
+                    "hit_rate": round(self.hits / total, 3) if total else 0.0}
@@ -0,0 +1,153 @@
+# http_client.py
+# Shared outbound HTTP for the app (Polygon, Alpha Vantage, the sidebar health checks).
+# One pooled keep-alive requests.Session per process instead of a new TCP/TLS handshake
+# per call, a cap on concurrent requests per host, default connect/read timeouts, and
+# retries with backoff on connection errors, 429 and 5xx (honouring Retry-After); hosts can
+# get their own limits via configure_host(). The asyncio API (aget, aget_json, gather_json)
+# runs the pooled calls on a thread pool, so fan-out needs no extra dependency; fetch_all()
+# is the blocking wrapper for Streamlit code.
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "20"))
+RETRIES = int(os.getenv("HTTP_RETRIES", "2"))
+BACKOFF = float(os.getenv("HTTP_BACKOFF", "0.3"))
+POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "16"))
+HOST_CONCURRENCY = int(os.getenv("HTTP_HOST_CONCURRENCY", "8"))
+RETRY_STATUS = (429, 500, 502, 503, 504)
+
+_lock = threading.Lock()
+_session = None
+_executor = None
+_hosts = {}   # host -> {"concurrency", "retries", "timeout"}
+_slots = {}   # host -> BoundedSemaphore
+
+def _retry(retries: int) -> Retry:
+    return Retry(total=retries, connect=retries, read=retries, status=retries, backoff_factor=BACKOFF,
+                 status_forcelist=RETRY_STATUS, allowed_methods=frozenset({"GET", "HEAD"}),
+                 respect_retry_after_header=True, raise_on_status=False)
+
+def _adapter(retries: int) -> HTTPAdapter:
+    return HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE, max_retries=_retry(retries))
+
+def _mount_host(s: requests.Session, host: str, retries: int):
+    for scheme in ("http", "https"):
+        s.mount(f"{scheme}://{host}/", _adapter(retries))
+
+def session() -> requests.Session:
+    """The process-wide pooled session."""
+    global _session
+    with _lock:
+        if _session is None:
+            s = requests.Session()
+            s.mount("http://", _adapter(RETRIES))
+            s.mount("https://", _adapter(RETRIES))
+            for host, policy in _hosts.items():
+                if policy.get("retries") is not None:
+                    _mount_host(s, host, policy["retries"])
+            _session = s
+        return _session
+
+def configure_host(host: str, concurrency: int = None, retries: int = None, timeout=None):
+    """Per-host policy: max concurrent requests, retry count and default timeout (seconds or
+    a (connect, read) tuple). Applies to requests started afterwards."""
+    with _lock:
+        policy = _hosts.setdefault(host.lower(), {})
+        if concurrency is not None:
+            policy["concurrency"] = concurrency
+            _slots.pop(host.lower(), None)
+        if timeout is not None:
+            policy["timeout"] = timeout
+        if retries is not None:
+            policy["retries"] = retries
+            if _session is not None:
+                _mount_host(_session, host.lower(), retries)
+
+def _slot(host: str) -> threading.BoundedSemaphore:
+    with _lock:
+        sem = _slots.get(host)
+        if sem is None:
+            limit = _hosts.get(host, {}).get("concurrency") or HOST_CONCURRENCY
+            sem = _slots[host] = threading.BoundedSemaphore(limit)
+        return sem
+
+def request(method: str, url: str, params=None, timeout=None, **kw) -> requests.Response:
+    """requests.request through the pooled session, within the host's concurrency limit.
+    Retried failures come back as the last response (or raise the connection error)."""
+    host = (urlsplit(url).hostname or "").lower()
+    if timeout is None:
+        timeout = _hosts.get(host, {}).get("timeout") or (CONNECT_TIMEOUT, READ_TIMEOUT)
+    s = session()
+    with _slot(host):
+        return s.request(method, url, params=params, timeout=timeout, **kw)
+
+def get(url: str, params=None, timeout=None, **kw) -> requests.Response:
+    return request("GET", url, params=params, timeout=timeout, **kw)
+
+def get_json(url: str, params=None, timeout=None, **kw):
+    r = get(url, params=params, timeout=timeout, **kw)
+    r.raise_for_status()
+    return r.json()
+
+def _pool() -> ThreadPoolExecutor:
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=POOL_SIZE, thread_name_prefix="http")
+        return _executor
+
+async def aget(url: str, params=None, timeout=None, **kw) -> requests.Response:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_pool(), lambda: get(url, params=params, timeout=timeout, **kw))
+
+async def aget_json(url: str, params=None, timeout=None, **kw):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_pool(), lambda: get_json(url, params=params, timeout=timeout, **kw))
+
+def _spec(call):
+    # "url" or (url, params) or {"url": ..., "params": ..., "timeout": ...}
+    if isinstance(call, str):
+        return {"url": call}
+    if isinstance(call, dict):
+        return call
+    url, params = call
+    return {"url": url, "params": params}
+
+async def gather_json(calls, return_exceptions: bool = True) -> list:
+    """JSON of every call, concurrently, in order; failures are returned as the exception
+    unless return_exceptions is False."""
+    return await asyncio.gather(*(aget_json(**_spec(c)) for c in calls), return_exceptions=return_exceptions)
+
+def run(coro):
+    """Run a coroutine to completion from sync code on a private event loop, so it works
+    from any thread (Streamlit runs scripts off the main thread); when this thread already
+    runs a loop, the coroutine goes to a worker thread instead."""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        loop = asyncio.new_event_loop()
+        try:
+            return loop.run_until_complete(coro)
+        finally:
+            loop.close()
+    with ThreadPoolExecutor(max_workers=1) as ex:
+        return ex.submit(run, coro).result()
+
+def fetch_all(calls, return_exceptions: bool = True) -> list:
+    """Blocking gather_json()."""
+    return run(gather_json(calls, return_exceptions=return_exceptions))
+
+def close():
+    """Drop pooled connections (e.g. before fork); the next request opens a new session."""
+    global _session
+    with _lock:
+        if _session is not None:
+            _session.close()
+            _session = None
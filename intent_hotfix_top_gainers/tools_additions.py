@@ -1,62 +1,203 @@
 
 # intent_hotfix_top_gainers/tools_additions.py
-import os, re, requests, pandas as pd
+import os, re, threading, time, pandas as pd
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from typing import List, Dict
+import http_client
+from ohlcv_store import panel_ticker
 
 POLY_KEY = os.getenv("POLYGON_API_KEY", "")
 AV_KEY = os.getenv("ALPHAVANTAGE_API_KEY", "")
+POLYGON_BASE_URL = os.getenv("POLYGON_BASE_URL", "https://api.polygon.io").rstrip("/")
+ALPHAVANTAGE_BASE_URL = os.getenv("ALPHAVANTAGE_BASE_URL", "https://www.alphavantage.co").rstrip("/")
+# "hedged": ask Alpha Vantage too once Polygon is slower than usual; "race": ask both at once;
+# "sequential": Alpha Vantage only after Polygon failed.
+GAINERS_MODE = os.getenv("GAINERS_MODE", "hedged")
+# Hedge delay: Polygon's recent p95 latency, clamped; HEDGE_DELAY_MS until HEDGE_MIN_SAMPLES.
+HEDGE_DELAY_MS = float(os.getenv("HEDGE_DELAY_MS", "1500"))
+HEDGE_MIN_MS = float(os.getenv("HEDGE_MIN_MS", "250"))
+HEDGE_MAX_MS = float(os.getenv("HEDGE_MAX_MS", "5000"))
+HEDGE_MIN_SAMPLES = 5
+LATENCY_SAMPLES = 200
 
-def top_gainers_today(limit: int = 10) -> pd.DataFrame:
+class _ProviderStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)   # seconds, successful calls
+        self.calls = self.failures = self.wins = 0
+
+    def record(self, seconds: float, ok: bool):
+        with self.lock:
+            self.calls += 1
+            if ok:
+                self.latencies.append(seconds)
+            else:
+                self.failures += 1
+
+    def win(self):
+        with self.lock:
+            self.wins += 1
+
+    def quantile(self, q: float):
+        with self.lock:
+            recent = sorted(self.latencies)
+        return recent[min(len(recent) - 1, int(q * len(recent)))] if recent else None
+
+    def snapshot(self) -> dict:
+        p50, p95 = self.quantile(0.5), self.quantile(0.95)
+        return {"calls": self.calls, "failures": self.failures, "wins": self.wins,
+                "p50_ms": p50 * 1e3 if p50 is not None else None,
+                "p95_ms": p95 * 1e3 if p95 is not None else None}
+
+_stats = {"polygon": _ProviderStats(), "alphavantage": _ProviderStats()}
+def _polygon_gainers(limit: int) -> List[Dict]:
+    url = f"{POLYGON_BASE_URL}/v2/snapshot/locale/us/markets/stocks/gainers"
+    r = http_client.get(url, params={"apiKey": POLY_KEY})
+    r.raise_for_status()
+    data = r.json()
     items = []
-    if POLY_KEY:
+    for it in (data.get("tickers") or [])[: max(1, limit)]:
+        last = it.get("lastTrade") or {}
+        price = last.get("p") if isinstance(last, dict) else None
+        items.append({
+            "symbol": it.get("ticker"),
+            "price": price,
+            "change_pct": it.get("todaysChangePerc"),
+            "source": "polygon"
+        })
+    return items
+
+def _alphavantage_gainers(limit: int) -> List[Dict]:
+    url = f"{ALPHAVANTAGE_BASE_URL}/query"
+    r = http_client.get(url, params={"function":"TOP_GAINERS_LOSERS","apikey":AV_KEY})
+    r.raise_for_status()
+    data = r.json()
+    items = []
+    tg = data.get("top_gainers", [])[: max(1, limit)]
+    for g in tg:
+        pct_txt = (g.get("change_percentage") or "").replace("%","").replace("+","")
         try:
-            url = "https://api.polygon.io/v2/snapshot/locale/us/markets/stocks/gainers"
-            r = requests.get(url, params={"apiKey": POLY_KEY}, timeout=20)
-            r.raise_for_status()
-            data = r.json()
-            for it in (data.get("tickers") or [])[: max(1, limit)]:
-                last = it.get("lastTrade") or {}
-                price = last.get("p") if isinstance(last, dict) else None
-                items.append({
-                    "symbol": it.get("ticker"),
-                    "price": price,
-                    "change_pct": it.get("todaysChangePerc"),
-                    "source": "polygon"
-                })
+            pct_val = float(pct_txt)
         except Exception:
-            items = []
-
-    if not items:
-        if not AV_KEY:
-            raise RuntimeError("No data source available: set POLYGON_API_KEY or ALPHAVANTAGE_API_KEY in Secrets.")
-        url = "https://www.alphavantage.co/query"
-        r = requests.get(url, params={"function":"TOP_GAINERS_LOSERS","apikey":AV_KEY}, timeout=20)
-        r.raise_for_status()
-        data = r.json()
-        tg = data.get("top_gainers", [])[: max(1, limit)]
-        for g in tg:
-            pct_txt = (g.get("change_percentage") or "").replace("%","").replace("+","")
+            pct_val = None
+        try:
+            price_val = float(g.get("price") or 0)
+        except Exception:
+            price_val = None
+        items.append({
+            "symbol": g.get("ticker"),
+            "price": price_val,
+            "change_pct": pct_val,
+            "source": "alphavantage"
+        })
+    return items
+
+def _timed(name: str, fn, limit: int) -> List[Dict]:
+    t0 = time.perf_counter()
+    try:
+        items = fn(limit)
+    except Exception:
+        _stats[name].record(time.perf_counter() - t0, False)
+        raise
+    _stats[name].record(time.perf_counter() - t0, True)
+    return items
+
+def hedge_delay() -> float:
+    """Seconds to wait for Polygon before also asking Alpha Vantage."""
+    st = _stats["polygon"]
+    p95 = st.quantile(0.95) if len(st.latencies) >= HEDGE_MIN_SAMPLES else None
+    ms = HEDGE_DELAY_MS if p95 is None else p95 * 1e3
+    return min(HEDGE_MAX_MS, max(HEDGE_MIN_MS, ms)) / 1e3
+
+def provider_latency_stats() -> dict:
+    """Per-provider calls, failures, races won and p50/p95 latency, plus the current hedge delay."""
+    out = {name: st.snapshot() for name, st in _stats.items()}
+    out["hedge_delay_ms"] = hedge_delay() * 1e3
+    return out
+
+def _first_valid(providers, limit: int, mode: str) -> List[Dict]:
+    # providers: [(name, fn)] in preference order. The first non-empty result wins; an empty
+    # answer moves on to the next provider like an error does, but if nobody had gainers the
+    # result is empty rather than an exception. Requests not yet sent are cancelled.
+    answered_empty, error = False, None
+    if mode == "sequential" or len(providers) == 1:
+        for name, fn in providers:
             try:
-                pct_val = float(pct_txt)
-            except Exception:
-                pct_val = None
+                items = _timed(name, fn, limit)
+            except Exception as e:
+                error = e
+                continue
+            if items:
+                _stats[name].win()
+                return items
+            answered_empty = True
+        if answered_empty:
+            return []
+        raise error
+    # A pool per call: requests that lost the race cannot be interrupted and run on until
+    # their timeout, so they must not hold workers the next call needs.
+    pool = ThreadPoolExecutor(max_workers=len(providers), thread_name_prefix="gainers")
+    try:
+        return _race(pool, providers, limit, mode)
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+def _race(pool, providers, limit: int, mode: str) -> List[Dict]:
+    pending, names, error, answered_empty = set(), {}, None, False
+    def launch(name, fn):
+        fut = pool.submit(_timed, name, fn, limit)
+        pending.add(fut)
+        names[fut] = name
+    queue = list(providers)
+    launch(*queue.pop(0))
+    if mode == "race":
+        while queue:
+            launch(*queue.pop(0))
+    deadline = None if mode == "race" else time.monotonic() + hedge_delay()
+    while pending or queue:
+        timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+        done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED) if pending else (set(), None)
+        for fut in done:
+            pending.discard(fut)
             try:
-                price_val = float(g.get("price") or 0)
-            except Exception:
-                price_val = None
-            items.append({
-                "symbol": g.get("ticker"),
-                "price": price_val,
-                "change_pct": pct_val,
-                "source": "alphavantage"
-            })
-    return pd.DataFrame(items)
-
-def rank_symbols_by_model(symbols: List[str], download_hist_fn, predictor_fn, horizon_days: int = 7) -> pd.DataFrame:
+                items = fut.result()
+            except Exception as e:
+                error = e
+                continue
+            if not items:
+                answered_empty = True
+                continue
+            _stats[names[fut]].win()
+            return items
+        if queue and (not pending or (deadline is not None and time.monotonic() >= deadline)):
+            # hedge: the current request is slow (or failed) -> ask the next provider too
+            launch(*queue.pop(0))
+            deadline = time.monotonic() + hedge_delay() if queue else None
+    if answered_empty:
+        return []
+    raise error
+
+def top_gainers_today(limit: int = 10, mode: str = None) -> pd.DataFrame:
+    """Today's top gainers from Polygon or Alpha Vantage; mode overrides GAINERS_MODE."""
+    providers = [(name, fn) for name, fn, key in (("polygon", _polygon_gainers, POLY_KEY),
+                                                  ("alphavantage", _alphavantage_gainers, AV_KEY)) if key]
+    if not providers:
+        raise RuntimeError("No data source available: set POLYGON_API_KEY or ALPHAVANTAGE_API_KEY in Secrets.")
+    return pd.DataFrame(_first_valid(providers, limit, mode or GAINERS_MODE))
+
+def rank_symbols_by_model(symbols: List[str], download_hist_fn, predictor_fn, horizon_days: int = 7, panel_fn=None) -> pd.DataFrame:
     rows = []
+    # panel_fn(symbols, days) -> dates x (field, ticker) frame, e.g. tools.download_panel
+    panel = None
+    if panel_fn is not None:
+        try:
+            panel = panel_fn(symbols, 365)
+        except Exception:
+            panel = None  # batch download failed: fall back to one download per symbol
     for sym in symbols:
         try:
-            hist = download_hist_fn(sym, 365)
+            hist = panel_ticker(panel, sym) if panel is not None else download_hist_fn(sym, 365)
             if hist is None or len(hist) == 0:
                 continue
             df = hist.set_index("Date") if "Date" in hist.columns else hist
@@ -78,11 +219,11 @@ def rank_symbols_by_model(symbols: List[str], download_hist_fn, predictor_fn, ho
         return out
     return out.sort_values(["expected_return_pct","prob_up"], ascending=[False, False]).reset_index(drop=True)
 
-def handle_top_gainer_query(download_hist_fn, predictor_fn, limit: int = 10, horizon_days: int = 7) -> str:
+def handle_top_gainer_query(download_hist_fn, predictor_fn, limit: int = 10, horizon_days: int = 7, panel_fn=None) -> str:
     gainers = top_gainers_today(limit=limit)
     if gainers is None or gainers.empty:
         return "I couldn't find gainers right now. Try again later."
-    ranked = rank_symbols_by_model(gainers["symbol"].tolist(), download_hist_fn, predictor_fn, horizon_days=horizon_days)
+    ranked = rank_symbols_by_model(gainers["symbol"].tolist(), download_hist_fn, predictor_fn, horizon_days=horizon_days, panel_fn=panel_fn)
     if ranked is None or ranked.empty:
         lines = [f"**{r.symbol}** {r.change_pct:+.2f}% (price {r.price})" for r in gainers.head(5).itertuples()]
         return "Top gainers (raw):\n\n" + "\n".join(["- "+x for x in lines])
@@ -1,23 +1,86 @@
-
 # modules/alphavantage_polling.py
-import time, requests
+import hashlib, json, os, threading, requests
+import pandas as pd
 from functools import lru_cache
+from . import av_parse
+from .rate_limit import Coalescer, RateLimiter
+try:  # the app's pooled client (http_client.py) when the repo root is importable
+    from http_client import get as _http_get
+except ImportError:
+    _http_get = requests.Session().get
+
+ALPHAVANTAGE_BASE_URL = os.getenv("ALPHAVANTAGE_BASE_URL", "https://www.alphavantage.co").rstrip("/")
+# Plan limits for the key; every AlphaVantage in every process on this machine shares them.
+AV_CALLS_PER_MINUTE = float(os.getenv("AV_CALLS_PER_MINUTE", "5"))
+AV_CALLS_PER_DAY = float(os.getenv("AV_CALLS_PER_DAY", "25"))
+AV_RETRIES = 2
+# Longest a call waits for the limiter by default: rides out a per-minute refill, but an empty
+# daily bucket raises RateLimitTimeout at once instead of blocking (e.g. a Streamlit run) for hours.
+AV_MAX_WAIT = float(os.getenv("AV_MAX_WAIT", "30"))
+RATE_NOTICE = "Thank you for using Alpha Vantage"
+
+class QuotaExhausted(RuntimeError):
+    pass
+
+_limiters = {}
+_coalescer = Coalescer()
+_guard = threading.Lock()
+
+def limiter_for(api_key: str) -> RateLimiter:
+    """The process-wide limiter for an API key (its state file is shared across processes)."""
+    name = "alphavantage-" + hashlib.sha1(api_key.encode()).hexdigest()[:12]
+    with _guard:
+        if name not in _limiters:
+            _limiters[name] = RateLimiter(name, AV_CALLS_PER_MINUTE or None, AV_CALLS_PER_DAY or None)
+        return _limiters[name]
 
 class AlphaVantage:
-    def __init__(self, api_key: str, timeout: int = 20):
+    def __init__(self, api_key: str, timeout: int = 20, limiter: RateLimiter = None, max_wait: float = AV_MAX_WAIT):
+        """max_wait: longest wait for the rate limiter before RateLimitTimeout (None = wait
+        however long it takes). Callers should catch RateLimitTimeout as quota exhausted."""
         self.api_key = api_key
         self.timeout = timeout
-        self.base = "https://www.alphavantage.co/query"
+        self.base = ALPHAVANTAGE_BASE_URL + "/query"
+        self.limiter = limiter or limiter_for(api_key)
+        self.max_wait = max_wait
+        self.http_calls = 0
+
+    def _fetch(self, params):
+        # datatype=csv bodies are parsed into a frame as they stream in; errors and
+        # rate-limit notes still come back as JSON.
+        csv = params.get("datatype") == "csv"
+        for attempt in range(AV_RETRIES + 1):
+            self.limiter.acquire(self.max_wait)
+            r = _http_get(self.base, params=params, timeout=self.timeout, stream=csv)
+            self.http_calls += 1
+            if csv and r.status_code == 200:
+                with r:
+                    body = av_parse.open_stream(r)
+                    if not av_parse.is_json(body.peek(64)):
+                        return av_parse.parse_csv(body)
+                    text = body.read().decode()
+            else:
+                text = r.text
+            if r.status_code == 200 and RATE_NOTICE in text and attempt < AV_RETRIES:
+                # Quota used up by someone else on this key: make every caller wait for refill.
+                self.limiter.exhaust()
+                continue
+            r.raise_for_status()
+            return json.loads(text)
 
     def _get(self, params):
+        """Rate-limited GET. Identical requests already in flight (from any thread) share
+        one HTTP call and the same result object, so treat it as read-only."""
         params = dict(params or {})
         params["apikey"] = self.api_key
-        r = requests.get(self.base, params=params, timeout=self.timeout)
-        if r.status_code == 200 and "Thank you for using Alpha Vantage" in r.text:
-            time.sleep(12)
-            r = requests.get(self.base, params=params, timeout=self.timeout)
-        r.raise_for_status()
-        return r.json()
+        key = (self.base, tuple(sorted(params.items())))
+        return _coalescer.call(key, lambda: self._fetch(params))
+
+    def stats(self) -> dict:
+        """Queue wait times at the limiter, coalesced requests, calls left in each bucket."""
+        return {"limiter": self.limiter.stats.snapshot(), "available": self.limiter.available(),
+                "coalesced": _coalescer.coalesced, "coalesce_wait": _coalescer.stats.snapshot(),
+                "http_calls": self.http_calls}
 
     @lru_cache(maxsize=1024)
     def global_quote(self, symbol: str):
@@ -25,3 +88,24 @@ class AlphaVantage:
 
     def intraday_1min(self, symbol: str):
         return self._get({"function":"TIME_SERIES_INTRADAY","symbol":symbol,"interval":"1min","outputsize":"compact"})
+
+    def time_series(self, function: str, symbol: str, **params) -> pd.DataFrame:
+        """Typed frame (see modules.av_parse) of a TIME_SERIES_* endpoint, fetched as CSV.
+        Raises QuotaExhausted on the rate-limit note and ValueError on an API error."""
+        data = self._get({"function": function, "symbol": symbol, **params, "datatype": "csv"})
+        if isinstance(data, pd.DataFrame):
+            return data
+        if "Note" in data or "Information" in data:
+            raise QuotaExhausted(data.get("Note") or data.get("Information"))
+        if "Error Message" in data:
+            raise ValueError(f"{function} {symbol}: {data['Error Message']}")
+        return av_parse.parse_json(data)  # endpoint without CSV support
+
+    def intraday_month(self, symbol: str, month: str, interval: str = "1min", extended_hours: bool = False):
+        """Every bar of one calendar month ("YYYY-MM") of the intraday history, as a frame."""
+        return self.time_series("TIME_SERIES_INTRADAY", symbol, interval=interval, month=month,
+                                outputsize="full", extended_hours="true" if extended_hours else "false")
+
+    def daily(self, symbol: str, outputsize: str = "compact", adjusted: bool = False):
+        return self.time_series("TIME_SERIES_DAILY_ADJUSTED" if adjusted else "TIME_SERIES_DAILY", symbol,
+                                outputsize=outputsize)
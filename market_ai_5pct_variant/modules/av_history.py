@@ -0,0 +1,156 @@
+# modules/av_history.py
+# Bulk intraday history from Alpha Vantage's month-sliced TIME_SERIES_INTRADAY. Each
+# (symbol, interval, month) is stored as its own file under HISTORY_DIR, written atomically,
+# so an interrupted run resumes where it stopped: a month saved after it ended is never
+# fetched again, one saved while it was still running (partial) is fetched again next time. Calls go through the
+# shared AlphaVantage rate limiter; when the quota runs out the run stops cleanly and the
+# next run picks up the remaining months.
+#   python -m modules.av_history AAPL MSFT --start 2023-01      (from market_ai_5pct_variant/)
+import argparse
+import os
+import threading
+import pandas as pd
+from .alphavantage_polling import AlphaVantage, QuotaExhausted
+from .av_parse import empty_frame
+from .rate_limit import RateLimitTimeout
+
+HISTORY_DIR = os.getenv("AV_HISTORY_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                                        ".av_history"))
+HISTORY_MONTHS = 24          # default start: this many months back
+QUOTA_WAIT = float(os.getenv("AV_HISTORY_MAX_WAIT", "120"))
+# A month file counts as complete once written this long after the month ended (covers the
+# last session's extended hours in US/Eastern whatever the local timezone).
+COMPLETE_AFTER = pd.Timedelta(days=1)
+# Alpha Vantage's error for a symbol it does not know; other errors only lose their month.
+UNKNOWN_SYMBOL = "Invalid API call"
+
+def _parquet_available() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except Exception:
+        return False
+
+EXT = ".parquet" if _parquet_available() else ".pkl"
+
+def months(start, end=None) -> list:
+    """"YYYY-MM" strings from start to end (default: this month), inclusive."""
+    end = pd.Timestamp.now() if end is None else pd.Timestamp(end)
+    return [str(p) for p in pd.period_range(pd.Timestamp(start).to_period("M"), end.to_period("M"), freq="M")]
+
+def month_path(symbol: str, month: str, interval: str = "1min", root: str = HISTORY_DIR) -> str:
+    safe = "".join(ch if ch.isalnum() or ch in ".-_" else "_" for ch in symbol.upper())
+    return os.path.join(root, safe, interval, month + EXT)
+
+def _write(df: pd.DataFrame, path: str):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    if EXT == ".parquet":
+        df.to_parquet(tmp)
+    else:
+        df.to_pickle(tmp)
+    os.replace(tmp, path)
+
+def is_complete(path: str, month: str) -> bool:
+    """Whether the file for `month` was written (its mtime is the fetch time) after the month
+    ended, i.e. holds the whole month rather than the part up to the day it was fetched."""
+    if not os.path.exists(path):
+        return False
+    ended = pd.Period(month, freq="M").end_time + COMPLETE_AFTER
+    return pd.Timestamp.fromtimestamp(os.path.getmtime(path)) >= ended
+
+def _read(path: str) -> pd.DataFrame:
+    return pd.read_parquet(path) if EXT == ".parquet" else pd.read_pickle(path)
+
+def fetch_month(av: AlphaVantage, symbol: str, month: str, interval: str = "1min") -> pd.DataFrame:
+    """One month of bars; raises QuotaExhausted on the provider's rate-limit message and
+    ValueError on an API error (e.g. unknown symbol)."""
+    return av.intraday_month(symbol, month, interval)
+
+def download_history(symbols, start=None, end=None, interval: str = "1min", api_key: str = None,
+                     av: AlphaVantage = None, root: str = HISTORY_DIR, refresh_current: bool = True,
+                     progress=print) -> dict:
+    """Fetch every month from start (default HISTORY_MONTHS back) to end for each symbol
+    into root, skipping months already complete on disk (see is_complete); a month still in
+    progress is fetched again unless refresh_current is False. Returns {symbol: {"fetched", "skipped",
+    "empty", "errors", "error"}}: "errors" maps each month that failed to its message (it is
+    asked for again next run), "error" is set when the symbol is unknown and was given up.
+    A run stopped by the quota has "stopped": reason on the last symbol it reached and can
+    simply be re-run."""
+    av = av or AlphaVantage(api_key or os.getenv("ALPHAVANTAGE_API_KEY", ""), max_wait=QUOTA_WAIT)
+    start = start or (pd.Timestamp.now() - pd.DateOffset(months=HISTORY_MONTHS - 1))
+    wanted = months(start, end)
+    current = months(pd.Timestamp.now())[0]
+    report = {}
+    for symbol in symbols:
+        row = report[symbol.upper()] = {"fetched": 0, "skipped": 0, "empty": 0, "errors": {}, "error": None}
+        for month in wanted:
+            path = month_path(symbol, month, interval, root)
+            if is_complete(path, month) or (os.path.exists(path) and month >= current and not refresh_current):
+                row["skipped"] += 1
+                continue
+            try:
+                df = fetch_month(av, symbol, month, interval)
+            except (QuotaExhausted, RateLimitTimeout) as e:
+                row["stopped"] = f"{type(e).__name__}: {e}"
+                if progress:
+                    progress(f"{symbol} {month}: quota exhausted, stopping (re-run to resume)")
+                return report
+            except ValueError as e:
+                if progress:
+                    progress(f"{symbol} {month}: {e}")
+                if UNKNOWN_SYMBOL in str(e):
+                    row["error"] = str(e)
+                    break
+                row["errors"][month] = str(e)
+                continue
+            # An empty month (before the listing, or a holiday-only slice) is stored too,
+            # so it is not asked for again.
+            _write(df, path)
+            row["fetched"] += 1
+            row["empty"] += df.empty
+            if progress:
+                progress(f"{symbol} {month}: {len(df)} bars")
+    return report
+
+def iter_history(symbol: str, start=None, end=None, interval: str = "1min", root: str = HISTORY_DIR):
+    """Cached months of a symbol in time order, one frame per month (e.g. as the source of
+    RiskManagedStrategy.backtest_chunked: lambda: iter_history("AAPL"))."""
+    folder = os.path.dirname(month_path(symbol, "x", interval, root))
+    have = sorted(f[:-len(EXT)] for f in os.listdir(folder) if f.endswith(EXT)) if os.path.isdir(folder) else []
+    lo = pd.Timestamp(start).strftime("%Y-%m") if start is not None else None
+    hi = pd.Timestamp(end).strftime("%Y-%m") if end is not None else None
+    for month in have:
+        if (lo and month < lo) or (hi and month > hi):
+            continue
+        df = _read(os.path.join(folder, month + EXT))
+        if not df.empty:
+            yield df
+
+def load_history(symbol: str, start=None, end=None, interval: str = "1min", root: str = HISTORY_DIR) -> pd.DataFrame:
+    """All cached bars of a symbol between start and end as one frame."""
+    parts = list(iter_history(symbol, start, end, interval, root))
+    if not parts:
+        return empty_frame()
+    df = pd.concat(parts)
+    df = df[~df.index.duplicated(keep="last")].sort_index()
+    if start is not None:
+        df = df[df.index >= pd.Timestamp(start)]
+    if end is not None:
+        df = df[df.index <= pd.Timestamp(end)]
+    return df
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Download month-sliced Alpha Vantage intraday history.")
+    ap.add_argument("symbols", nargs="+")
+    ap.add_argument("--start", help="first month, YYYY-MM (default: %d months back)" % HISTORY_MONTHS)
+    ap.add_argument("--end", help="last month, YYYY-MM (default: this month)")
+    ap.add_argument("--interval", default="1min")
+    ap.add_argument("--root", default=HISTORY_DIR)
+    args = ap.parse_args(argv)
+    report = download_history(args.symbols, args.start, args.end, args.interval, root=args.root)
+    for symbol, row in report.items():
+        print(symbol, row)
+
+if __name__ == "__main__":
+    main()
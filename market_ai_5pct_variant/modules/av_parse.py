@@ -0,0 +1,91 @@
+# modules/av_parse.py
+# Alpha Vantage TIME_SERIES_* responses -> typed frames (float64 prices, int64 volume or
+# float64 if a bar has none, DatetimeIndex "ts", oldest first). CSV bodies (datatype=csv)
+# go straight through the pandas C parser, also from a streaming HTTP body, so no per-bar
+# Python objects are built; JSON payloads are turned into one 2-D array and the
+# timestamps are parsed in a single vectorized call.
+import io
+import json
+import numpy as np
+import pandas as pd
+
+INT_COLUMNS = ("volume",)
+BASE_COLUMNS = ["open", "high", "low", "close", "volume"]
+
+def _name(field: str) -> str:
+    # "1. open" / "5. adjusted close" (JSON) and "adjusted_close" (CSV) -> "adjusted_close"
+    return field.split(". ", 1)[-1].strip().replace(" ", "_").lower()
+
+def empty_frame() -> pd.DataFrame:
+    df = pd.DataFrame({c: np.array([], dtype=np.int64 if c in INT_COLUMNS else np.float64) for c in BASE_COLUMNS})
+    df.index = pd.DatetimeIndex([], name="ts")
+    return df
+
+def _finish(df: pd.DataFrame, stamps) -> pd.DataFrame:
+    df.index = pd.DatetimeIndex(pd.to_datetime(stamps, format="ISO8601"), name="ts")
+    # Alpha Vantage lists newest first; reversing is cheaper than a sort.
+    if df.index.is_monotonic_decreasing:
+        return df.iloc[::-1]
+    return df if df.index.is_monotonic_increasing else df.sort_index()
+
+def parse_csv(src) -> pd.DataFrame:
+    """Frame from a datatype=csv body: str, bytes or a readable binary/text file object
+    (e.g. a streaming HTTP body, see open_stream)."""
+    if isinstance(src, (bytes, bytearray)):
+        src = io.BytesIO(src)
+    elif isinstance(src, str):
+        src = io.StringIO(src)
+    try:
+        df = pd.read_csv(src, engine="c")
+    except pd.errors.EmptyDataError:
+        return empty_frame()
+    df.columns = [_name(c) for c in df.columns]
+    stamp_col = "timestamp" if "timestamp" in df.columns else df.columns[0]
+    stamps = df.pop(stamp_col).to_numpy()
+    if df.empty:
+        return empty_frame()
+    # Volume is int64 unless a row leaves it empty (NaN), as in parse_json.
+    ints = [c for c in df.columns if c in INT_COLUMNS and not df[c].isna().any()]
+    floats = [c for c in df.columns if c not in ints and df[c].dtype != np.float64]
+    if ints:
+        df[ints] = df[ints].astype(np.int64)
+    if floats:
+        df[floats] = df[floats].astype(np.float64)
+    return _finish(df, stamps)
+
+def parse_json(data: dict) -> pd.DataFrame:
+    """Frame from a JSON TIME_SERIES_* payload (empty if it carries no series, e.g. an
+    error message or a rate-limit note)."""
+    key = next((k for k in data if k.startswith("Time Series")), None)
+    ts = data.get(key) if key else None
+    if not ts:
+        return empty_frame()
+    fields = list(next(iter(ts.values())))
+    # One float64 array straight from the nested string values; volumes are exact in float64.
+    try:
+        values = np.array([list(v.values()) for v in ts.values()], dtype=np.float64)
+    except ValueError:  # ragged rows: fall back to lookups by field name
+        values = np.array([[v.get(f, np.nan) for f in fields] for v in ts.values()], dtype=np.float64)
+    names = [_name(f) for f in fields]
+    df = pd.DataFrame(values, columns=names)
+    for c in INT_COLUMNS:
+        if c in df.columns and not np.isnan(values[:, names.index(c)]).any():
+            df[c] = df[c].astype(np.int64)
+    return _finish(df, list(ts))
+
+def is_json(head: bytes) -> bool:
+    return head.lstrip()[:1] == b"{"
+
+def parse(payload) -> pd.DataFrame:
+    """Frame from any Alpha Vantage time-series body: a decoded JSON dict, or CSV/JSON text."""
+    if isinstance(payload, dict):
+        return parse_json(payload)
+    raw = payload.encode() if isinstance(payload, str) else payload
+    return parse_json(json.loads(raw)) if is_json(raw[:64]) else parse_csv(raw)
+
+def open_stream(response) -> io.BufferedReader:
+    """Buffered, decompressing reader over a requests response opened with stream=True;
+    peek() it to tell CSV from a JSON error body before parsing."""
+    response.raw.decode_content = True
+    response.raw.auto_close = False  # the parser still checks the handle after EOF; close the response yourself
+    return io.BufferedReader(response.raw, buffer_size=1 << 16)
@@ -0,0 +1,110 @@
+# modules/bootstrap.py
+# Resampled distributions of backtest results. backtest's summary describes the single
+# historical path; here the per-bar pnl is resampled into many paths, either by circular
+# block bootstrap (keeps volatility clustering / autocorrelation up to the block length)
+# or parametrically (normal or Student-t with the pnl's moments), and each path is scored.
+# Paths are (paths, bars) arrays built a chunk at a time, so memory is bounded by
+# BOOTSTRAP_BLOCK_MB whatever the number of paths.
+import os
+import numpy as np
+import pandas as pd
+
+BOOTSTRAP_PATHS = 10000
+BOOTSTRAP_BLOCK_MB = float(os.getenv("BOOTSTRAP_BLOCK_MB", "128"))
+BARS_PER_WEEK = 5   # daily bars; bootstrap_summary measures it from the backtest's index
+
+def block_bootstrap(pnl: np.ndarray, n_paths: int, horizon: int, block_len: int, rng) -> np.ndarray:
+    """(n_paths, horizon) paths of circular block bootstrap draws from pnl."""
+    n = len(pnl)
+    blocks = -(-horizon // block_len)
+    starts = rng.integers(0, n, size=(n_paths, blocks, 1))
+    idx = (starts + np.arange(block_len)) % n
+    return pnl[idx.reshape(n_paths, -1)[:, :horizon]]
+
+def parametric(pnl: np.ndarray, n_paths: int, horizon: int, rng, dist: str = "t") -> np.ndarray:
+    """(n_paths, horizon) iid draws with pnl's mean and std; dist "t" matches its excess
+    kurtosis with a Student-t (falls back to normal when the tails are not fat)."""
+    mean, std = pnl.mean(), pnl.std(ddof=1)
+    if dist == "normal":
+        return rng.normal(mean, std, size=(n_paths, horizon))
+    if dist != "t":
+        raise ValueError(f"unknown dist {dist!r}")
+    kurt = pd.Series(pnl).kurt()
+    if not kurt > 0:
+        return rng.normal(mean, std, size=(n_paths, horizon))
+    df = 4 + 6 / kurt
+    return mean + std * np.sqrt((df - 2) / df) * rng.standard_t(df, size=(n_paths, horizon))
+
+def bars_per_week(index) -> float:
+    """Average bars per calendar week (W-FRI, as backtest's weekly stats) of a DatetimeIndex;
+    BARS_PER_WEEK for anything else."""
+    if not isinstance(index, pd.DatetimeIndex) or len(index) == 0:
+        return BARS_PER_WEEK
+    return len(index) / index.to_period("W-FRI").nunique()
+
+def path_metrics(paths: np.ndarray, bars_per_week: float = BARS_PER_WEEK) -> pd.DataFrame:
+    """backtest-style metrics for each row of a (paths, bars) pnl array, plus max drawdown.
+    weekly_mean is the geometric mean return per bars_per_week bars."""
+    n = paths.shape[1]
+    equity = np.cumprod(1 + paths, axis=1)
+    peak = np.maximum(np.maximum.accumulate(equity, axis=1), 1.0)
+    mean = paths.mean(axis=1)
+    std = paths.std(axis=1, ddof=1) if n > 1 else np.full(len(paths), np.nan)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sharpe = np.where(std > 0, np.sqrt(252) * (mean / (std + 1e-12)), 0.0)
+        weekly = np.where(equity[:, -1] > 0, equity[:, -1] ** (bars_per_week / n), 0.0) - 1
+    return pd.DataFrame({
+        "final_equity": equity[:, -1],
+        "weekly_mean": weekly,
+        "sharpe_daily": sharpe,
+        "hit_rate": (paths > 0).mean(axis=1),
+        "max_drawdown": (1 - equity / peak).max(axis=1),
+    })
+
+def bootstrap(pnl, n_paths: int = BOOTSTRAP_PATHS, method: str = "block", block_len: int = None,
+              horizon: int = None, dist: str = "t", seed: int = 0, chunk_paths: int = None,
+              quantiles=(0.05, 0.5, 0.95), weekly_target: float = 0.05,
+              bars_per_week: float = BARS_PER_WEEK):
+    """Resample a backtest pnl series (backtest's df["pnl"]). method is "block" or
+    "parametric"; block_len defaults to n ** (1/3), horizon (bars per path) to n. Returns
+    (bands, paths): bands has one row per metric with the mean and the requested
+    quantiles, paths the per-path metrics. bands.attrs["p_weekly_target"] is the share of
+    paths whose weekly_mean reaches weekly_target; bars_per_week sets the week for
+    weekly_mean (5 for daily bars, ~1950 for regular-session minute bars). Results for a given seed also depend on
+    chunk_paths (the default is derived from BOOTSTRAP_BLOCK_MB)."""
+    pnl = np.asarray(pnl, dtype=float)
+    pnl = pnl[np.isfinite(pnl)]
+    if len(pnl) < 2:
+        raise ValueError("need at least two pnl values to resample")
+    horizon = horizon or len(pnl)
+    block_len = max(1, min(block_len or round(len(pnl) ** (1 / 3)), len(pnl)))
+    if chunk_paths is None:
+        # About four (paths x horizon) float64 arrays are alive at once in path_metrics().
+        chunk_paths = max(1, int(BOOTSTRAP_BLOCK_MB * 1e6 / (32 * horizon)))
+    sizes = [min(chunk_paths, n_paths - i) for i in range(0, n_paths, chunk_paths)]
+    parts = []
+    for size, child in zip(sizes, np.random.SeedSequence(seed).spawn(len(sizes))):
+        rng = np.random.default_rng(child)
+        if method == "block":
+            paths = block_bootstrap(pnl, size, horizon, block_len, rng)
+        elif method == "parametric":
+            paths = parametric(pnl, size, horizon, rng, dist)
+        else:
+            raise ValueError(f"unknown method {method!r}")
+        parts.append(path_metrics(paths, bars_per_week))
+    metrics = pd.concat(parts, ignore_index=True)
+    bands = metrics.quantile(list(quantiles)).T
+    bands.columns = [f"p{round(q * 100):02d}" for q in quantiles]
+    bands.insert(0, "mean", metrics.mean())
+    bands.attrs["p_weekly_target"] = float((metrics["weekly_mean"] >= weekly_target).mean())
+    return bands, metrics
+
+def bootstrap_summary(bt_df: pd.DataFrame, **kwargs) -> dict:
+    """Bands of bootstrap(bt_df["pnl"], **kwargs) as a dict for a backtest summary:
+    {metric: {"mean": ..., "p05": ..., ...}, "p_weekly_target": ...}. The week is measured
+    from bt_df's DatetimeIndex unless bars_per_week is given."""
+    kwargs.setdefault("bars_per_week", bars_per_week(bt_df.index))
+    bands, _ = bootstrap(bt_df["pnl"], **kwargs)
+    out = {m: {k: float(v) for k, v in row.items()} for m, row in bands.iterrows()}
+    out["p_weekly_target"] = bands.attrs["p_weekly_target"]
+    return out
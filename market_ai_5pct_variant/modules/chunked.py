@@ -0,0 +1,239 @@
+# modules/chunked.py
+# Out-of-core RiskManagedStrategy.backtest for histories that do not fit in memory. Bars
+# are read from disk in chunks; each chunk carries forward what the next one needs:
+#   - indicators: the last TAIL_BARS raw bars plus the MACD EMA values, so feature_kernel
+#     on tail + chunk reproduces build_features bit for bit (chunks and tail start on
+#     feature_kernel block boundaries);
+#   - the position and equity of the last bar, for pnl / cumprod across the boundary.
+# confidence_score ranks bb_width over the whole history, so there are two passes: the
+# first spills sorted bb_width runs to disk, the second ranks each chunk against them.
+# Per-bar pnl goes to a memory-mapped file for the final mean/std, and per-bar results
+# optionally to out_path. Peak memory is set by chunk_bars, not by the history length.
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+from .feature_kernel import FEATURES, LOCAL_BLOCK, feature_kernel
+from .signal import confidence_score
+
+CHUNK_BARS = int(os.getenv("BACKTEST_CHUNK_BARS", str(64 * LOCAL_BLOCK)))
+TAIL_BARS = 2 * LOCAL_BLOCK   # covers the longest feature dependency (rolling 100 of rolling 20)
+TMP_DIR = os.getenv("BACKTEST_TMP_DIR") or None
+MERGE_PIECE = 1 << 20
+READ_BUFFER = 1 << 22
+
+def iter_source(source, rows: int = CHUNK_BARS):
+    """DataFrames, in time order, from a .parquet / .csv path (read `rows` at a time), an
+    in-memory DataFrame, or a zero-argument callable returning an iterator of frames."""
+    if isinstance(source, pd.DataFrame):
+        data = source.sort_index()
+        for i in range(0, len(data), rows):
+            yield data.iloc[i:i + rows]
+    elif callable(source):
+        yield from source()
+    elif str(source).endswith(".parquet"):
+        import pyarrow.parquet as pq
+        # Without pre-buffering, pyarrow reads column chunks through a bounded buffer
+        # instead of holding whole row groups.
+        parquet = pq.ParquetFile(source, pre_buffer=False, buffer_size=READ_BUFFER)
+        for batch in parquet.iter_batches(batch_size=rows):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(source, index_col=0, parse_dates=True, chunksize=rows)
+
+def _aligned(source, chunk: int):
+    # Re-cut the source frames into exactly `chunk` rows (the last one shorter).
+    buf, have, last = [], 0, None
+    for frame in iter_source(source, chunk):
+        if frame.empty:
+            continue
+        if not frame.index.is_monotonic_increasing or (last is not None and frame.index[0] < last):
+            raise ValueError("backtest_chunked needs bars in time order")
+        last = frame.index[-1]
+        buf.append(frame)
+        have += len(frame)
+        while have >= chunk:
+            data = pd.concat(buf) if len(buf) > 1 else buf[0]
+            yield data.iloc[:chunk]
+            buf, have = [data.iloc[chunk:]], have - chunk
+    if have:
+        yield pd.concat(buf) if len(buf) > 1 else buf[0]
+
+def _feature_chunks(source, price_col: str, chunk: int):
+    """(bars, feature frame, valid mask) per chunk; the rows where valid is True are the
+    rows build_features keeps after dropna."""
+    tail, ema_init = None, None
+    for data in _aligned(source, chunk):
+        x = data if tail is None else pd.concat([tail, data])
+        c = x[price_col].to_numpy(dtype=float)
+        h = x["high"].to_numpy(dtype=float) if "high" in x.columns else c
+        l = x["low"].to_numpy(dtype=float) if "low" in x.columns else c
+        ema = {}
+        feats = feature_kernel(c, h, l, ema_init=ema_init, ema_state=ema)[:, len(x) - len(data):]
+        if len(data) == chunk:
+            # EMA values just before the next chunk's tail, which starts TAIL_BARS bars back.
+            k = len(x) - TAIL_BARS - 1
+            ema_init = (ema["fast"][k], ema["slow"][k], ema["signal"][k])
+            tail = x.iloc[-TAIL_BARS:]
+        valid = ~np.isnan(feats).any(axis=0) & data.notna().all(axis=1).to_numpy()
+        yield data, pd.DataFrame(dict(zip(FEATURES, feats)), index=data.index), valid
+
+def _merge_sorted(a, b, out, piece: int = MERGE_PIECE):
+    # Merge two sorted (memory-mapped) arrays into out, holding at most ~2 * piece values.
+    i = j = o = 0
+    while i < len(a) or j < len(b):
+        a_end = min(i + piece, len(a))
+        b_end = len(b) if a_end == len(a) else int(np.searchsorted(b, a[a_end - 1], "right"))
+        if b_end - j > piece:
+            b_end = j + piece
+            a_end = min(a_end, int(np.searchsorted(a, b[b_end - 1], "right")))
+        part = np.sort(np.concatenate([a[i:a_end], b[j:b_end]]), kind="mergesort")
+        out[o:o + len(part)] = part
+        i, j, o = a_end, b_end, o + len(part)
+
+class _SortedRuns:
+    """bb_width values spilled to disk as sorted runs. Runs of similar size are merged as
+    they arrive, so there are O(log n) of them to search."""
+
+    def __init__(self, root: str):
+        self.root = root
+        self.runs = []
+        self._seq = 0
+
+    def _path(self):
+        self._seq += 1
+        return os.path.join(self.root, f"run{self._seq}.npy")
+
+    def add(self, values: np.ndarray):
+        if not len(values):
+            return
+        p = self._path()
+        np.save(p, np.sort(values))
+        self.runs.append(np.load(p, mmap_mode="r"))
+        while len(self.runs) > 1 and len(self.runs[-2]) <= 2 * len(self.runs[-1]):
+            b, a = self.runs.pop(), self.runs.pop()
+            p = self._path()
+            out = np.lib.format.open_memmap(p, mode="w+", dtype=float, shape=(len(a) + len(b),))
+            _merge_sorted(a, b, out)
+            out.flush()
+            for old in (a, b):
+                name = old.filename
+                del old
+                os.remove(name)
+            self.runs.append(np.load(p, mmap_mode="r"))
+
+    def __len__(self):
+        return sum(len(r) for r in self.runs)
+
+    def pct_rank(self, values: np.ndarray) -> np.ndarray:
+        """Series.rank(pct=True) (average ties) of values within everything added."""
+        less = np.zeros(len(values))
+        equal = np.zeros(len(values))
+        for run in self.runs:
+            lo = np.searchsorted(run, values, "left")
+            less += lo
+            equal += np.searchsorted(run, values, "right") - lo
+        return (less + (equal + 1) / 2) / len(self)
+
+def _pairwise_sum(values, fn=None, leaf: int = 1 << 16):
+    # Sum of fn(values) over a memory-mapped array, a leaf at a time. Splits where numpy's
+    # pairwise summation does, so the result has the same bits as Series.sum() in memory.
+    n = len(values)
+    if n <= leaf:
+        part = np.asarray(values[:])
+        return np.add.reduce(part if fn is None else fn(part))
+    half = n // 2
+    half -= half % 8
+    return _pairwise_sum(values[:half], fn, leaf) + _pairwise_sum(values[half:], fn, leaf)
+
+def backtest_chunked(strategy, source, price_col: str = "close", out_path: str = None, chunk_bars: int = None) -> dict:
+    """strategy.backtest(...)'s summary for a history read chunk by chunk from source (see
+    iter_source). Per-bar rows, the same columns as backtest's DataFrame, are appended to
+    out_path (.parquet, else CSV) when given. chunk_bars is rounded up to a whole number
+    of feature_kernel blocks."""
+    chunk = chunk_bars or CHUNK_BARS
+    chunk = max(TAIL_BARS, -(-chunk // LOCAL_BLOCK) * LOCAL_BLOCK)
+    with tempfile.TemporaryDirectory(dir=TMP_DIR) as tmp:
+        widths = _SortedRuns(tmp)
+        for _, feat, valid in _feature_chunks(source, price_col, chunk):
+            widths.add(feat["bb_width"].to_numpy()[valid])
+        n = len(widths)
+        if n == 0:
+            raise ValueError("no bars left after the indicator warm-up")
+        pnl_all = np.lib.format.open_memmap(os.path.join(tmp, "pnl.npy"), mode="w+", dtype=float, shape=(n,))
+        writer, wrote = _RowWriter(out_path) if out_path else None, 0
+        prev_close, prev_size, equity_last = np.nan, 0.0, None
+        weekly, hits = {}, 0
+        for data, feat, valid in _feature_chunks(source, price_col, chunk):
+            if not valid.any():
+                continue
+            data, feat = data[valid], feat[valid]
+            c = data[price_col].astype(float)
+            f = pd.concat([data, feat], axis=1)
+            rank = pd.Series(widths.pct_rank(feat["bb_width"].to_numpy()), index=f.index)
+            positions = strategy.generate_positions(c, f, conf=confidence_score(f, width_rank=rank))
+
+            df = positions.join(pd.DataFrame({"open": data.get("open", data[price_col]),
+                                              "high": data.get("high", data[price_col]),
+                                              "low": data.get("low", data[price_col])}), how="inner")
+            close = df["close"].to_numpy(dtype=float)
+            prev = np.concatenate([[prev_close], close[:-1]])
+            ret = close / prev - 1
+            df["ret_bar"] = np.where(np.isnan(ret), 0.0, ret)
+            realized = strategy.realized_returns(close, df["high"].to_numpy(), df["low"].to_numpy(), prev_close=prev)
+            size = df["size"].to_numpy(dtype=float)
+            pnl = np.concatenate([[prev_size], size[:-1]]) * realized
+            df["pnl"] = pnl
+            grow = 1 + pnl
+            df["equity"] = grow.cumprod() if equity_last is None else np.cumprod(np.concatenate([[equity_last], grow]))[1:]
+
+            pnl_all[wrote:wrote + len(df)] = pnl
+            wrote += len(df)
+            hits += int((pnl > 0).sum())
+            weekly.update(df["equity"].resample("W-FRI").last().dropna().to_dict())
+            prev_close, prev_size, equity_last = close[-1], size[-1], float(df["equity"].iloc[-1])
+            if writer is not None:
+                writer.write(df)
+        if writer is not None:
+            writer.close()
+
+        wk_last = pd.Series(weekly).sort_index()
+        wk = wk_last.reindex(pd.date_range(wk_last.index[0], wk_last.index[-1], freq="W-FRI")).pct_change().dropna()
+        mean = _pairwise_sum(pnl_all) / n
+        std = np.sqrt(_pairwise_sum(pnl_all, lambda v: (v - mean) ** 2) / (n - 1)) if n > 1 else np.nan
+        summary = {
+            "bars": int(n),
+            "final_equity": float(equity_last),
+            "weekly_mean": float(wk.mean() if len(wk)>0 else 0.0),
+            "weekly_median": float(wk.median() if len(wk)>0 else 0.0),
+            "weekly_p05": float(wk.quantile(0.05) if len(wk)>0 else 0.0),
+            "weekly_p95": float(wk.quantile(0.95) if len(wk)>0 else 0.0),
+            "sharpe_daily": float((np.sqrt(252) * (mean / (std + 1e-12))) if std>0 else 0.0),
+            "hit_rate": float(hits / n),
+        }
+        del pnl_all
+    return summary
+
+class _RowWriter:
+    # Appends per-bar frames to one .parquet (pyarrow) or CSV file.
+
+    def __init__(self, path: str):
+        self.path = path
+        self._parquet = None
+        self._started = False
+
+    def write(self, df: pd.DataFrame):
+        if self.path.endswith(".parquet"):
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pandas(df)
+            if self._parquet is None:
+                self._parquet = pq.ParquetWriter(self.path, table.schema)
+            self._parquet.write_table(table)
+        else:
+            df.to_csv(self.path, mode="a" if self._started else "w", header=not self._started)
+        self._started = True
+
+    def close(self):
+        if self._parquet is not None:
+            self._parquet.close()
@@ -0,0 +1,240 @@
+# modules/feature_kernel.py
+# Array-in/array-out version of build_features. Inputs are (n,) or (n, k) arrays (k tickers
+# sharing a date axis); the result is one (F, n[, k]) block with F = len(FEATURES).
+# Rolling means and stds come from blocked cumulative passes, EMAs run as blocked matrix products, and
+# `out` lets callers reuse a preallocated buffer. dtype=np.float32 halves the output size
+# (accumulations stay in float64).
+import numpy as np
+from numpy.lib.stride_tricks import as_strided
+
+FEATURES = ["ret1", "ret5", "ret20", "rsi14", "macd", "macd_sig", "macd_hist", "bbp", "bb_width",
+            "atr14", "vol10", "vol20", "z_mom5", "z_bbp"]
+
+EWM_BLOCK = 128
+EWM_GROUP = 8      # EWM_BLOCK * EWM_GROUP must divide LOCAL_BLOCK
+LOCAL_BLOCK = 1024
+
+def rolling_moments(x, windows, with_std=True, block=LOCAL_BLOCK):
+    """rolling(n).mean() and .std() (ddof=1) for each n in windows; a window containing NaN
+    gives NaN, as in pandas. Window ends are grouped into blocks of `block` rows counted from
+    x[0]; each block re-centers its own slice of data and takes one cumulative pass over sum
+    and sum of squares shared by all windows. That keeps the sum-of-squares cancellation
+    small even on price levels, and makes every value depend only on its block's slice, so a
+    run over a suffix of the series starting on a block boundary reproduces the same bits
+    (what the chunked backtest relies on). Returns [(mean, std or None), ...]."""
+    x2 = x.reshape(x.shape[0], -1).astype(float)
+    m, k = x2.shape
+    nmax = max(windows)
+    nb = -(-m // block) if m else 0
+    width = block + nmax - 1
+    valid = np.isfinite(x2)
+    first = valid.argmax(axis=0) if m else np.zeros(k, dtype=int)
+    f0 = int(first[0]) if k else 0
+    # Usual case: NaNs only in the warm-up rows, so validity is positional.
+    warmup_only = bool(m) and np.all(first == f0) and valid[f0:].all()
+    padded = np.zeros((nmax - 1 + nb * block, k))
+    padded[nmax - 1:nmax - 1 + m] = np.where(valid, x2, 0.0) if not valid.all() else x2
+    # Block b reads padded rows [b * block, b * block + width): overlapping strided views.
+    xb = as_strided(padded, shape=(nb, width, k), strides=(block * padded.strides[0],) + padded.strides)
+    if warmup_only:
+        start = np.arange(nb) * block - (nmax - 1)
+        count = np.clip(np.minimum(m, start + width) - np.maximum(f0, start), 1, None)
+        center = xb.sum(axis=1, keepdims=True) / count[:, None, None]
+        z = xb - center
+        for b in np.flatnonzero((start < f0) | (start + width > m)):
+            pos = start[b] + np.arange(width)
+            z[b, (pos < f0) | (pos >= m)] = 0.0
+    else:
+        have = np.zeros(padded.shape, dtype=bool)
+        have[nmax - 1:nmax - 1 + m] = valid
+        vb = as_strided(have, shape=(nb, width, k), strides=(block * have.strides[0],) + have.strides)
+        center = xb.sum(axis=1, keepdims=True) / np.maximum(vb.sum(axis=1, keepdims=True), 1)
+        z = np.where(vb, xb - center, 0.0)
+
+    def cumulative(a):
+        out = np.zeros((nb, width + 1, k))
+        np.cumsum(a, axis=1, out=out[:, 1:])
+        return out
+
+    cs = cumulative(z)
+    cq = cumulative(np.square(z, out=z)) if with_std else None
+    cnt = None if warmup_only else cumulative(vb)
+    results = []
+    for n in windows:
+        lo, hi = slice(nmax - n, nmax - n + block), slice(nmax, nmax + block)
+        s = cs[:, hi] - cs[:, lo]
+        mean = s / n
+        mean += center
+        std = None
+        if with_std:
+            var = cq[:, hi] - cq[:, lo]
+            s *= s
+            s /= n
+            var -= s
+            var /= (n - 1)
+            np.maximum(var, 0.0, out=var)
+            std = np.sqrt(var, out=var).reshape(nb * block, k)[:m]
+        mean = mean.reshape(nb * block, k)[:m]
+        if warmup_only:
+            mean[:f0 + n - 1] = np.nan
+            if std is not None:
+                std[:f0 + n - 1] = np.nan
+        else:
+            empty = ((cnt[:, hi] - cnt[:, lo]) != n).reshape(nb * block, k)[:m]
+            mean[empty] = np.nan
+            if std is not None:
+                std[empty] = np.nan
+        results.append((mean.reshape(x.shape), None if std is None else std.reshape(x.shape)))
+    return results
+
+def rolling_mean_std(x, n, with_std=True):
+    return rolling_moments(x, (n,), with_std)[0]
+
+def ewm(x, span, init=None, block=EWM_BLOCK, group=EWM_GROUP):
+    """ewm(span=span, adjust=False).mean(), NaNs treated as pandas does: rows before the
+    first value stay NaN, a NaN row repeats the last EMA and the value after a gap weighs the
+    old EMA by the decay over the whole gap. `init` is the EMA value just before x[0] (None
+    seeds with the first value, like pandas; otherwise x[0] continues it as the next value).
+    Columns without NaNs go through _ewm_dense; the others are split into NaN-free runs,
+    each cut into the blocks the whole column would use, so a call on a suffix starting on
+    a block-group boundary reproduces the same bits (what the chunked backtest relies on)."""
+    m = x.shape[0]
+    if m == 0:
+        return np.empty_like(x, dtype=float)
+    x2 = x.reshape(m, -1).astype(float)
+    k = x2.shape[1]
+    gaps = np.isnan(x2).any(axis=0)
+    if not gaps.any():
+        return _ewm_dense(x2, span, init, block, group).reshape(x.shape)
+    inits = np.broadcast_to(np.asarray(np.nan if init is None else init, dtype=float), (k,))
+    out = np.empty((m, k))
+    if not gaps.all():
+        dense = ~gaps
+        out[:, dense] = _ewm_dense(x2[:, dense], span, None if init is None else inits[dense], block, group)
+    for j in np.flatnonzero(gaps):
+        out[:, j] = _ewm_runs(x2[:, j], span, inits[j], block, group)
+    return out.reshape(x.shape)
+
+def _ewm_runs(x, span, init, block, group):
+    # One column with NaNs: dense EMA over each NaN-free run, seeded from the carried value
+    # the way pandas' ewm(adjust=False) weighs it (old weight d**(gap+1), new weight a).
+    a = 2.0 / (span + 1.0)
+    d = 1.0 - a
+    out = np.empty(x.shape[0])
+    valid = ~np.isnan(x)
+    edges = np.flatnonzero(np.diff(np.concatenate(([False], valid, [False])).astype(np.int8)))
+    carry, last = init, -1
+    prev_end = 0
+    for s, e in zip(edges[::2], edges[1::2]):
+        out[prev_end:s] = carry
+        if s == 0 and not np.isnan(carry):
+            # x[0] continues the EMA `init` ended with, as inside an uncut run.
+            out[:e] = _ewm_dense(x[:e, None], span, carry, block, group)[:, 0]
+            carry, last, prev_end = out[e - 1], e - 1, e
+            continue
+        if np.isnan(carry):
+            first = x[s]
+        else:
+            old = d ** (s - last)
+            new = 1.0 - old if span == 3.0 else a   # pandas special-cases com == 1
+            first = (old * carry + new * x[s]) / (old + new)
+        out[s] = first
+        if e - s > 1:
+            out[s + 1:e] = _ewm_dense(x[s + 1:e, None], span, first, block, group, offset=s + 1)[:, 0]
+        carry, last, prev_end = out[e - 1], e - 1, e
+    out[prev_end:] = carry
+    return out
+
+def _ewm_dense(x2, span, init, block, group, offset=0):
+    """ewm over a NaN-free (m, k) array. Each block of `block` rows is one matrix product
+    with the decay kernel, then the carry is applied per block. Products run on fixed-shape
+    groups of `group` blocks, so a block's bits do not depend on the length of the series
+    (BLAS kernels can round differently by matrix width). x2[0] sits `offset` rows into
+    the block grid (zero-padded in front), for runs that start part-way into a series."""
+    m, k = x2.shape
+    a = 2.0 / (span + 1.0)
+    d = 1.0 - a
+    offset %= block * group
+    ng = -(-(offset + m) // (block * group))
+    nb = ng * group
+    pad = np.zeros((nb * block, k))
+    pad[offset:offset + m] = x2
+    i = np.arange(block)
+    lag = i[:, None] - i[None, :]
+    kern = np.where(lag >= 0, a * d ** np.maximum(lag, 0), 0.0)
+    # (groups, block, group * k): column g * k + j is block g of ticker j within the group.
+    blocks = pad.reshape(ng, group, block, k).transpose(0, 2, 1, 3).reshape(ng, block, group * k)
+    z = np.matmul(kern, blocks).reshape(ng, block, group, k).transpose(0, 2, 1, 3).reshape(nb, block, k)
+    decay = d ** (i + 1.0)
+    carry = x2[0].copy() if init is None else np.broadcast_to(np.asarray(init, dtype=float), (k,)).copy()
+    b0, p = divmod(offset, block)
+    z[b0, p:] += decay[:block - p, None] * carry
+    carry = z[b0, -1]
+    for b in range(b0 + 1, -(-(offset + m) // block)):
+        z[b] += decay[:, None] * carry
+        carry = z[b, -1]
+    return z.reshape(nb * block, k)[offset:offset + m]
+
+def pct_change(x, periods=1):
+    out = np.full(x.shape, np.nan)
+    if x.shape[0] > periods:
+        out[periods:] = x[periods:] / x[:-periods] - 1.0
+    return out
+
+def feature_kernel(close, high=None, low=None, dtype=np.float64, out=None, ema_init=None, ema_state=None):
+    """All build_features columns for close/high/low arrays. Returns `out` (allocated when
+    None) with out[FEATURES.index(name)] holding each feature; NaN during warm-up.
+    ema_init = (fast, slow, signal) MACD EMA values just before close[0], for continuing a
+    series; ema_state, if a dict, receives those three EMA series."""
+    c = np.asarray(close, dtype=float)
+    h = c if high is None else np.asarray(high, dtype=float)
+    l = c if low is None else np.asarray(low, dtype=float)
+    shape = (len(FEATURES),) + c.shape
+    if out is None:
+        out = np.empty(shape, dtype=dtype)
+    elif out.shape != shape:
+        raise ValueError(f"out has shape {out.shape}, expected {shape}")
+    col = {name: i for i, name in enumerate(FEATURES)}
+
+    ret1 = pct_change(c, 1)
+    ret5 = pct_change(c, 5)
+    out[col["ret1"]] = ret1
+    out[col["ret5"]] = ret5
+    out[col["ret20"]] = pct_change(c, 20)
+
+    delta = np.full(c.shape, np.nan)
+    delta[1:] = c[1:] - c[:-1]
+    up, _ = rolling_mean_std(np.maximum(delta, 0.0), 14, with_std=False)
+    down, _ = rolling_mean_std(np.maximum(-delta, 0.0), 14, with_std=False)
+    out[col["rsi14"]] = 100 - (100 / (1 + up / (down + 1e-12)))
+
+    fast_init, slow_init, sig_init = ema_init if ema_init is not None else (None, None, None)
+    fast, slow = ewm(c, 12, fast_init), ewm(c, 26, slow_init)
+    macd_line = fast - slow
+    macd_sig = ewm(macd_line, 9, sig_init)
+    if ema_state is not None:
+        ema_state.update(fast=fast, slow=slow, signal=macd_sig)
+    out[col["macd"]] = macd_line
+    out[col["macd_sig"]] = macd_sig
+    out[col["macd_hist"]] = macd_line - macd_sig
+
+    ma, sd = rolling_mean_std(c, 20)
+    upper = ma + 2 * sd
+    lower = ma - 2 * sd
+    bbp = (c - lower) / (upper - lower + 1e-12)
+    out[col["bbp"]] = bbp
+    out[col["bb_width"]] = (upper - lower) / (ma + 1e-12)
+
+    tr = h - l
+    tr[1:] = np.fmax(np.fmax(tr[1:], np.abs(h[1:] - c[:-1])), np.abs(l[1:] - c[:-1]))
+    out[col["atr14"]] = rolling_mean_std(tr, 14, with_std=False)[0]
+
+    (_, vol10), (_, vol20) = rolling_moments(ret1, (10, 20))
+    out[col["vol10"]] = vol10
+    out[col["vol20"]] = vol20
+
+    m5, s5 = rolling_mean_std(ret5, 100)
+    out[col["z_mom5"]] = (ret5 - m5) / (s5 + 1e-9)
+    mb, sb = rolling_mean_std(bbp, 100)
+    out[col["z_bbp"]] = (bbp - mb) / (sb + 1e-9)
+    return out
@@ -1,8 +1,10 @@
 
 # modules/finnhub_ws.py
-import asyncio, json, threading, time, logging
+import asyncio, json, os, threading, time, logging
 import websockets
 
+FINNHUB_WS_URL = os.getenv("FINNHUB_WS_URL", "wss://ws.finnhub.io")
+
 log = logging.getLogger(__name__); log.setLevel(logging.INFO)
 
 class FinnhubWS:
@@ -19,7 +21,7 @@ class FinnhubWS:
     def is_running(self): return self._thread is not None and self._thread.is_alive()
 
     async def _run_once(self):
-        url = "wss://ws.finnhub.io?token=" + self.api_key
+        url = FINNHUB_WS_URL + "?token=" + self.api_key
         async with websockets.connect(url, ping_interval=20) as ws:
             for s in sorted(self._subs):
                 await ws.send(json.dumps({"type":"subscribe","symbol": s}))
@@ -1,15 +1,38 @@
-
 # modules/hi_target_predictor.py
 import pandas as pd
+from .bootstrap import bootstrap_summary
+from .incremental import STATE_DIR, resume, state_path
 from .strategy import RiskManagedStrategy
 
-def run_hi_target_strategy(ohlcv: pd.DataFrame, horizon_days=5, price_col="close"):
-    strat = RiskManagedStrategy(
-        vol_target_daily=0.015,   # slightly higher aggression than default
-        max_leverage=2.5,         # careful with >2.5
-        stop_loss_pct=0.02,
-        take_profit_pct=0.04,     # go for bigger wins
-        kelly_cap=0.6
-    )
+HI_TARGET_PARAMS = dict(
+    vol_target_daily=0.015,   # slightly higher aggression than default
+    max_leverage=2.5,         # careful with >2.5
+    stop_loss_pct=0.02,
+    take_profit_pct=0.04,     # go for bigger wins
+    kelly_cap=0.6
+)
+
+def run_hi_target_strategy(ohlcv: pd.DataFrame, horizon_days=5, price_col="close", params: dict = None,
+                           bootstrap=None):
+    """params overrides HI_TARGET_PARAMS, e.g. with a row picked from modules.sweep.sweep().
+    bootstrap=True (or a dict of modules.bootstrap.bootstrap options) adds resampled
+    confidence bands as summary["bootstrap"]."""
+    strat = RiskManagedStrategy(**{**HI_TARGET_PARAMS, **(params or {})})
     bt_df, summary = strat.backtest(ohlcv, price_col=price_col)
+    if bootstrap:
+        summary["bootstrap"] = bootstrap_summary(bt_df, **(bootstrap if isinstance(bootstrap, dict) else {}))
     return bt_df, summary
+
+def run_hi_target_strategy_incremental(ohlcv: pd.DataFrame, key: str, price_col="close", params: dict = None,
+                                       state_dir: str = None):
+    """run_hi_target_strategy for a dashboard that re-runs on every refresh: the backtest
+    state for `key` (e.g. the ticker) is checkpointed under state_dir and only bars newer
+    than the checkpoint are processed (it is rewritten only when they change something).
+    Uses the causal confidence rank (see modules.incremental); a change of params starts
+    the state over."""
+    root = state_dir or STATE_DIR
+    strat = RiskManagedStrategy(**{**HI_TARGET_PARAMS, **(params or {})})
+    state = resume(key, strat, price_col, root)
+    state.sync(ohlcv)
+    state.save(state_path(key, root))
+    return state.frame, state.summary()
@@ -0,0 +1,312 @@
+# modules/incremental.py
+# Backtest state that grows bar by bar, for dashboards that re-run on every refresh while
+# only the latest bar is new. append() costs O(WINDOW_BARS + new bars): features come from
+# feature_kernel over a short raw window continued with carried EMA values, bb_width is
+# ranked causally against a sorted list of past widths, and pnl / equity / weekly stats
+# are carried forward. The state checkpoints to disk so the next session resumes it: a small
+# pickle of the carried values plus an append-only log of the per-bar rows, bb_width values
+# and weekly equity marks, so a save writes what the new bars added, not the history.
+# Results follow RiskManagedStrategy.backtest(..., causal=True) on the same bars (to
+# floating-point rounding): the whole-history rank of the default backtest changes past
+# bars whenever a new one arrives, so it cannot be updated incrementally.
+import bisect
+import math
+import os
+import pickle
+import numpy as np
+import pandas as pd
+from .feature_kernel import FEATURES, feature_kernel
+from .signal import confidence_score
+from .strategy import RiskManagedStrategy
+
+WINDOW_BARS = 256    # raw bars kept for the indicators (longest dependency is ~120 bars)
+STATE_DIR = os.getenv("BACKTEST_STATE_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                                         ".backtest_state"))
+
+class IncrementalBacktest:
+    def __init__(self, strategy: RiskManagedStrategy = None, price_col: str = "close"):
+        self.strategy = strategy or RiskManagedStrategy()
+        self.price_col = price_col
+        self.window = None          # last WINDOW_BARS raw bars
+        self.ema_init = None        # MACD EMA values just before window[0]
+        self.widths = []            # sorted bb_width of every kept bar
+        self.prev_close = np.nan
+        self.prev_size = 0.0
+        self.equity = None
+        self.bars = 0
+        self.hits = 0
+        self.pnl_mean = 0.0         # Welford running mean / M2 of per-bar pnl
+        self.pnl_m2 = 0.0
+        self.weekly = {}            # W-FRI label -> last equity in that week
+        self._pieces = []           # per-bar result frames, concatenated lazily
+        self._undo = None
+        self._version = 0           # bumped by every change; save() skips unchanged states
+        self._saved = None          # (path, version) of the last save
+        self._log_path = None       # row log written by save(): rows and bytes it holds
+        self._saved_rows = 0
+        self._log_bytes = 0
+        self._new_widths = []       # widths added since the last save, in order
+        self._new_weekly = {}       # weekly marks changed since the last save
+
+    @property
+    def last_timestamp(self):
+        return None if self.window is None else self.window.index[-1]
+
+    @property
+    def params(self) -> dict:
+        return dict(self.strategy.__dict__)
+
+    def _snapshot(self):
+        return {k: getattr(self, k) for k in ("window", "ema_init", "prev_close", "prev_size", "equity",
+                                               "bars", "hits", "pnl_mean", "pnl_m2")} | {
+            "weekly": {}, "rows": self._n_rows()}
+
+    def append(self, bars: pd.DataFrame) -> pd.DataFrame:
+        """Add bars strictly after the last one seen; returns their per-bar rows (the
+        columns of backtest's DataFrame, warm-up and NaN rows dropped as there)."""
+        bars = bars.sort_index()
+        if bars.empty:
+            return bars.iloc[:0]
+        last = self.last_timestamp
+        if last is not None and bars.index[0] <= last:
+            raise ValueError(f"bars must start after {last}")
+        undo = self._snapshot()
+
+        x = bars if self.window is None else pd.concat([self.window, bars])
+        c = x[self.price_col].to_numpy(dtype=float)
+        h = x["high"].to_numpy(dtype=float) if "high" in x.columns else c
+        l = x["low"].to_numpy(dtype=float) if "low" in x.columns else c
+        ema = {}
+        feats = feature_kernel(c, h, l, ema_init=self.ema_init, ema_state=ema)[:, len(x) - len(bars):]
+        if len(x) > WINDOW_BARS:
+            k = len(x) - WINDOW_BARS - 1
+            self.ema_init = (ema["fast"][k], ema["slow"][k], ema["signal"][k])
+        self.window = x.iloc[-WINDOW_BARS:]
+
+        valid = ~np.isnan(feats).any(axis=0) & bars.notna().all(axis=1).to_numpy()
+        data = bars[valid]
+        feat = pd.DataFrame(dict(zip(FEATURES, feats[:, valid])), index=data.index)
+        added = []
+        ranks = np.empty(len(data))
+        for i, w in enumerate(feat["bb_width"].to_numpy()):
+            bisect.insort(self.widths, w)
+            added.append(w)
+            lo, hi = bisect.bisect_left(self.widths, w), bisect.bisect_right(self.widths, w)
+            ranks[i] = (lo + (hi - lo + 1) / 2) / len(self.widths)
+        undo["widths_added"] = added
+        self._new_widths.extend(added)
+        self._undo = undo
+        self._version += 1
+        if data.empty:
+            return self._rows(data)
+
+        f = pd.concat([data, feat], axis=1)
+        conf = confidence_score(f, width_rank=pd.Series(ranks, index=f.index))
+        positions = self.strategy.generate_positions(data[self.price_col].astype(float), f, conf=conf)
+        df = positions.join(pd.DataFrame({"open": data.get("open", data[self.price_col]),
+                                          "high": data.get("high", data[self.price_col]),
+                                          "low": data.get("low", data[self.price_col])}), how="inner")
+        close = df["close"].to_numpy(dtype=float)
+        prev = np.concatenate([[self.prev_close], close[:-1]])
+        ret = close / prev - 1
+        df["ret_bar"] = np.where(np.isnan(ret), 0.0, ret)
+        realized = self.strategy.realized_returns(close, df["high"].to_numpy(), df["low"].to_numpy(), prev_close=prev)
+        size = df["size"].to_numpy(dtype=float)
+        pnl = np.concatenate([[self.prev_size], size[:-1]]) * realized
+        df["pnl"] = pnl
+        grow = 1 + pnl
+        df["equity"] = grow.cumprod() if self.equity is None else np.cumprod(np.concatenate([[self.equity], grow]))[1:]
+
+        for p in pnl:
+            self.bars += 1
+            d = p - self.pnl_mean
+            self.pnl_mean += d / self.bars
+            self.pnl_m2 += d * (p - self.pnl_mean)
+        self.hits += int((pnl > 0).sum())
+        marks = df["equity"].resample("W-FRI").last().dropna().to_dict()
+        undo["weekly"] = {k: self.weekly.get(k) for k in marks}   # None: week not seen before
+        self.weekly.update(marks)
+        self._new_weekly.update(marks)
+        self.prev_close, self.prev_size, self.equity = close[-1], size[-1], float(df["equity"].iloc[-1])
+        self._pieces.append(df)
+        return df
+
+    def _rows(self, data):
+        return pd.DataFrame(columns=["close", "prob_up", "conf", "size", "open", "high", "low", "ret_bar", "pnl",
+                                     "equity"], index=data.index[:0], dtype=float)
+
+    def rollback(self):
+        """Undo the last append() (one level), e.g. when today's bar is revised."""
+        if self._undo is None:
+            raise ValueError("nothing to roll back")
+        undo, self._undo = self._undo, None
+        added = undo.pop("widths_added")
+        for w in added:
+            del self.widths[bisect.bisect_left(self.widths, w)]
+        # save() never logs the last append, so its widths are still at the end here.
+        del self._new_widths[len(self._new_widths) - len(added):]
+        for k, v in undo.pop("weekly").items():
+            if v is None:
+                del self.weekly[k]
+                self._new_weekly.pop(k, None)
+            else:
+                self.weekly[k] = self._new_weekly[k] = v
+        rows = undo.pop("rows")
+        if rows < self._n_rows():
+            self._pieces = [self._slice(0, rows)]
+        for k, v in undo.items():
+            setattr(self, k, v)
+        self._version += 1
+
+    def reset(self):
+        """Start over with no bars (same strategy); the next save() rewrites the checkpoint."""
+        version = self._version
+        self.__dict__.update(IncrementalBacktest(self.strategy, self.price_col).__dict__)
+        self._version = version + 1
+
+    def sync(self, ohlcv: pd.DataFrame) -> pd.DataFrame:
+        """Bring the state up to date with a freshly downloaded history: append the bars
+        after the last one seen. The bars still in the indicator window are compared with
+        the history first: a revised last bar (a still-forming bar) rolls back the last
+        append; a revised earlier bar (e.g. a split or dividend back-adjusting the series)
+        makes the carried values stale, so the state starts over from the whole history.
+        The first bar of the history is not compared: a fixed-length download that moved
+        forward (e.g. the last 365 days) may derive its first open from a bar it no longer has."""
+        ohlcv = ohlcv.sort_index()
+        last = self.last_timestamp
+        if last is not None:
+            cols = self.window.columns.intersection(ohlcv.columns)
+            common = self.window.index.intersection(ohlcv.index[1:])
+            seen = self.window.loc[common, cols].to_numpy(dtype=float)
+            fresh = ohlcv.loc[common, cols].to_numpy(dtype=float)
+            same = ((seen == fresh) | (np.isnan(seen) & np.isnan(fresh))).all(axis=1)
+            last_revised = len(common) > 0 and common[-1] == last and not same[-1]
+            if not same[:-1].all() or (last_revised and self._undo is None):
+                self.reset()
+            elif last_revised:
+                self.rollback()
+            last = self.last_timestamp
+        return self.append(ohlcv if last is None else ohlcv[ohlcv.index > last])
+
+    def _n_rows(self) -> int:
+        return sum(len(df) for df in self._pieces)
+
+    def _slice(self, lo: int, hi: int) -> pd.DataFrame:
+        """Rows lo:hi of frame, touching only the pieces that hold them."""
+        parts, end = [], self._n_rows()
+        for df in reversed(self._pieces):
+            start = end - len(df)
+            if end <= lo:
+                break
+            if start < hi:
+                parts.append(df.iloc[max(lo - start, 0):min(hi, end) - start])
+            end = start
+        if len(parts) == 1:
+            return parts[0]
+        return pd.concat(parts[::-1]) if parts else self._rows(pd.DataFrame())
+
+    @property
+    def frame(self) -> pd.DataFrame:
+        """Per-bar rows so far, like backtest's DataFrame."""
+        if len(self._pieces) > 1:
+            self._pieces = [pd.concat(self._pieces)]
+        return self._pieces[0] if self._pieces else self._rows(pd.DataFrame())
+
+    def summary(self) -> dict:
+        """backtest's summary dict for the bars so far."""
+        if self.bars == 0:
+            return {"bars": 0}
+        wk = pd.Series(self.weekly).sort_index()
+        wk = wk.reindex(pd.date_range(wk.index[0], wk.index[-1], freq="W-FRI")).pct_change().dropna()
+        std = math.sqrt(self.pnl_m2 / (self.bars - 1)) if self.bars > 1 else float("nan")
+        return {
+            "bars": int(self.bars),
+            "final_equity": float(self.equity),
+            "weekly_mean": float(wk.mean() if len(wk)>0 else 0.0),
+            "weekly_median": float(wk.median() if len(wk)>0 else 0.0),
+            "weekly_p05": float(wk.quantile(0.05) if len(wk)>0 else 0.0),
+            "weekly_p95": float(wk.quantile(0.95) if len(wk)>0 else 0.0),
+            "sharpe_daily": float((np.sqrt(252) * (self.pnl_mean / (std + 1e-12))) if std>0 else 0.0),
+            "hit_rate": float(self.hits / self.bars),
+        }
+
+    def save(self, path: str) -> bool:
+        """Checkpoint to `path` (the carried values, an atomic pickle) and `path + ".rows"`
+        (an append-only log of the per-bar rows, bb_width values and weekly marks). Only
+        what is not yet in the log is written, and nothing at all if the state is unchanged
+        since the last save to this path; the last append stays in the pickle until the next
+        one, since rollback() may still drop it. Returns whether anything was written."""
+        path = os.path.abspath(path)
+        if self._saved == (path, self._version) and os.path.exists(path):
+            return False
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        total = self._n_rows()
+        settled = self._undo["rows"] if self._undo is not None else total
+        held = len(self._undo["widths_added"]) if self._undo is not None else 0
+        widths = self._new_widths[:len(self._new_widths) - held]
+        # Weekly marks as they were before the last append.
+        held_weeks = self._undo["weekly"] if self._undo is not None else {}
+        weekly = {k: v for k, v in self._new_weekly.items() if k not in held_weeks}
+        weekly.update({k: v for k, v in held_weeks.items() if v is not None})
+        log = path + ".rows"
+        if self._log_path != log:
+            self._log_path, self._saved_rows, self._log_bytes = log, 0, 0
+        with open(log, "r+b" if os.path.exists(log) else "w+b") as fh:
+            # Anything past _log_bytes is from an interrupted save or from before a reset().
+            fh.truncate(self._log_bytes)
+            fh.seek(self._log_bytes)
+            if settled > self._saved_rows or widths or weekly:
+                pickle.dump((self._slice(self._saved_rows, settled), widths, weekly), fh,
+                            protocol=pickle.HIGHEST_PROTOCOL)
+                self._saved_rows = settled
+                self._new_widths = self._new_widths[len(widths):]
+                self._new_weekly = {k: self.weekly[k] for k in held_weeks}
+            self._log_bytes = fh.tell()
+        state = dict(self.__dict__, _pieces=[self._slice(settled, total)], widths=None, weekly=None, _saved=None)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as fh:
+            pickle.dump(state, fh, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+        self._saved = (path, self._version)
+        return True
+
+    @classmethod
+    def load(cls, path: str):
+        path = os.path.abspath(path)
+        with open(path, "rb") as fh:
+            state = pickle.load(fh)
+        if not isinstance(state, dict):
+            raise ValueError(f"{path}: not an IncrementalBacktest checkpoint")
+        obj = cls.__new__(cls)
+        obj.__dict__.update(state)
+        obj._log_path = path + ".rows"
+        pieces, widths, obj.weekly = [], [], {}
+        if obj._log_bytes:
+            with open(obj._log_path, "rb") as fh:
+                while fh.tell() < obj._log_bytes:
+                    rows, added, marks = pickle.load(fh)
+                    pieces.append(rows)
+                    widths.extend(added)
+                    obj.weekly.update(marks)
+        if sum(len(df) for df in pieces) != obj._saved_rows:
+            raise ValueError(f"{obj._log_path}: row log does not match the checkpoint")
+        obj._pieces = [df for df in pieces + obj._pieces if len(df)]
+        obj.widths = sorted(widths + obj._new_widths)
+        obj.weekly.update(obj._new_weekly)
+        obj._saved = (path, obj._version)
+        return obj
+
+def state_path(key: str, root: str = STATE_DIR) -> str:
+    safe = "".join(ch if ch.isalnum() or ch in ".-_" else "_" for ch in key.upper())
+    return os.path.join(root, safe + ".pkl")
+
+def resume(key: str, strategy: RiskManagedStrategy, price_col: str = "close", root: str = STATE_DIR) -> IncrementalBacktest:
+    """The checkpoint for key if it exists and was built with the same parameters, else a
+    fresh state."""
+    try:
+        state = IncrementalBacktest.load(state_path(key, root))
+        if state.params == strategy.__dict__ and state.price_col == price_col:
+            return state
+    except Exception:
+        pass
+    return IncrementalBacktest(strategy, price_col)
@@ -0,0 +1,91 @@
+# modules/portfolio.py
+# Portfolio backtest for RiskManagedStrategy on a dates x tickers panel. Features,
+# positions, stop/target fills and pnl are all (dates, tickers) array operations, so a
+# whole universe (ASX200 + S&P500 on a shared date index) is one pass. Each ticker's
+# strategy size is scaled by 1/N (equal capital per ticker with data so far), then the
+# book is capped at a gross leverage and, optionally, at a portfolio volatility target.
+# A ticker whose bars end before the panel does (delisted) is closed at its last bar, and
+# dates before any ticker has its features (the indicator warm-up) are left out, as
+# backtest does.
+import numpy as np
+import pandas as pd
+from .feature_kernel import FEATURES
+from .signal import build_features_panel
+from .sweep import summarize, week_bins
+
+PORTFOLIO_VOL_LOOKBACK = 20
+
+def panel_fields(panel: pd.DataFrame, price_col: str = "close") -> dict:
+    """close/high/low (and open) dates x tickers frames out of a (field, ticker) panel, e.g.
+    OHLCVStore.panel / tools.download_panel ("Close") or the bundle's lowercase fields."""
+    by_name = {str(f).lower(): f for f in panel.columns.get_level_values(0).unique()}
+    if price_col.lower() not in by_name:
+        raise ValueError(f"panel has no {price_col!r} field")
+    close = panel[by_name[price_col.lower()]].sort_index().astype(float)
+    out = {"close": close}
+    for name in ("high", "low", "open"):
+        out[name] = panel[by_name[name]].reindex(index=close.index, columns=close.columns).astype(float) \
+            if name in by_name else close
+    return out
+
+def backtest_portfolio(strategy, panel: pd.DataFrame, price_col: str = "close", max_gross_leverage: float = None,
+                       vol_target: float = None, vol_lookback: int = PORTFOLIO_VOL_LOOKBACK):
+    """Returns (df, contrib, summary):
+    df: per-date pnl, equity, gross_leverage, vol_scale and n_assets of the book;
+    contrib: dates x tickers pnl contributions (rows sum to df.pnl, contrib.sum() is the
+        per-asset attribution);
+    summary: backtest's summary metrics for the book, plus per-ticker attribution.
+    max_gross_leverage defaults to strategy.max_leverage. vol_target (off by default) caps
+    the trailing std of the book's per-bar pnl, in the same units as vol_target_daily."""
+    fields = panel_fields(panel, price_col)
+    close, high, low = fields["close"], fields["high"], fields["low"]
+    feats = build_features_panel(close, high, low)
+    size = strategy.generate_positions(close, feats)["size"].reindex(index=close.index, columns=close.columns)
+
+    c = close.to_numpy()
+    has_bar = np.isfinite(c)
+    sizes = size.to_numpy(copy=True)
+    last_bar = len(c) - 1 - np.argmax(has_bar[::-1], axis=0)
+    ended = np.flatnonzero(has_bar.any(axis=0) & (last_bar < len(c) - 1))
+    sizes[last_bar[ended], ended] = 0.0
+    # A position is held until the ticker's next bar, across other markets' dates.
+    held = pd.DataFrame(sizes).ffill().to_numpy()
+    listed = np.maximum.accumulate(has_bar, axis=0)
+    n_assets = listed.sum(axis=1)
+    weights = np.nan_to_num(held) / np.maximum(n_assets, 1)[:, None]
+
+    gross = np.abs(weights).sum(axis=1)
+    cap = strategy.max_leverage if max_gross_leverage is None else max_gross_leverage
+    with np.errstate(divide="ignore", invalid="ignore"):
+        lev_scale = np.where(gross > cap, cap / gross, 1.0)
+    weights *= lev_scale[:, None]
+
+    prev_close = close.ffill().shift(1).to_numpy()
+    realized = strategy.realized_returns(c, high.to_numpy(), low.to_numpy(), prev_close=prev_close)
+    realized = np.where(has_bar, realized, 0.0)
+
+    vol_scale = np.ones(len(c))
+    if vol_target is not None:
+        # Scale from the trailing std of the uncapped book up to the previous bar only.
+        raw = np.zeros(len(c))
+        raw[1:] = (weights[:-1] * realized[1:]).sum(axis=1)
+        trailing = pd.Series(raw).rolling(vol_lookback).std().shift(1).to_numpy()
+        with np.errstate(divide="ignore", invalid="ignore"):
+            vol_scale = np.where(trailing > vol_target, vol_target / trailing, 1.0)
+        weights *= vol_scale[:, None]
+
+    contrib = np.zeros_like(realized)
+    contrib[1:] = weights[:-1] * realized[1:]
+    pnl = contrib.sum(axis=1)
+    df = pd.DataFrame({"pnl": pnl, "equity": np.cumprod(1 + pnl), "gross_leverage": np.abs(weights).sum(axis=1),
+                       "vol_scale": vol_scale, "n_assets": n_assets}, index=close.index)
+    contrib = pd.DataFrame(contrib, index=close.index, columns=close.columns)
+    ready = feats[FEATURES[0]].notna().to_numpy().any(axis=1)
+    df, contrib, pnl = df[ready], contrib[ready], pnl[ready]
+
+    end, prev = week_bins(df.index)
+    summary = summarize(pnl[None, :], end, prev).iloc[0].to_dict()
+    summary["bars"] = int(summary["bars"])
+    summary["assets"] = int(n_assets[-1]) if len(n_assets) else 0
+    summary["attribution"] = contrib.sum().sort_values(ascending=False).to_dict()
+    return df, contrib, summary
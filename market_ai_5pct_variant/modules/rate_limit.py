@@ -0,0 +1,183 @@
+# modules/rate_limit.py
+# Client-side quota handling for rate-limited APIs (Alpha Vantage):
+#   RateLimiter - token buckets (per minute and per day) whose state lives in a small file
+#                 under an exclusive lock, so every thread and process using the same
+#                 API key draws from one budget;
+#   Coalescer   - identical requests already in flight share the first caller's result.
+# Both record how long callers waited, for the quota dashboards and load tests.
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import deque
+
+try:
+    import fcntl
+except ImportError:  # Windows: buckets are shared between threads of one process only
+    fcntl = None
+
+RATE_DIR = os.getenv("RATE_LIMIT_DIR", os.path.join(tempfile.gettempdir(), "market_ai_rate_limits"))
+WAIT_SAMPLES = 1024
+MAX_SLEEP = 1.0   # re-check the shared state at least this often while waiting
+
+class RateLimitTimeout(TimeoutError):
+    pass
+
+class WaitStats:
+    """Counts and wait-time percentiles over the last WAIT_SAMPLES events. Timed-out
+    waits are counted apart and kept out of the wait times."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.count = 0
+        self.timeouts = 0
+        self.waited = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self._recent = deque(maxlen=WAIT_SAMPLES)
+
+    def add(self, seconds: float):
+        with self._lock:
+            self.count += 1
+            self.waited += seconds > 0
+            self.total_wait += seconds
+            self.max_wait = max(self.max_wait, seconds)
+            self._recent.append(seconds)
+
+    def timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            recent = sorted(self._recent)
+        pick = lambda q: recent[min(len(recent) - 1, int(q * len(recent)))] if recent else 0.0
+        return {"calls": self.count, "timeouts": self.timeouts, "waited": self.waited,
+                "total_wait_s": self.total_wait,
+                "mean_wait_s": self.total_wait / self.count if self.count else 0.0,
+                "p50_wait_s": pick(0.5), "p95_wait_s": pick(0.95), "max_wait_s": self.max_wait}
+
+class RateLimiter:
+    """Token buckets holding `per_minute` and `per_day` calls (None = no limit), refilled
+    continuously. The state is a JSON file named after `name` in `root`, updated under
+    flock, so limiters with the same name share one budget across processes."""
+
+    def __init__(self, name: str, per_minute: float = None, per_day: float = None, root: str = RATE_DIR):
+        self.name = name
+        self.buckets = [(cap, cap / period) for cap, period in ((per_minute, 60.0), (per_day, 86400.0)) if cap]
+        self.root = root
+        self.path = os.path.join(root, "".join(ch if ch.isalnum() or ch in ".-_" else "_" for ch in name) + ".json")
+        self.stats = WaitStats()
+        self._lock = threading.Lock()
+
+    def _update(self, fn):
+        # Run fn(tokens, now) -> (tokens, result) on the refilled shared state, atomically.
+        with self._lock:
+            os.makedirs(self.root, exist_ok=True)
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                if fcntl is not None:
+                    fcntl.flock(fd, fcntl.LOCK_EX)
+                raw = os.read(fd, 4096)
+                now = time.time()
+                try:
+                    state = json.loads(raw) if raw else {}
+                except ValueError:
+                    state = {}
+                stamp = state.get("t", now)
+                saved = state.get("tokens") or []
+                tokens = [min(cap, (saved[i] if i < len(saved) else cap) + max(0.0, now - stamp) * rate)
+                          for i, (cap, rate) in enumerate(self.buckets)]
+                tokens, result = fn(tokens, now)
+                data = json.dumps({"t": now, "tokens": tokens}).encode()
+                os.lseek(fd, 0, os.SEEK_SET)
+                os.ftruncate(fd, 0)
+                os.write(fd, data)
+                return result
+            finally:
+                os.close(fd)  # also releases the flock
+
+    def _try_take(self, tokens, now):
+        if all(t >= 1 for t in tokens):
+            return [t - 1 for t in tokens], 0.0
+        return tokens, max((1 - t) / rate for t, (_, rate) in zip(tokens, self.buckets) if t < 1)
+
+    def acquire(self, timeout: float = None) -> float:
+        """Take one call from every bucket, sleeping until one is available. Returns the
+        seconds waited; raises RateLimitTimeout after `timeout` seconds."""
+        t0, slept = time.monotonic(), False
+        while True:
+            wait = self._update(self._try_take) if self.buckets else 0.0
+            waited = time.monotonic() - t0 if slept else 0.0
+            if wait == 0.0:
+                self.stats.add(waited)
+                return waited
+            if timeout is not None and waited + wait > timeout:
+                self.stats.timeout()
+                raise RateLimitTimeout(f"{self.name}: no call available within {timeout}s")
+            time.sleep(min(wait, MAX_SLEEP))
+            slept = True
+
+    def exhaust(self, bucket: int = 0):
+        """Empty a bucket (default the per-minute one), e.g. when the server says the quota
+        is used up anyway (another client on the same key)."""
+        def drain(tokens, now):
+            if bucket < len(tokens):
+                tokens[bucket] = 0.0
+            return tokens, None
+        if self.buckets:
+            self._update(drain)
+
+    def available(self) -> list:
+        """Calls currently left in each bucket."""
+        return self._update(lambda tokens, now: (tokens, list(tokens))) if self.buckets else []
+
+class _Call:
+    __slots__ = ("done", "result", "error", "waiters")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+class Coalescer:
+    """call(key, fn): the first caller for a key runs fn; callers arriving while it runs
+    wait for it and get the same result object (or exception). Results are not kept once
+    the call finishes, so this never serves stale data."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self.calls = 0
+        self.coalesced = 0
+        self.stats = WaitStats()
+
+    def call(self, key, fn):
+        with self._lock:
+            c = self._inflight.get(key)
+            leader = c is None
+            if leader:
+                c = self._inflight[key] = _Call()
+                self.calls += 1
+            else:
+                c.waiters += 1
+                self.coalesced += 1
+        if not leader:
+            t0 = time.monotonic()
+            c.done.wait()
+            self.stats.add(time.monotonic() - t0)
+            if c.error is not None:
+                raise c.error
+            return c.result
+        try:
+            c.result = fn()
+            return c.result
+        except BaseException as e:
+            c.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            c.done.set()
@@ -2,6 +2,7 @@
 # modules/signal.py
 import numpy as np
 import pandas as pd
+from .feature_kernel import FEATURES, feature_kernel
 
 def _ema(x, span):
     return x.ewm(span=span, adjust=False).mean()
@@ -37,7 +38,20 @@ def atr(high, low, close, length=14):
     ], axis=1).max(axis=1)
     return tr.rolling(length).mean()
 
-def build_features(df, price_col="close"):
+def build_features(df, price_col="close", dtype=np.float64):
+    """Indicator columns appended to df (sorted by index), warm-up rows dropped.
+    Thin wrapper over feature_kernel; dtype=np.float32 stores the features in float32."""
+    x = df.sort_index()
+    c = x[price_col].to_numpy(dtype=float)
+    h = x["high"].to_numpy(dtype=float) if "high" in x.columns else c
+    l = x["low"].to_numpy(dtype=float) if "low" in x.columns else c
+    feats = feature_kernel(c, h, l, dtype=dtype)
+    x = pd.concat([x, pd.DataFrame(dict(zip(FEATURES, feats)), index=x.index)], axis=1)
+    return x.dropna()
+
+def build_features_reference(df, price_col="close"):
+    """The original pandas rolling/ewm implementation, kept as the reference that
+    feature_kernel is checked and benchmarked against."""
     x = df.copy().sort_index()
     c = x[price_col].astype(float)
     h = x.get("high", c)
@@ -66,11 +80,44 @@ def build_features(df, price_col="close"):
     x = x.dropna()
     return x
 
-def confidence_score(feat: pd.DataFrame):
+def build_features_panel(close: pd.DataFrame, high: pd.DataFrame = None, low: pd.DataFrame = None,
+                         dtype=np.float64):
+    """build_features for a whole universe: close/high/low are dates x tickers and every
+    feature is computed column-wise in one vectorized pass. Returns (feature, ticker)
+    MultiIndex columns on the full date index; NaN marks rows build_features would drop.
+    Tickers are grouped by which dates they have bars for (e.g. US vs ASX calendars) and each
+    group is computed on its own dates, so per-ticker values match build_features."""
+    c = close.sort_index().astype(float)
+    h = c if high is None else high.reindex(index=c.index, columns=c.columns).astype(float)
+    l = c if low is None else low.reindex(index=c.index, columns=c.columns).astype(float)
+    cv, hv, lv = c.to_numpy(), h.to_numpy(), l.to_numpy()
+    have = np.isfinite(cv)
+    groups = {}
+    for j in range(c.shape[1]):
+        groups.setdefault(have[:, j].tobytes(), []).append(j)
+
+    out = np.full((len(FEATURES),) + cv.shape, np.nan, dtype=dtype)
+    for cols in groups.values():
+        rows = np.flatnonzero(have[:, cols[0]])
+        feats = feature_kernel(cv[np.ix_(rows, cols)], hv[np.ix_(rows, cols)], lv[np.ix_(rows, cols)], dtype=dtype)
+        feats[:, np.isnan(feats).any(axis=0)] = np.nan
+        out[np.ix_(np.arange(len(FEATURES)), rows, cols)] = feats
+    columns = pd.MultiIndex.from_product([FEATURES, c.columns], names=["feature", "ticker"])
+    return pd.DataFrame(out.transpose(1, 0, 2).reshape(len(c), -1), index=c.index, columns=columns)
+
+def confidence_score(feat: pd.DataFrame, causal: bool = False, width_rank=None):
+    """Per-bar confidence in [0, 1]. Also accepts a build_features_panel frame and then
+    returns a dates x tickers frame (bb_width is ranked per ticker).
+    bb_width is ranked across the whole frame, which looks ahead; causal=True ranks each bar
+    among the bars up to it instead (what ConfidenceStream computes live). width_rank passes
+    in a rank computed elsewhere, e.g. over a history too large to hold in memory."""
+    if width_rank is None:
+        width = feat["bb_width"]
+        width_rank = width.expanding().rank(pct=True) if causal else width.rank(pct=True)
     score = 0.0
     score += np.tanh((feat["z_mom5"]).fillna(0)) * 0.35
     score += np.tanh((feat["macd_hist"]).fillna(0) * 5) * 0.25
-    score += np.tanh((0.5 - feat["bb_width"].rank(pct=True))*3) * 0.15
+    score += np.tanh((0.5 - width_rank)*3) * 0.15
     score += np.tanh(((feat["rsi14"]-50)/10)) * 0.15
     pen = np.tanh((feat["vol10"]/(feat["vol20"]+1e-9))*3 - 1)
     score -= pen.clip(lower=0) * 0.20
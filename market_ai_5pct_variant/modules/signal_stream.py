@@ -0,0 +1,286 @@
+# modules/signal_stream.py
+# Bar-at-a-time versions of the indicators in signal.py for live feeds (e.g. FinnhubWS).
+# Each update is O(1): EMA state, running sums and rolling Welford variance over fixed-size
+# ring buffers. Outputs match the batch functions once their windows are full; before that
+# they return None where the batch version has NaN. None/NaN inputs are bars without a
+# value, as in pandas: a window holding one gives None, an EMA carries its value across it.
+# Only ConfidenceStream's bb_width rank is not O(1) (see there).
+# tests/test_signal_stream.py checks every stream against signal.py.
+import bisect
+import math
+from collections import deque
+
+def _valid(x) -> bool:
+    return x is not None and not (isinstance(x, float) and math.isnan(x))
+
+def _num(x) -> float:
+    return float(x) if _valid(x) else math.nan
+
+class EMA:
+    """ewm(span=span, adjust=False).mean(), seeded with the first value. A missing value
+    repeats the last one; the next value weighs it by the decay over the whole gap."""
+
+    def __init__(self, span):
+        self.span = span
+        self.alpha = 2.0 / (span + 1.0)
+        self.value = None
+        self._gap = 0
+
+    def update(self, x):
+        if not _valid(x):
+            if self.value is not None:
+                self._gap += 1
+            return self.value
+        if self.value is None:
+            self.value = x
+        elif self._gap == 0:
+            self.value += self.alpha * (x - self.value)
+        else:
+            old = (1.0 - self.alpha) ** (self._gap + 1)
+            new = 1.0 - old if self.span == 3 else self.alpha   # pandas special-cases com == 1
+            self.value = (old * self.value + new * x) / (old + new)
+        self._gap = 0
+        return self.value
+
+class RollingStats:
+    """rolling(n).mean() / .std() (ddof=1) over a ring buffer, with Welford updates. A
+    missing value takes its slot in the window, which is not full until it has left."""
+
+    def __init__(self, n):
+        self.n = n
+        self.buf = [math.nan] * n
+        self.pos = 0
+        self.valid = 0      # values (not missing) in the window
+        self._mean = 0.0
+        self._m2 = 0.0
+
+    def _add(self, x):
+        self.valid += 1
+        d = x - self._mean
+        self._mean += d / self.valid
+        self._m2 += d * (x - self._mean)
+
+    def _remove(self, x):
+        self.valid -= 1
+        if self.valid == 0:
+            self._mean = self._m2 = 0.0
+            return
+        d = x - self._mean
+        self._mean -= d / self.valid
+        self._m2 -= d * (x - self._mean)
+
+    def update(self, x):
+        x = _num(x)
+        old = self.buf[self.pos]
+        if not math.isnan(old) and not math.isnan(x) and self.valid == self.n:
+            prev_mean = self._mean
+            self._mean += (x - old) / self.n
+            self._m2 += (x - old) * (x - self._mean + old - prev_mean)
+        else:
+            if not math.isnan(old):
+                self._remove(old)
+            if not math.isnan(x):
+                self._add(x)
+        self.buf[self.pos] = x
+        self.pos = (self.pos + 1) % self.n
+        return self
+
+    @property
+    def full(self) -> bool:
+        return self.valid == self.n
+
+    @property
+    def mean(self):
+        return self._mean if self.full else None
+
+    @property
+    def std(self):
+        if not self.full or self.n < 2:
+            return None
+        return math.sqrt(max(self._m2, 0.0) / (self.n - 1))
+
+class PctChange:
+    """pct_change(periods)."""
+
+    def __init__(self, periods=1):
+        self.hist = deque(maxlen=periods + 1)
+
+    def update(self, x):
+        x = _num(x)
+        self.hist.append(x)
+        if len(self.hist) < self.hist.maxlen:
+            return None
+        r = x / self.hist[0] - 1.0
+        return None if math.isnan(r) else r
+
+class RSI:
+    def __init__(self, length=14):
+        self.up = RollingStats(length)
+        self.down = RollingStats(length)
+        self.prev = None
+
+    def update(self, close):
+        close = _num(close)
+        if self.prev is not None:
+            delta = close - self.prev    # NaN next to a missing close, as diff() gives
+            self.up.update(math.nan if math.isnan(delta) else max(delta, 0.0))
+            self.down.update(math.nan if math.isnan(delta) else max(-delta, 0.0))
+        self.prev = close
+        if not self.up.full:
+            return None
+        rs = self.up.mean / (self.down.mean + 1e-12)
+        return 100 - (100 / (1 + rs))
+
+class MACD:
+    def __init__(self, fast=12, slow=26, signal=9):
+        self.fast = EMA(fast)
+        self.slow = EMA(slow)
+        self.signal = EMA(signal)
+
+    def update(self, close):
+        fast, slow = self.fast.update(close), self.slow.update(close)
+        if fast is None:
+            return None, None, None
+        line = fast - slow
+        sig = self.signal.update(line)
+        return line, sig, line - sig
+
+class Bollinger:
+    def __init__(self, length=20, mult=2):
+        self.stats = RollingStats(length)
+        self.mult = mult
+
+    def update(self, close):
+        self.stats.update(close)
+        if not self.stats.full:
+            return None
+        ma, sd = self.stats.mean, self.stats.std
+        upper = ma + self.mult * sd
+        lower = ma - self.mult * sd
+        bbp = (close - lower) / (upper - lower + 1e-12)
+        width = (upper - lower) / (ma + 1e-12)
+        return ma, upper, lower, bbp, width
+
+class ATR:
+    def __init__(self, length=14):
+        self.stats = RollingStats(length)
+        self.prev_close = None
+
+    def update(self, high, low, close):
+        high, low = _num(high), _num(low)
+        # Largest of the ranges that are defined, like max(axis=1) skipping NaN.
+        ranges = [high - low]
+        if self.prev_close is not None:
+            ranges += [abs(high - self.prev_close), abs(low - self.prev_close)]
+        ranges = [r for r in ranges if not math.isnan(r)]
+        self.prev_close = _num(close)
+        self.stats.update(max(ranges) if ranges else math.nan)
+        return self.stats.mean
+
+class FeatureStream:
+    """Incremental build_features: feed bars one at a time, get the feature row back once
+    every feature is defined (the rows build_features keeps after dropna)."""
+
+    def __init__(self, price_col="close"):
+        self.price_col = price_col
+        self.r1, self.r5, self.r20 = PctChange(1), PctChange(5), PctChange(20)
+        self.rsi = RSI(14)
+        self.macd = MACD()
+        self.bb = Bollinger(20, 2)
+        self.atr = ATR(14)
+        self.vol10, self.vol20 = RollingStats(10), RollingStats(20)
+        self.mom5, self.bbp100 = RollingStats(100), RollingStats(100)
+
+    def update(self, bar: dict):
+        c = _num(bar[self.price_col])
+        h = _num(bar.get("high", c))
+        l = _num(bar.get("low", c))
+        ret1, ret5, ret20 = self.r1.update(c), self.r5.update(c), self.r20.update(c)
+        rsi14 = self.rsi.update(c)
+        macd_line, macd_sig, macd_hist = self.macd.update(c)
+        bb = self.bb.update(c)
+        atr14 = self.atr.update(h, l, c)
+        vol10 = self.vol10.update(ret1).std
+        vol20 = self.vol20.update(ret1).std
+        z_mom5 = z_bbp = None
+        self.mom5.update(ret5)
+        if self.mom5.full:
+            z_mom5 = (ret5 - self.mom5.mean) / (self.mom5.std + 1e-9)
+        self.bbp100.update(bb[3] if bb else None)
+        if self.bbp100.full:
+            z_bbp = (bb[3] - self.bbp100.mean) / (self.bbp100.std + 1e-9)
+        feat = {
+            "ret1": ret1, "ret5": ret5, "ret20": ret20, "rsi14": rsi14,
+            "macd": macd_line, "macd_sig": macd_sig, "macd_hist": macd_hist,
+            "bbp": bb[3] if bb else None, "bb_width": bb[4] if bb else None,
+            "atr14": atr14, "vol10": vol10, "vol20": vol20, "z_mom5": z_mom5, "z_bbp": z_bbp,
+        }
+        # build_features drops rows with any NaN, the bar's own columns included.
+        if any(v is None for v in feat.values()) or any(isinstance(v, float) and math.isnan(v)
+                                                       for v in bar.values()):
+            return None
+        row = dict(bar)
+        row.update(feat)
+        return row
+
+class SortedBuckets:
+    """Sorted values kept in buckets of up to 2 * load, so an insert shifts O(load) items
+    rather than the whole history, and a rank sums O(n / load) bucket sizes."""
+
+    def __init__(self, load=512):
+        self.load = load
+        self.buckets = []
+        self.maxes = []     # last (largest) value of each bucket
+        self.size = 0
+
+    def add(self, x):
+        self.size += 1
+        if not self.buckets:
+            self.buckets.append([x])
+            self.maxes.append(x)
+            return
+        i = bisect.bisect_left(self.maxes, x)
+        if i == len(self.buckets):
+            i -= 1
+            self.buckets[i].append(x)
+            self.maxes[i] = x
+        else:
+            bisect.insort(self.buckets[i], x)
+        b = self.buckets[i]
+        if len(b) > 2 * self.load:
+            self.buckets[i:i + 1] = [b[:self.load], b[self.load:]]
+            self.maxes[i:i + 1] = [b[self.load - 1], b[-1]]
+
+    def count_below(self, x, inclusive=False) -> int:
+        """Values < x (<= x if inclusive)."""
+        find = bisect.bisect_right if inclusive else bisect.bisect_left
+        i = find(self.maxes, x)
+        n = sum(map(len, self.buckets[:i]))
+        if i < len(self.buckets):
+            n += find(self.buckets[i], x)
+        return n
+
+class ConfidenceStream:
+    """Incremental confidence_score. The batch version ranks bb_width across the frame it is
+    given; here the rank is over every row seen so far, i.e. confidence_score(..., causal=True)
+    for the features up to now. That rank is the only part that is not O(1): the past widths
+    sit in SortedBuckets, O(load + n / load) per bar instead of an O(n) list insert."""
+
+    def __init__(self):
+        self.widths = SortedBuckets()
+
+    def update(self, feat: dict) -> float:
+        w = feat["bb_width"]
+        self.widths.add(w)
+        lo = self.widths.count_below(w)
+        hi = self.widths.count_below(w, inclusive=True)
+        rank_pct = (lo + (hi - lo + 1) / 2.0) / self.widths.size
+        score = 0.0
+        score += math.tanh(feat["z_mom5"]) * 0.35
+        score += math.tanh(feat["macd_hist"] * 5) * 0.25
+        score += math.tanh((0.5 - rank_pct) * 3) * 0.15
+        score += math.tanh((feat["rsi14"] - 50) / 10) * 0.15
+        pen = math.tanh((feat["vol10"] / (feat["vol20"] + 1e-9)) * 3 - 1)
+        score -= max(pen, 0.0) * 0.20
+        conf = math.tanh(score) * 0.5 + 0.5
+        return min(max(conf, 0.0), 1.0)
@@ -28,39 +28,107 @@ class RiskManagedStrategy:
         scale = (self.vol_target_daily / realized_vol) if (realized_vol > 1e-6) else 1.0
         return max(0.0, min(base * scale, self.max_leverage))
 
-    def generate_positions(self, prices: pd.Series, features: pd.DataFrame):
+    def size_from_conf_and_vol(self, conf, realized_vol):
+        """Array version of _size_from_conf_and_vol (same result per element; NaN sizes to 0)."""
+        conf = np.asarray(conf, dtype=float)
+        realized_vol = np.asarray(realized_vol, dtype=float)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            scale = np.where(realized_vol > 1e-6, self.vol_target_daily / realized_vol, 1.0)
+        size = conf * self.max_leverage * scale
+        return np.where(np.isnan(size), 0.0, np.clip(size, 0.0, self.max_leverage))
+
+    def kelly_fraction(self, prob_up, r=1.2):
+        """_kelly_fraction clipped to [0, 1] for arrays; NaN maps to 1 like min(1.0, nan)."""
+        k = self._kelly_fraction(np.asarray(prob_up, dtype=float), r=r)
+        return np.where(np.isnan(k), 1.0, np.clip(k, 0.0, 1.0))
+
+    def position_size(self, conf, prob_up, realized_vol):
+        """Vol-targeted size capped by the Kelly fraction, elementwise over arrays."""
+        size = self.size_from_conf_and_vol(conf, realized_vol)
+        kelly = self.kelly_fraction(prob_up, r=1.2)
+        return np.minimum(size, (kelly * self.kelly_cap) * self.max_leverage + 1e-6)
+
+    def generate_positions(self, prices: pd.Series, features: pd.DataFrame, conf: pd.Series = None):
+        """prices may also be a dates x tickers frame with features from build_features_panel;
+        the result then has (field, ticker) columns. conf overrides confidence_score(features)."""
+        if isinstance(prices, pd.DataFrame):
+            return self._generate_positions_panel(prices, features)
         idx = features.index.intersection(prices.index)
         p = prices.loc[idx]
         f = features.loc[idx]
-        conf = confidence_score(f)
+        conf = confidence_score(f) if conf is None else conf.loc[idx]
         prob_up = (conf * 0.5 + 0.5).clip(0.5, 0.99)
         realized_vol = f["vol20"].fillna(f["vol10"]).fillna(0.01)
-        size = [self._size_from_conf_and_vol(float(c), float(v)) for c, v in zip(conf, realized_vol)]
-        kelly = [max(0.0, min(1.0, self._kelly_fraction(float(pu), r=1.2))) for pu in prob_up]
-        size = np.minimum(size, (np.array(kelly) * self.kelly_cap) * self.max_leverage + 1e-6)
+        size = self.position_size(conf.to_numpy(), prob_up.to_numpy(), realized_vol.to_numpy())
         out = pd.DataFrame({"close": p, "prob_up": prob_up.values, "conf": conf.values, "size": size}, index=p.index)
         return out
 
-    def backtest(self, df_ohlcv: pd.DataFrame, price_col="close"):
+    def _generate_positions_panel(self, prices: pd.DataFrame, features: pd.DataFrame):
+        idx = features.index.intersection(prices.index)
+        p = prices.loc[idx]
+        f = features.loc[idx]
+        conf = confidence_score(f).reindex(columns=p.columns)
+        prob_up = (conf * 0.5 + 0.5).clip(0.5, 0.99)
+        realized_vol = f["vol20"].fillna(f["vol10"]).fillna(0.01).reindex(columns=p.columns)
+        size = pd.DataFrame(self.position_size(conf.to_numpy(), prob_up.to_numpy(), realized_vol.to_numpy()),
+                            index=conf.index, columns=conf.columns).where(conf.notna())
+        return pd.concat({"close": p, "prob_up": prob_up, "conf": conf, "size": size}, axis=1)
+
+    def realized_returns(self, close, high, low, prev_close=None):
+        """Per-bar return with take-profit / stop-loss fills against the previous close (a
+        stop wins when both are hit). Inputs broadcast against the parameters, so (n, 1)
+        arrays with array-valued take_profit_pct / stop_loss_pct give one column per set.
+        prev_close defaults to the previous row of close."""
+        close, high, low = (np.asarray(a, dtype=float) for a in (close, high, low))
+        if prev_close is None:
+            prev_close = np.full(close.shape, np.nan)
+            prev_close[1:] = close[:-1]
+        else:
+            prev_close = np.asarray(prev_close, dtype=float)
+        ret = close / prev_close - 1
+        ret = np.where(np.isnan(ret), 0.0, ret)
+        up_hit = high >= prev_close * (1 + self.take_profit_pct)
+        dn_hit = low <= prev_close * (1 - self.stop_loss_pct)
+        return np.where(dn_hit, -self.stop_loss_pct, np.where(up_hit, self.take_profit_pct, ret))
+
+    def walk_forward(self, df_ohlcv: pd.DataFrame, train, test, step=None, price_col="close", params=None):
+        """Out-of-sample walk-forward mode of backtest (see modules.walkforward). Trades this
+        strategy's parameters unless params (e.g. sweep.param_grid()) is given, in which case
+        each fold re-selects the best set on its train window."""
+        from .walkforward import walk_forward
+        if params is None:
+            params = [dict(self.__dict__)]
+        return walk_forward(df_ohlcv, train, test, step, params=params, price_col=price_col)
+
+    def backtest_portfolio(self, panel: pd.DataFrame, price_col="close", **caps):
+        """Whole-universe backtest on a dates x (field, ticker) panel (see modules.portfolio)."""
+        from .portfolio import backtest_portfolio
+        return backtest_portfolio(self, panel, price_col=price_col, **caps)
+
+    def backtest_chunked(self, source, price_col="close", out_path=None, chunk_bars=None):
+        """Bounded-memory backtest streaming bars from disk (see modules.chunked)."""
+        from .chunked import backtest_chunked
+        return backtest_chunked(self, source, price_col=price_col, out_path=out_path, chunk_bars=chunk_bars)
+
+    def incremental(self, price_col="close"):
+        """Empty appendable backtest state for this strategy (see modules.incremental)."""
+        from .incremental import IncrementalBacktest
+        return IncrementalBacktest(self, price_col=price_col)
+
+    def backtest(self, df_ohlcv: pd.DataFrame, price_col="close", causal=False):
+        """causal=True ranks bb_width only over past bars (see confidence_score), which is
+        what a live / incremental run can reproduce."""
         data = df_ohlcv.copy().sort_index()
         f = build_features(data, price_col)
-        positions = self.generate_positions(data[price_col], f)
+        positions = self.generate_positions(data[price_col], f, conf=confidence_score(f, causal=True) if causal else None)
 
         o = data.get("open", data[price_col])
         h = data.get("high", data[price_col])
         l = data.get("low", data[price_col])
-        c = data[price_col]
 
-        df = positions.join(pd.DataFrame({"open":o, "high":h, "low":l, "close":c}), how="inner")
+        df = positions.join(pd.DataFrame({"open":o, "high":h, "low":l}), how="inner")
         df["ret_bar"] = df["close"].pct_change().fillna(0)
-
-        prev_close = df["close"].shift(1)
-        up_hit = (df["high"] >= prev_close * (1 + self.take_profit_pct))
-        dn_hit = (df["low"]  <= prev_close * (1 - self.stop_loss_pct))
-
-        realized = df["ret_bar"].copy()
-        realized[up_hit] = self.take_profit_pct
-        realized[dn_hit] = -self.stop_loss_pct
+        realized = self.realized_returns(df["close"], df["high"], df["low"])
 
         df["pnl"] = df["size"].shift(1).fillna(0) * realized
         df["equity"] = (1 + df["pnl"]).cumprod()
@@ -0,0 +1,189 @@
+# modules/sweep.py
+# Parameter sweeps for RiskManagedStrategy. Features, confidence and realized vol do not
+# depend on the strategy parameters, so prepare() computes them once per dataset and
+# evaluate() scores a whole block of parameter sets as (sets x bars) matrix operations.
+# sweep() spreads blocks over a process pool and returns the backtest summary metrics as a
+# ranked table.
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from .signal import build_features, confidence_score
+from .strategy import RiskManagedStrategy
+
+PARAMS = ["vol_target_daily", "max_leverage", "stop_loss_pct", "take_profit_pct", "kelly_cap"]
+METRICS = ["final_equity", "weekly_mean", "weekly_median", "weekly_p05", "weekly_p95", "sharpe_daily", "hit_rate"]
+
+DEFAULT_GRID = {
+    "vol_target_daily": [0.008, 0.010, 0.012, 0.015, 0.020],
+    "max_leverage": [1.0, 1.5, 2.0, 2.5],
+    "stop_loss_pct": [0.01, 0.015, 0.02, 0.03],
+    "take_profit_pct": [0.02, 0.03, 0.04, 0.06],
+    "kelly_cap": [0.3, 0.5, 0.6, 0.8],
+}
+
+SWEEP_WORKERS = int(os.getenv("SWEEP_WORKERS", "0"))  # 0 = os.cpu_count()
+# Rough memory budget for one block of (sets x bars) matrices.
+SWEEP_BLOCK_MB = float(os.getenv("SWEEP_BLOCK_MB", "256"))
+
+def param_grid(grid: dict = None, **base) -> list:
+    """Every combination of the value lists in grid (default DEFAULT_GRID); keys in base are
+    fixed values applied to each set."""
+    grid = DEFAULT_GRID if grid is None else grid
+    keys = list(grid)
+    return [{**base, **dict(zip(keys, values))} for values in itertools.product(*(grid[k] for k in keys))]
+
+def sample_params(n: int, space: dict = None, seed: int = 0, **base) -> list:
+    """n random parameter sets. space maps a name to a (low, high) range sampled uniformly,
+    or to a list sampled from; default is the DEFAULT_GRID ranges."""
+    if space is None:
+        space = {k: (min(v), max(v)) for k, v in DEFAULT_GRID.items()}
+    rng = np.random.default_rng(seed)
+    cols = {}
+    for k, spec in space.items():
+        if isinstance(spec, tuple):
+            cols[k] = rng.uniform(spec[0], spec[1], n)
+        else:
+            cols[k] = np.asarray(spec)[rng.integers(0, len(spec), n)]
+    return [{**base, **{k: float(v[i]) for k, v in cols.items()}} for i in range(n)]
+
+def week_bins(index: pd.DatetimeIndex):
+    """Bar positions closing each weekly bin, as backtest's resample("W-FRI").last(); a
+    weekly return exists where two consecutive bins both have bars. Returns (end, prev)."""
+    last = pd.Series(np.arange(len(index), dtype=float), index=index).resample("W-FRI").last().to_numpy()
+    both = ~np.isnan(last[1:]) & ~np.isnan(last[:-1])
+    return last[1:][both].astype(int), last[:-1][both].astype(int)
+
+def prepare(ohlcv: pd.DataFrame, price_col: str = "close", causal: bool = False) -> dict:
+    """Everything RiskManagedStrategy.backtest computes that does not depend on its
+    parameters, as arrays aligned on the backtest bars. causal=True uses the expanding
+    bb_width rank in confidence_score, so any slice only depends on bars up to its end."""
+    data = ohlcv.sort_index()
+    f = build_features(data, price_col)
+    idx = f.index.intersection(data.index)
+    f = f.loc[idx]
+    c = data[price_col].loc[idx].astype(float)
+    conf = confidence_score(f, causal=causal)
+    prob_up = (conf * 0.5 + 0.5).clip(0.5, 0.99)
+    realized_vol = f["vol20"].fillna(f["vol10"]).fillna(0.01)
+    week_end, week_prev = week_bins(idx)
+    return {
+        "index": idx,
+        "close": c.to_numpy(),
+        "high": data.get("high", data[price_col]).loc[idx].to_numpy(dtype=float),
+        "low": data.get("low", data[price_col]).loc[idx].to_numpy(dtype=float),
+        "conf": conf.to_numpy(dtype=float),
+        "prob_up": prob_up.to_numpy(dtype=float),
+        "realized_vol": realized_vol.to_numpy(dtype=float),
+        "week_end": week_end,
+        "week_prev": week_prev,
+    }
+
+BAR_FIELDS = ["close", "high", "low", "conf", "prob_up", "realized_vol"]
+
+def slice_context(ctx: dict, start: int, stop: int) -> dict:
+    """ctx restricted to bars [start, stop), as if prepare() had produced only those bars
+    (the features themselves still see the history before start)."""
+    out = {k: ctx[k][start:stop] for k in BAR_FIELDS}
+    out["index"] = ctx["index"][start:stop]
+    out["week_end"], out["week_prev"] = week_bins(out["index"])
+    return out
+
+SIZE_PARAMS = ["vol_target_daily", "max_leverage", "kelly_cap"]
+EXIT_PARAMS = ["take_profit_pct", "stop_loss_pct"]
+
+def _unique_strategy(values: np.ndarray, names: list):
+    # Distinct parameter rows as one strategy whose attributes are (m, 1) arrays, so its
+    # methods broadcast 1-D bar arrays to (m, bars); inverse maps each set to its row.
+    uniq, inverse = np.unique(values, axis=0, return_inverse=True)
+    kwargs = {k: uniq[:, [j]] for j, k in enumerate(names)}
+    return RiskManagedStrategy(**kwargs), inverse.reshape(-1)
+
+def pnl_matrix(ctx: dict, params: list) -> np.ndarray:
+    """Per-bar pnl of backtest for each parameter set, shape (sets, bars)."""
+    n = len(ctx["close"])
+    defaults = RiskManagedStrategy().__dict__
+    table = np.array([[p.get(k, defaults[k]) for k in PARAMS] for p in params], dtype=float).reshape(-1, len(PARAMS))
+    # Sizes depend only on the sizing parameters and fills only on the exit levels, so each
+    # distinct combination is computed once.
+    sizer, size_of = _unique_strategy(table[:, [PARAMS.index(k) for k in SIZE_PARAMS]], SIZE_PARAMS)
+    exits, exit_of = _unique_strategy(table[:, [PARAMS.index(k) for k in EXIT_PARAMS]], EXIT_PARAMS)
+    size = sizer.position_size(ctx["conf"], ctx["prob_up"], ctx["realized_vol"])
+    realized = exits.realized_returns(ctx["close"], ctx["high"], ctx["low"])
+    pnl = np.zeros((len(params), n))
+    if n > 1:
+        np.multiply(size[size_of, :-1], realized[exit_of, 1:], out=pnl[:, 1:])
+    return pnl
+
+def summarize(pnl: np.ndarray, week_end: np.ndarray, week_prev: np.ndarray) -> pd.DataFrame:
+    """backtest's summary dict for each row of a (sets, bars) pnl matrix."""
+    sets, n = pnl.shape
+    if n == 0:
+        return pd.DataFrame(columns=["bars"] + METRICS, index=range(sets), dtype=float)
+    # (sets, bars) layout keeps the cumulative product contiguous.
+    equity = np.cumprod(1 + pnl, axis=1)
+    wk = equity[:, week_end] / equity[:, week_prev] - 1
+    has_wk = wk.shape[1] > 0
+    zeros = np.zeros(sets)
+    std = pnl.std(axis=1, ddof=1) if n > 1 else np.full(sets, np.nan)
+    mean = pnl.mean(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sharpe = np.where(std > 0, np.sqrt(252) * (mean / (std + 1e-12)), 0.0)
+    return pd.DataFrame({
+        "bars": n,
+        "final_equity": equity[:, -1],
+        "weekly_mean": wk.mean(axis=1) if has_wk else zeros,
+        "weekly_median": np.median(wk, axis=1) if has_wk else zeros,
+        "weekly_p05": np.quantile(wk, 0.05, axis=1) if has_wk else zeros,
+        "weekly_p95": np.quantile(wk, 0.95, axis=1) if has_wk else zeros,
+        "sharpe_daily": sharpe,
+        "hit_rate": (pnl > 0).mean(axis=1),
+    })
+
+def evaluate(ctx: dict, params: list) -> pd.DataFrame:
+    """Backtest summary metrics for each parameter set (one row per set, in order)."""
+    if not params:
+        return pd.DataFrame(columns=["bars"] + METRICS, dtype=float)
+    return summarize(pnl_matrix(ctx, params), ctx["week_end"], ctx["week_prev"])
+
+def best_params(ctx: dict, params: list, rank_by: str = "sharpe_daily", block: int = None):
+    """Serial sweep over one context: (best parameter set, its metrics row)."""
+    parts = [evaluate(ctx, b) for b in _blocks(params, len(ctx["close"]), block)]
+    scores = pd.concat(parts, ignore_index=True)
+    i = int(np.argmax(np.nan_to_num(scores[rank_by].to_numpy(dtype=float), nan=-np.inf)))
+    return params[i], scores.iloc[i]
+
+_ctx = None
+
+def _init_worker(ctx):
+    global _ctx
+    _ctx = ctx
+
+def _evaluate_block(params):
+    return evaluate(_ctx, params)
+
+def _blocks(params: list, n_bars: int, block: int = None) -> list:
+    if block is None:
+        # About four (sets x bars) float64 matrices are alive at once inside evaluate().
+        block = max(1, int(SWEEP_BLOCK_MB * 1e6 / (32 * max(n_bars, 1))))
+    return [params[i:i + block] for i in range(0, len(params), block)]
+
+def sweep(ohlcv: pd.DataFrame, params: list = None, price_col: str = "close", rank_by: str = "sharpe_daily",
+          workers: int = None, block: int = None) -> pd.DataFrame:
+    """Evaluate params (default: param_grid()) on one OHLCV history. Returns one row per set
+    with the parameter and summary columns, best `rank_by` first."""
+    params = param_grid() if params is None else list(params)
+    ctx = prepare(ohlcv, price_col)
+    blocks = _blocks(params, len(ctx["close"]), block)
+    workers = SWEEP_WORKERS if workers is None else workers
+    workers = min(workers or os.cpu_count() or 1, len(blocks))
+    if workers <= 1:
+        parts = [evaluate(ctx, b) for b in blocks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(ctx,)) as pool:
+            parts = list(pool.map(_evaluate_block, blocks))
+    defaults = RiskManagedStrategy().__dict__
+    table = pd.DataFrame([{k: p.get(k, defaults[k]) for k in PARAMS} for p in params])
+    table = pd.concat([table, pd.concat(parts, ignore_index=True)], axis=1)
+    return table.sort_values(rank_by, ascending=False, kind="stable").reset_index(drop=True)
@@ -0,0 +1,98 @@
+# modules/walkforward.py
+# Walk-forward backtest for RiskManagedStrategy: on each fold the parameter set with the
+# best in-sample score on the train window is traded on the following test window, and the
+# test windows are stitched into one out-of-sample equity curve. Features are causal, so
+# they are computed once over the whole history and each fold reads its slice; confidence
+# uses the expanding bb_width rank so no fold sees bars after its own test window.
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from .sweep import PARAMS, METRICS, SWEEP_WORKERS, best_params, param_grid, pnl_matrix, prepare, slice_context, summarize, week_bins
+
+def _to_bars(index: pd.DatetimeIndex, length, origin: int = 0) -> int:
+    # int lengths are bar counts; strings / Timedeltas are converted from `origin` onwards.
+    if isinstance(length, (int, np.integer)):
+        return int(length)
+    stop = index[origin] + pd.Timedelta(length)
+    return int(index.searchsorted(stop, side="left")) - origin
+
+def folds(index: pd.DatetimeIndex, train, test, step=None) -> list:
+    """(train_start, train_stop, test_start, test_stop) bar positions for each fold. Lengths
+    are bar counts or time spans ("60D"); step defaults to the test length, so test windows
+    tile the history. The last test window may be shorter."""
+    step = test if step is None else step
+    n = len(index)
+    out, start = [], 0
+    while start < n:
+        train_stop = start + _to_bars(index, train, start)
+        if train_stop >= n:
+            break
+        test_stop = min(n, train_stop + _to_bars(index, test, train_stop))
+        out.append((start, train_stop, train_stop, test_stop))
+        start += max(1, _to_bars(index, step, start))
+    return out
+
+_ctx = None
+
+def _init_worker(ctx):
+    global _ctx
+    _ctx = ctx
+
+def _run_fold(args):
+    return run_fold(_ctx, *args)
+
+def run_fold(ctx: dict, bounds: tuple, params: list, rank_by: str = "sharpe_daily"):
+    """Pick the best set on the train slice and trade it on the test slice. Returns (fold
+    row, test pnl). The test slice starts one bar early so the first test bar carries the
+    position sized at the last train bar, as a continuous backtest would."""
+    train_start, train_stop, test_start, test_stop = bounds
+    chosen, train_row = best_params(slice_context(ctx, train_start, train_stop), params, rank_by)
+    test = slice_context(ctx, test_start - 1, test_stop)
+    pnl = pnl_matrix(test, [chosen])[:, 1:]
+    end, prev = week_bins(test["index"][1:])
+    test_row = summarize(pnl, end, prev).iloc[0]
+    row = {
+        "train_start": ctx["index"][train_start], "train_end": ctx["index"][train_stop - 1],
+        "test_start": ctx["index"][test_start], "test_end": ctx["index"][test_stop - 1],
+        **{k: chosen.get(k) for k in PARAMS},
+        f"train_{rank_by}": float(train_row[rank_by]),
+        "test_bars": int(test_row["bars"]),
+        **{f"test_{k}": float(test_row[k]) for k in METRICS},
+    }
+    return row, pnl[0]
+
+def walk_forward(ohlcv: pd.DataFrame, train, test, step=None, params: list = None, price_col: str = "close",
+                 rank_by: str = "sharpe_daily", workers: int = None):
+    """Walk-forward backtest. params defaults to sweep.param_grid(); a single-element list
+    gives a fixed-parameter walk-forward. Returns (oos, folds, summary): the stitched
+    out-of-sample bars with pnl/equity/fold, one row per fold, and backtest's summary
+    metrics for the stitched curve. Overlapping test windows (step < test) keep the bars
+    of the earlier fold."""
+    params = param_grid() if params is None else list(params)
+    ctx = prepare(ohlcv, price_col, causal=True)
+    bounds = folds(ctx["index"], train, test, step)
+    if not bounds:
+        raise ValueError("history too short for one train/test fold")
+    workers = SWEEP_WORKERS if workers is None else workers
+    workers = min(workers or os.cpu_count() or 1, len(bounds))
+    if workers <= 1:
+        results = [run_fold(ctx, b, params, rank_by) for b in bounds]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(ctx,)) as pool:
+            results = list(pool.map(_run_fold, [(b, params, rank_by) for b in bounds]))
+
+    parts, covered = [], 0
+    for k, ((_, _, test_start, test_stop), (_, pnl)) in enumerate(zip(bounds, results)):
+        lo = max(test_start, covered)
+        if lo < test_stop:
+            parts.append(pd.DataFrame({"fold": k, "pnl": pnl[lo - test_start:]}, index=ctx["index"][lo:test_stop]))
+            covered = test_stop
+    oos = pd.concat(parts)
+    oos["close"] = pd.Series(ctx["close"], index=ctx["index"]).loc[oos.index]
+    oos["equity"] = (1 + oos["pnl"]).cumprod()
+    end, prev = week_bins(oos.index)
+    summary = summarize(oos["pnl"].to_numpy()[None, :], end, prev).iloc[0].to_dict()
+    summary["bars"] = int(summary["bars"])
+    summary["folds"] = len(bounds)
+    return oos, pd.DataFrame([row for row, _ in results]), summary
@@ -0,0 +1,5 @@
+# Tests import the bundle's modules package the way the app and notebooks do.
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,26 @@
+import numpy as np
+import pandas as pd
+import pytest
+from modules.strategy import RiskManagedStrategy
+
+def _bars_with_gaps(n=12000, seed=5):
+    rng = np.random.default_rng(seed)
+    c = 100 * np.exp(np.cumsum(rng.normal(0, 0.004, n)))
+    df = pd.DataFrame({"open": c, "high": c * 1.003, "low": c * 0.997, "close": c},
+                      index=pd.date_range("2020-01-01", periods=n, freq="h"))
+    # Long NaN-free runs crossing chunk boundaries, a gap on a boundary, and short runs.
+    for start, length in [(100, 2), (2047, 3), (3000, 1), (7001, 4)] + [(s, 2) for s in range(9000, 11000, 97)]:
+        df.iloc[start:start + length, df.columns.get_loc("close")] = np.nan
+    return df
+
+@pytest.mark.parametrize("chunk_bars", [2048, 5000])
+def test_chunked_matches_in_memory_with_nan_gaps(tmp_path, chunk_bars):
+    df = _bars_with_gaps()
+    strategy = RiskManagedStrategy()
+    ref, ref_summary = strategy.backtest(df)
+    out = str(tmp_path / "rows.parquet")
+    summary = strategy.backtest_chunked(df, out_path=out, chunk_bars=chunk_bars)
+    rows = pd.read_parquet(out)
+    assert rows.index.equals(ref.index)
+    assert np.array_equal(rows[ref.columns].to_numpy(), ref.to_numpy())
+    assert summary == ref_summary
@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+from modules.hi_target_predictor import HI_TARGET_PARAMS, run_hi_target_strategy_incremental
+from modules.incremental import IncrementalBacktest
+from modules.strategy import RiskManagedStrategy
+
+def _closes(n=600, seed=7):
+    rng = np.random.default_rng(seed)
+    idx = pd.bdate_range("2022-01-03", periods=n)
+    return pd.Series(100 * np.exp(np.cumsum(rng.normal(0, 0.015, n))), index=idx)
+
+def _app_ohlcv(close):
+    # What market_ai_fixed_app builds from a Date + Close download.
+    ohlcv = pd.DataFrame({"close": close})
+    ohlcv["open"] = ohlcv["close"].shift(1).fillna(ohlcv["close"])
+    ohlcv["high"] = ohlcv[["open", "close"]].max(axis=1)
+    ohlcv["low"] = ohlcv[["open", "close"]].min(axis=1)
+    return ohlcv
+
+def _count_resets(monkeypatch):
+    calls = []
+    reset = IncrementalBacktest.reset
+    monkeypatch.setattr(IncrementalBacktest, "reset", lambda self: (calls.append(1), reset(self))[1])
+    return calls
+
+def test_moving_download_window_stays_incremental(tmp_path, monkeypatch):
+    close = _closes()
+    resets = _count_resets(monkeypatch)
+    seen = []
+    for end in range(350, 360):
+        ohlcv = _app_ohlcv(close.iloc[end - 250:end])   # ~365 calendar days, fewer than WINDOW_BARS
+        seen.append(ohlcv if not seen else ohlcv.iloc[-1:])
+        bt_df, summary = run_hi_target_strategy_incremental(ohlcv, "AAPL", state_dir=str(tmp_path))
+    assert resets == []
+    ref, ref_summary = RiskManagedStrategy(**HI_TARGET_PARAMS).backtest(pd.concat(seen), causal=True)
+    assert len(bt_df) == len(ref)
+    np.testing.assert_allclose(bt_df[ref.columns].to_numpy(), ref.to_numpy(), rtol=1e-9, atol=1e-12)
+    assert summary["bars"] == ref_summary["bars"]
+
+def test_back_adjusted_history_starts_over(tmp_path, monkeypatch):
+    ohlcv = _app_ohlcv(_closes())
+    run_hi_target_strategy_incremental(ohlcv.iloc[:400], "AAPL", state_dir=str(tmp_path))
+    resets = _count_resets(monkeypatch)
+    adjusted = ohlcv.iloc[:401].copy()
+    adjusted.iloc[:390] *= 0.5                          # a 2:1 split with ex-date inside the window
+    bt_df, _ = run_hi_target_strategy_incremental(adjusted, "AAPL", state_dir=str(tmp_path))
+    assert resets == [1]
+    ref, _ = RiskManagedStrategy(**HI_TARGET_PARAMS).backtest(adjusted, causal=True)
+    np.testing.assert_allclose(bt_df[ref.columns].to_numpy(), ref.to_numpy(), rtol=1e-9, atol=1e-12)
+
+def test_checkpoint_round_trip(tmp_path):
+    ohlcv = _app_ohlcv(_closes())
+    path = str(tmp_path / "x.pkl")
+    state = IncrementalBacktest(RiskManagedStrategy())
+    state.append(ohlcv.iloc[:300])
+    for i in range(300, 320):
+        state.append(ohlcv.iloc[i:i + 1])
+        assert state.save(path)
+    assert not state.save(path)                         # unchanged: nothing written
+    loaded = IncrementalBacktest.load(path)
+    loaded.rollback()                                   # the last append survives the checkpoint
+    loaded.sync(ohlcv.iloc[:330])
+    ref, ref_summary = RiskManagedStrategy().backtest(ohlcv.iloc[:330], causal=True)
+    np.testing.assert_allclose(loaded.frame[ref.columns].to_numpy(), ref.to_numpy(), rtol=1e-9, atol=1e-12)
+    assert loaded.widths == sorted(loaded.widths) and len(loaded.widths) == ref_summary["bars"]
+    summary = loaded.summary()
+    for k, v in ref_summary.items():
+        assert np.isclose(summary[k], v, rtol=1e-9, atol=1e-12), k
@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+import pytest
+from modules import signal
+from modules.signal_stream import (ATR, EMA, MACD, RSI, Bollinger, ConfidenceStream, FeatureStream, PctChange,
+                                   RollingStats, SortedBuckets)
+
+TOL = dict(rtol=1e-7, atol=1e-8)
+
+@pytest.fixture(scope="module")
+def bars():
+    rng = np.random.default_rng(7)
+    n = 1200
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    df = pd.DataFrame({"open": close, "close": close,
+                       "high": close * (1 + rng.uniform(0, 0.004, n)),
+                       "low": close * (1 - rng.uniform(0, 0.004, n))},
+                      index=pd.date_range("2024-01-01", periods=n, freq="min"))
+    # Missing closes: one at the start, short gaps later on.
+    for start, length in [(0, 1), (300, 1), (301, 2), (640, 3), (1000, 1)]:
+        df.iloc[start:start + length, df.columns.get_loc("close")] = np.nan
+    return df
+
+def _stream(values):
+    # Stream outputs with None -> NaN, shaped like the batch result.
+    return np.array([np.nan if v is None else v for v in values], dtype=float)
+
+def _assert_same(stream, batch):
+    batch = np.asarray(batch, dtype=float)
+    np.testing.assert_array_equal(np.isnan(stream), np.isnan(batch))
+    np.testing.assert_allclose(stream, batch, **TOL)
+
+def test_ema_rolling_pct_change(bars):
+    c = bars["close"]
+    ema, stats, pct = EMA(9), RollingStats(20), PctChange(5)
+    out = [(ema.update(x), stats.update(x).mean, stats.std, pct.update(x)) for x in c]
+    _assert_same(_stream(o[0] for o in out), c.ewm(span=9, adjust=False).mean())
+    _assert_same(_stream(o[1] for o in out), c.rolling(20).mean())
+    _assert_same(_stream(o[2] for o in out), c.rolling(20).std())
+    _assert_same(_stream(o[3] for o in out), c.pct_change(5))
+
+def test_indicators(bars):
+    c, h, l = bars["close"], bars["high"], bars["low"]
+    rsi, macd, bb, atr = RSI(14), MACD(), Bollinger(20, 2), ATR(14)
+    rsi_out, macd_out, bb_out, atr_out = [], [], [], []
+    for close, high, low in zip(c, h, l):
+        rsi_out.append(rsi.update(close))
+        macd_out.append(macd.update(close))
+        bb_out.append(bb.update(close) or (None,) * 5)
+        atr_out.append(atr.update(high, low, close))
+    _assert_same(_stream(rsi_out), signal.rsi(c, 14))
+    for i, batch in enumerate(signal.macd(c)):
+        _assert_same(_stream(o[i] for o in macd_out), batch)
+    for i, batch in enumerate(signal.bollinger(c, 20, 2)):
+        _assert_same(_stream(o[i] for o in bb_out), batch)
+    _assert_same(_stream(atr_out), signal.atr(h, l, c, 14))
+
+def test_features_and_confidence(bars):
+    batch = signal.build_features(bars)
+    fs, cs = FeatureStream(), ConfidenceStream()
+    rows, confs = [], []
+    for ts, bar in bars.iterrows():
+        row = fs.update(bar.to_dict())
+        if row is not None:
+            rows.append(pd.Series(row, name=ts))
+            confs.append(cs.update(row))
+    stream = pd.DataFrame(rows)
+    assert stream.index.equals(batch.index)
+    np.testing.assert_allclose(stream[batch.columns].to_numpy(dtype=float), batch.to_numpy(), **TOL)
+    np.testing.assert_allclose(confs, signal.confidence_score(batch, causal=True).to_numpy(), **TOL)
+
+def test_sorted_buckets_rank():
+    rng = np.random.default_rng(3)
+    values = np.round(rng.normal(size=5000), 2)      # plenty of ties
+    sb, seen = SortedBuckets(load=8), []
+    for x in values:
+        sb.add(x)
+        seen.append(x)
+        ref = np.sort(seen)
+        assert sb.count_below(x) == np.searchsorted(ref, x, "left")
+        assert sb.count_below(x, inclusive=True) == np.searchsorted(ref, x, "right")
+    assert [v for b in sb.buckets for v in b] == sorted(values)
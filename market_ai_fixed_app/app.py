@@ -4,11 +4,11 @@ import re
 import pandas as pd
 import streamlit as st
 from dotenv import load_dotenv
-from modules.hi_target_predictor import run_hi_target_strategy
+from modules.hi_target_predictor import run_hi_target_strategy_incremental
 import pandas as pd
 from intent_hotfix_top_gainers.tools_additions import handle_top_gainer_query
 from modules.predictor import predict_direction
-from tools import _download_yf
+from tools import _download_yf, download_panel
 import re
 
 
@@ -164,7 +164,8 @@ if user_text:
         # Intent: predict highest riser today / top gainer today / biggest mover
 text = (user_text or "").strip()
 if re.search(r"(highest\s+riser|top\s+gainer|biggest\s+mover)", text, re.I):
-    answer = handle_top_gainer_query(_download_yf, predict_direction, limit=10, horizon_days=7)
+    answer = handle_top_gainer_query(_download_yf, predict_direction, limit=10, horizon_days=7,
+                                     panel_fn=download_panel)
     st.session_state.history.append(("assistant", answer))
     st.chat_message("assistant").markdown(answer)
     st.stop()  # prevents sending to the general LLM handler
@@ -201,7 +202,7 @@ ohlcv["high"]  = ohlcv[["open","close"]].max(axis=1)
 ohlcv["low"]   = ohlcv[["open","close"]].min(axis=1)
 
 # Run the high-target strategy (aiming for larger moves)
-bt_df, summary = run_hi_target_strategy(ohlcv, horizon_days=7, price_col="close")
+bt_df, summary = run_hi_target_strategy_incremental(ohlcv, key=ticker, price_col="close")
 
 st.subheader("Aggressive Strategy (larger-move targeting)")
 st.write(
@@ -0,0 +1,111 @@
+# modules/forecast_fallback.py
+# Prophet-free forecaster: log-normal drift with exponentially weighted drift/volatility.
+# Same result contract as tools.forecast, fits in milliseconds, and the batch form takes a
+# whole dates x tickers close matrix (e.g. tools.download_panel(...)["Close"]) in one pass.
+import numpy as np
+import pandas as pd
+
+LOOKBACK = 250        # bars of history used for drift/vol
+HALFLIFE = 60         # exponential weighting half-life in bars (None = equal weights)
+MIN_RETURNS = 20
+Z_INTERVAL = 1.2815515655446004  # 80% band, matching Prophet's default interval_width
+
+def horizon_days(horizon: str) -> int:
+    h = (horizon or "").lower().strip()
+    if h in ["today", "1d", "1 day"]:
+        return 1
+    if "week" in h or h in ["7d", "7 days"]:
+        return 7
+    if "month" in h or h in ["30d", "30 days"]:
+        return 30
+    return 7
+
+def prob_up_from_bands(current, pred, lower, upper):
+    """Vectorized version of the per-day prob_up heuristic used by tools.forecast,
+    averaged over the horizon (axis 0)."""
+    current = np.asarray(current, dtype=float)
+    p = (0.5 + 0.2 * (pred > current) + 0.2 * (lower > current * 0.995)
+         + 0.1 * (upper > current * 1.01))
+    return np.clip(p, 0.0, 1.0).mean(axis=0)
+
+def lognormal_bands(closes, days: int, lookback: int = LOOKBACK, halflife=HALFLIFE):
+    """closes: (n, k) array, NaN where a ticker has no bar. Returns s0 (k,), pred/lower/upper
+    (days, k) and the number of returns used per ticker."""
+    closes = np.asarray(closes, dtype=float)
+    if closes.ndim == 1:
+        closes = closes[:, None]
+    window = closes[-(lookback + 1):]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        r = np.diff(np.log(window), axis=0)
+    m = r.shape[0]
+    if halflife:
+        w = 0.5 ** ((m - 1 - np.arange(m)) / halflife)
+    else:
+        w = np.ones(m)
+    ok = np.isfinite(r)
+    wr = np.where(ok, w[:, None], 0.0)
+    wsum = wr.sum(axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mu = (np.where(ok, r, 0.0) * wr).sum(axis=0) / wsum
+        var = (np.where(ok, r - mu, 0.0) ** 2 * wr).sum(axis=0) / wsum
+    sigma = np.sqrt(var)
+
+    finite = np.isfinite(closes)
+    last_pos = closes.shape[0] - 1 - np.argmax(finite[::-1], axis=0)
+    s0 = closes[last_pos, np.arange(closes.shape[1])]
+
+    t = np.arange(1, days + 1, dtype=float)[:, None]
+    center = mu * t
+    spread = Z_INTERVAL * sigma * np.sqrt(t)
+    pred = s0 * np.exp(center)
+    lower = s0 * np.exp(center - spread)
+    upper = s0 * np.exp(center + spread)
+    return s0, pred, lower, upper, ok.sum(axis=0)
+
+def forecast_batch(closes: pd.DataFrame, horizon: str = "7d") -> dict:
+    """closes: dates x tickers. Returns {ticker: result} shaped like tools.forecast."""
+    days = horizon_days(horizon)
+    closes = closes.sort_index()
+    s0, pred, lower, upper, n_ret = lognormal_bands(closes.to_numpy(dtype=float), days)
+    expected = (pred.mean(axis=0) - s0) / s0 * 100.0
+    prob_up = prob_up_from_bands(s0, pred, lower, upper)
+    values = closes.to_numpy(dtype=float)
+
+    out, date_labels = {}, {}
+    for j, ticker in enumerate(closes.columns):
+        if n_ret[j] < MIN_RETURNS or not np.isfinite(s0[j]):
+            out[ticker] = {"ok": False, "error": f"Not enough history for {ticker}"}
+            continue
+        last_date = closes.index[np.flatnonzero(np.isfinite(values[:, j]))[-1]]
+        if last_date not in date_labels:
+            future = pd.date_range(pd.Timestamp(last_date) + pd.Timedelta(days=1), periods=days, freq="D")
+            date_labels[last_date] = future.strftime("%Y-%m-%d").tolist()
+        dates = date_labels[last_date]
+        out[ticker] = {
+            "ok": True,
+            "ticker": ticker,
+            "horizon_days": days,
+            "current_price": round(float(s0[j]), 4),
+            "expected_return_pct": round(float(expected[j]), 3),
+            "prob_up": round(float(prob_up[j]), 2),
+            "forecast": [
+                {"date": d, "pred": float(p), "lower": float(lo), "upper": float(hi)}
+                for d, p, lo, hi in zip(dates, pred[:, j], lower[:, j], upper[:, j])
+            ],
+            "model": "lognormal_drift",
+        }
+    return out
+
+def forecast_from_history(ticker: str, hist: pd.DataFrame, horizon: str = "7d") -> dict:
+    """hist: the Date + Close frame returned by tools._download_yf."""
+    if hist is None or hist.empty or "Close" not in hist.columns:
+        return {"ok": False, "error": f"No historical data for {ticker}"}
+    df = hist.set_index("Date") if "Date" in hist.columns else hist
+    closes = df[["Close"]].astype(float).rename(columns={"Close": ticker})
+    return forecast_batch(closes, horizon)[ticker]
+
+def forecast(ticker: str, horizon: str = "7d", hist: pd.DataFrame = None) -> dict:
+    if hist is None:
+        from tools import _download_yf
+        hist = _download_yf(ticker, 500)
+    return forecast_from_history(ticker, hist, horizon)
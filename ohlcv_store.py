@@ -0,0 +1,239 @@
+
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+import pandas as pd
+
+STORE_DIR = os.getenv("OHLCV_STORE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".ohlcv_store"))
+REFRESH_SECONDS = float(os.getenv("OHLCV_STORE_REFRESH_SECONDS", "900"))
+# Weekends/holidays mean the first stored bar can sit a few days after the requested start.
+BACKFILL_SLACK = timedelta(days=7)
+# Incremental fetches re-read this many stored bars; if the provider's values for them moved
+# (a split / dividend back-adjusted the series) the stored history is refetched whole.
+OVERLAP_BARS = 5
+ADJUST_RTOL = 1e-4
+
+def _parquet_available() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except Exception:
+        return False
+
+class OHLCVStore:
+    """Per-ticker daily bar store on disk (Parquet, pickle if pyarrow is missing).
+
+    `fetch_fn(ticker, start, end)` returns a Date-indexed OHLCV frame. Reads are served
+    from disk; once a file is older than `refresh_seconds` only the bars from the last
+    stored dates onwards are fetched and merged in (plus a backfill if more history is asked for).
+    When the re-fetched overlap disagrees with the stored bars the provider has re-adjusted the
+    series, and the whole window is fetched again instead of merged. The first date the
+    provider has for a ticker is remembered, so shorter histories count as complete.
+    `bulk_fetch_fn(tickers, start, end)` -> {ticker: frame} lets `panel` refresh a whole
+    universe in one batched request.
+    """
+
+    def __init__(self, fetch_fn, root: str = STORE_DIR, refresh_seconds: float = REFRESH_SECONDS, bulk_fetch_fn=None):
+        self.fetch_fn = fetch_fn
+        self.bulk_fetch_fn = bulk_fetch_fn
+        self.root = root
+        self.refresh_seconds = refresh_seconds
+        self.ext = ".parquet" if _parquet_available() else ".pkl"
+        self._locks = {}
+        self._guard = threading.Lock()
+
+    def _lock(self, ticker: str) -> threading.Lock:
+        with self._guard:
+            return self._locks.setdefault(ticker, threading.Lock())
+
+    def path(self, ticker: str) -> str:
+        safe = "".join(ch if ch.isalnum() or ch in ".-_" else "_" for ch in ticker.upper())
+        return os.path.join(self.root, safe + self.ext)
+
+    def load(self, ticker: str) -> pd.DataFrame:
+        p = self.path(ticker)
+        if not os.path.exists(p):
+            return pd.DataFrame()
+        try:
+            return pd.read_parquet(p) if self.ext == ".parquet" else pd.read_pickle(p)
+        except Exception:
+            return pd.DataFrame()
+
+    def save(self, ticker: str, df: pd.DataFrame):
+        os.makedirs(self.root, exist_ok=True)
+        p = self.path(ticker)
+        tmp = f"{p}.{os.getpid()}.{threading.get_ident()}.tmp"
+        if self.ext == ".parquet":
+            df.to_parquet(tmp)
+        else:
+            df.to_pickle(tmp)
+        os.replace(tmp, p)
+
+    def is_fresh(self, ticker: str) -> bool:
+        p = self.path(ticker)
+        return os.path.exists(p) and (time.time() - os.path.getmtime(p)) < self.refresh_seconds
+
+    def _meta_path(self, ticker: str) -> str:
+        return self.path(ticker)[:-len(self.ext)] + ".meta.json"
+
+    def first_available(self, ticker: str):
+        """Earliest date the provider returned when asked for more history (None if unknown)."""
+        try:
+            with open(self._meta_path(ticker)) as fh:
+                return pd.Timestamp(json.load(fh)["first"])
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _record_first(self, ticker: str, first):
+        os.makedirs(self.root, exist_ok=True)
+        p = self._meta_path(ticker)
+        tmp = f"{p}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w") as fh:
+            json.dump({"first": pd.Timestamp(first).isoformat()}, fh)
+        os.replace(tmp, p)
+
+    def needs_backfill(self, stored: pd.DataFrame, ticker: str, start: datetime) -> bool:
+        if stored.empty:
+            return True
+        if stored.index[0] <= start + BACKFILL_SLACK:
+            return False
+        first = self.first_available(ticker)
+        return first is None or stored.index[0] > first
+
+    def covers(self, stored: pd.DataFrame, ticker: str, start: datetime) -> bool:
+        return not stored.empty and self.is_fresh(ticker) and not self.needs_backfill(stored, ticker, start)
+
+    @staticmethod
+    def overlap_start(stored: pd.DataFrame):
+        """Where an incremental fetch starts: OVERLAP_BARS before the last stored bar."""
+        return stored.index[max(0, len(stored) - OVERLAP_BARS)]
+
+    @staticmethod
+    def consistent(stored: pd.DataFrame, fresh: pd.DataFrame) -> bool:
+        """False when bars present in both disagree (the provider re-adjusted the series).
+        The last stored bar is left out: it may have been a partial session."""
+        if stored.empty or fresh is None or fresh.empty:
+            return True
+        common = stored.index[:-1].intersection(fresh.index)
+        if common.empty:
+            return True
+        col = "Close" if "Close" in stored.columns and "Close" in fresh.columns else stored.columns[0]
+        a = pd.to_numeric(stored.loc[common, col], errors="coerce").to_numpy(dtype=float)
+        b = pd.to_numeric(fresh.loc[common, col], errors="coerce").to_numpy(dtype=float)
+        ok = ~(pd.isna(a) | pd.isna(b))
+        return bool((abs(a[ok] - b[ok]) <= ADJUST_RTOL * abs(a[ok])).all())
+
+    @staticmethod
+    def merge(old: pd.DataFrame, new: pd.DataFrame) -> pd.DataFrame:
+        if old.empty:
+            return new.sort_index()
+        if new is None or new.empty:
+            return old
+        out = pd.concat([old, new])
+        out = out[~out.index.duplicated(keep="last")]
+        return out.sort_index()
+
+    def update(self, ticker: str, start: datetime, end: datetime) -> pd.DataFrame:
+        """Bring the stored history up to `end` (and back to `start`) and return all of it.
+        The file is only rewritten when the provider returned bars: rewriting it unchanged
+        would reset its mtime and make stale bars count as fresh."""
+        with self._lock(ticker):
+            stored = self.load(ticker)
+            if self.covers(stored, ticker, start):
+                return stored
+            if stored.empty:
+                merged = self._fetch_window(ticker, start, end)
+                fetched = not merged.empty
+            else:
+                merged = stored
+                fetched = False
+                if self.needs_backfill(stored, ticker, start):
+                    older = self.fetch_fn(ticker, start, stored.index[0])
+                    fetched = older is not None and not older.empty
+                    if self.consistent(stored, older):
+                        merged = self.merge(older, merged)
+                        self._note_first(ticker, merged, start)
+                    else:
+                        merged = None
+                if merged is not None:
+                    # Re-fetch the last stored bars too: the last one may have been a partial
+                    # session, and the earlier ones show whether the series was re-adjusted.
+                    newer = self.fetch_fn(ticker, self.overlap_start(stored), end)
+                    fetched = fetched or (newer is not None and not newer.empty)
+                    merged = self.merge(merged, newer) if self.consistent(stored, newer) else None
+                if merged is None:
+                    merged = self._fetch_window(ticker, min(start, stored.index[0]), end)
+                    fetched = not merged.empty
+            if fetched:
+                self.save(ticker, merged)
+            return merged
+
+    def _fetch_window(self, ticker: str, start: datetime, end: datetime) -> pd.DataFrame:
+        data = self.merge(pd.DataFrame(), self.fetch_fn(ticker, start, end))
+        self._note_first(ticker, data, start)
+        return data
+
+    def _note_first(self, ticker: str, data: pd.DataFrame, start: datetime):
+        # Asked for history back to `start` but it begins later: that is all there is.
+        if data is not None and not data.empty and data.index[0] > start + BACKFILL_SLACK:
+            self._record_first(ticker, data.index[0])
+
+    def ingest(self, ticker: str, bars: pd.DataFrame):
+        """Merge bars fetched elsewhere (e.g. a bulk download) into the stored history."""
+        if bars is None or bars.empty:
+            return
+        with self._lock(ticker):
+            stored = self.load(ticker)
+            # Re-adjusted by the provider: keep only the new bars, update() backfills the rest.
+            self.save(ticker, self.merge(stored, bars) if self.consistent(stored, bars) else bars.sort_index())
+
+    def history(self, ticker: str, lookback_days: int = 365) -> pd.DataFrame:
+        """Same shape as a yfinance download after reset_index(): a Date column plus OHLCV."""
+        end = datetime.utcnow()
+        start = end - timedelta(days=lookback_days)
+        data = self.update(ticker, start, end)
+        if data.empty:
+            return pd.DataFrame()
+        data = data[data.index >= start]
+        if data.empty:
+            return pd.DataFrame()
+        return data.reset_index()
+
+    def panel(self, tickers, lookback_days: int = 365) -> pd.DataFrame:
+        """Aligned dates x (field, ticker) frame for a universe, e.g. `panel["Close"]` is the wide
+        close matrix. Stale tickers are refreshed together through `bulk_fetch_fn` first."""
+        end = datetime.utcnow()
+        start = end - timedelta(days=lookback_days)
+        tickers = list(dict.fromkeys(tickers))
+        if self.bulk_fetch_fn is not None:
+            starts = {}
+            for t in tickers:
+                stored = self.load(t)
+                if self.covers(stored, t, start):
+                    continue
+                backfill = self.needs_backfill(stored, t, start)
+                starts[t] = start if backfill else self.overlap_start(stored)
+            if starts:
+                fetched = self.bulk_fetch_fn(list(starts), min(starts.values()), end)
+                for t, bars in fetched.items():
+                    self.ingest(t, bars)
+        frames = {}
+        for t in tickers:
+            data = self.update(t, start, end)
+            data = data[data.index >= start] if not data.empty else data
+            if not data.empty:
+                frames[t] = data
+        if not frames:
+            return pd.DataFrame()
+        out = pd.concat(frames, axis=1, names=["Ticker", "Field"]).swaplevel(axis=1)
+        return out.sort_index(axis=1, level=0, sort_remaining=False)
+
+def panel_ticker(panel: pd.DataFrame, ticker: str) -> pd.DataFrame:
+    """One ticker out of a `panel()` frame, in the `history()` shape (Date column + OHLCV)."""
+    if panel is None or panel.empty or ticker not in panel.columns.get_level_values(1):
+        return pd.DataFrame()
+    df = panel.xs(ticker, axis=1, level=1).dropna(how="all")
+    df.columns.name = None
+    return df.reset_index()
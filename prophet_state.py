@@ -0,0 +1,89 @@
+
+import json
+import math
+import os
+import threading
+from datetime import date
+
+PARAMS_DIR = os.getenv("PROPHET_PARAMS_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".prophet_params"))
+WARM_START = os.getenv("PROPHET_WARM_START", "1").lower() not in ("0", "false", "no")
+# Cold refit at least this often so the warm-started optimum can't drift for ever.
+FULL_REFIT_DAYS = int(os.getenv("PROPHET_FULL_REFIT_DAYS", "7"))
+
+def stan_init(model) -> dict:
+    """Fitted parameters in the shape Prophet.fit(init=...) expects (JSON-friendly)."""
+    res = {}
+    for name in ["k", "m", "sigma_obs"]:
+        res[name] = float(model.params[name][0][0])
+    for name in ["delta", "beta"]:
+        res[name] = [float(v) for v in model.params[name][0]]
+    return res
+
+def _finite(model) -> bool:
+    try:
+        init = stan_init(model)
+    except Exception:
+        return False
+    values = [init["k"], init["m"], init["sigma_obs"]] + init["delta"] + init["beta"]
+    return all(math.isfinite(v) for v in values)
+
+class WarmStartStore:
+    """Per-ticker JSON files holding the last fitted Prophet parameters and the date of the
+    last cold fit."""
+
+    def __init__(self, root: str = PARAMS_DIR, full_refit_days: int = FULL_REFIT_DAYS):
+        self.root = root
+        self.full_refit_days = full_refit_days
+        self._lock = threading.Lock()
+
+    def path(self, ticker: str) -> str:
+        safe = "".join(ch if ch.isalnum() or ch in ".-_" else "_" for ch in ticker.upper())
+        return os.path.join(self.root, safe + ".json")
+
+    def load(self, ticker: str):
+        try:
+            with open(self.path(ticker)) as fh:
+                return json.load(fh)
+        except Exception:
+            return None
+
+    def save(self, ticker: str, model, cold_fit_on: str):
+        state = {"init": stan_init(model), "cold_fit_on": cold_fit_on, "fit_on": date.today().isoformat()}
+        with self._lock:
+            os.makedirs(self.root, exist_ok=True)
+            p = self.path(ticker)
+            tmp = f"{p}.{os.getpid()}.tmp"
+            with open(tmp, "w") as fh:
+                json.dump(state, fh)
+            os.replace(tmp, p)
+
+    def needs_full_refit(self, state) -> bool:
+        try:
+            last_cold = date.fromisoformat(state["cold_fit_on"])
+        except Exception:
+            return True
+        return (date.today() - last_cold).days >= self.full_refit_days
+
+def fit_prophet(make_model, df, ticker: str, store: WarmStartStore = None):
+    """Fit a fresh `make_model()` on df, warm-started from the ticker's previous parameters.
+    Falls back to a cold fit when there is no usable state, the refit policy is due, or
+    the warm start fails / ends on non-finite parameters."""
+    if store is None or not WARM_START:
+        model = make_model()
+        model.fit(df)
+        return model
+    state = store.load(ticker)
+    if state and not store.needs_full_refit(state):
+        try:
+            model = make_model()
+            model.fit(df, init=state["init"])
+            if _finite(model):
+                store.save(ticker, model, state["cold_fit_on"])
+                return model
+        except Exception:
+            pass
+    model = make_model()
+    model.fit(df)
+    if _finite(model):
+        store.save(ticker, model, date.today().isoformat())
+    return model
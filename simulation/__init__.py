@@ -0,0 +1,53 @@
+# simulation/__init__.py
+# Offline market: a seeded data generator plus local stand-ins for the Polygon / Alpha
+# Vantage REST APIs and the Finnhub trade WebSocket. The app's clients follow
+# POLYGON_BASE_URL, ALPHAVANTAGE_BASE_URL and FINNHUB_WS_URL, and tools' yfinance downloads
+# come from the generator when MARKET_SIM_SEED is set, so `environ()` is all it takes to run
+# the whole app against the simulation:
+#   python -m simulation --seed 7          # prints the variables to export
+#   with simulation.running(seed=7): ...   # in-process, e.g. for load tests
+import contextlib
+import os
+from .generator import MarketSim
+
+def environ(http_url: str = None, ws_url: str = None, seed: int = None) -> dict:
+    """Environment variables pointing the app at the simulation. Dummy API keys are
+    included because the clients skip providers whose key is empty."""
+    env = {}
+    if http_url:
+        env.update(POLYGON_BASE_URL=http_url, ALPHAVANTAGE_BASE_URL=http_url,
+                   POLYGON_API_KEY=os.getenv("POLYGON_API_KEY") or "sim",
+                   ALPHAVANTAGE_API_KEY=os.getenv("ALPHAVANTAGE_API_KEY") or "sim")
+    if ws_url:
+        env.update(FINNHUB_WS_URL=ws_url, FINNHUB_API_KEY=os.getenv("FINNHUB_API_KEY") or "sim")
+    if seed is not None:
+        env["MARKET_SIM_SEED"] = str(seed)
+    return env
+
+@contextlib.contextmanager
+def running(seed: int = 0, http_port: int = 0, ws_port: int = 0, set_env: bool = True, **http_options):
+    """Start both servers on a shared MarketSim for the duration of the block and yield
+    (http_server, ws_server). With set_env the variables from environ() are set (and
+    restored afterwards); modules that read them at import must be imported inside."""
+    from .http_server import SimHTTPServer
+    from .ws_server import SimWSServer
+    sim = MarketSim(seed)
+    http = SimHTTPServer(sim, port=http_port, **http_options)
+    ws = SimWSServer(sim, port=ws_port)
+    saved = {}
+    try:
+        http.start()
+        ws.start()
+        if set_env:
+            env = environ(http.url, ws.url, seed)
+            saved = {k: os.environ.get(k) for k in env}
+            os.environ.update(env)
+        yield http, ws
+    finally:
+        for k, v in saved.items():
+            if v is None:
+                os.environ.pop(k, None)
+            else:
+                os.environ[k] = v
+        ws.stop()
+        http.stop()
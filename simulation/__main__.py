@@ -0,0 +1,30 @@
+# simulation/__main__.py
+# python -m simulation [--seed N] [--http-port 8700] [--ws-port 8701] [--latency-ms 50] [--av-per-minute 5]
+# Serves the simulated providers until interrupted and prints the environment to export.
+import argparse
+import time
+from . import environ, running
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Serve simulated Polygon / Alpha Vantage / Finnhub endpoints.")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--http-port", type=int, default=8700)
+    ap.add_argument("--ws-port", type=int, default=8701)
+    ap.add_argument("--latency-ms", type=float, default=0.0, help="added to every HTTP response")
+    ap.add_argument("--jitter-ms", type=float, default=0.0)
+    ap.add_argument("--av-per-minute", type=int, default=None, help="Alpha Vantage calls per minute before the rate-limit note")
+    ap.add_argument("--verbose", action="store_true", help="log every HTTP request")
+    args = ap.parse_args(argv)
+    with running(args.seed, args.http_port, args.ws_port, set_env=False, latency_ms=args.latency_ms,
+                 jitter_ms=args.jitter_ms, av_calls_per_minute=args.av_per_minute, verbose=args.verbose) as (http, ws):
+        for k, v in environ(http.url, ws.url, args.seed).items():
+            print(f"export {k}={v}")
+        print("serving; Ctrl-C to stop", flush=True)
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            print("http requests:", http.stats(), "| ws:", ws.stats())
+
+if __name__ == "__main__":
+    main()
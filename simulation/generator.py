@@ -0,0 +1,209 @@
+# simulation/generator.py
+# Seeded synthetic market: daily bars, 1-minute bars, trade ticks, gainers and headlines for
+# any ticker. Daily returns follow a three-state volatility regime (calm / normal / stressed,
+# Markov switching) with GARCH(1,1) clustering inside the regime and Student-t shocks, so
+# the series have fat tails, volatility bursts and quiet stretches. Everything is a pure
+# function of (seed, ticker, date): a ticker's history is generated from ORIGIN, so any
+# window of it is the same bars whichever call asked for it.
+import math
+import zlib
+from datetime import timedelta, timezone
+import numpy as np
+import pandas as pd
+
+ORIGIN = pd.Timestamp("2000-01-03")
+MINUTES_PER_DAY = 390
+SESSION_OPEN = timedelta(hours=9, minutes=30)
+
+# regime -> daily vol level; rows of TRANSITION are the next-day regime probabilities.
+REGIME_VOL = np.array([0.007, 0.013, 0.032])
+TRANSITION = np.array([[0.985, 0.014, 0.001],
+                       [0.010, 0.980, 0.010],
+                       [0.005, 0.045, 0.950]])
+GARCH_ALPHA, GARCH_BETA = 0.08, 0.90
+T_DF = 4.0
+
+DEFAULT_UNIVERSE = ["AAPL", "MSFT", "NVDA", "AMZN", "GOOGL", "META", "TSLA", "AMD", "NFLX", "JPM",
+                    "V", "XOM", "UNH", "KO", "PEP", "INTC", "CRM", "ORCL", "ADBE", "PYPL",
+                    "CBA.AX", "BHP.AX", "CSL.AX", "WBC.AX", "NAB.AX", "ANZ.AX", "WES.AX", "MQG.AX",
+                    "FMG.AX", "TLS.AX"]
+
+_NEWS_UP = ["beats estimates", "raises guidance", "wins major contract", "shares rally on strong demand",
+            "announces record buyback", "upgraded by analysts"]
+_NEWS_DOWN = ["misses estimates", "cuts outlook", "faces regulatory probe", "shares slide after weak sales",
+              "announces layoffs", "downgraded by analysts"]
+_NEWS_FLAT = ["to present at industry conference", "names new CFO", "schedules earnings call",
+              "files quarterly report"]
+
+def _day(d) -> pd.Timestamp:
+    ts = pd.Timestamp(d)
+    return (ts.tz_convert(None) if ts.tzinfo else ts).normalize()
+
+def _business_days(start, end) -> pd.DatetimeIndex:
+    # Mon-Fri dates in [start, end); pd.bdate_range is much slower for long ranges.
+    d = np.arange(np.datetime64(start.date()), np.datetime64(end.date()))
+    return pd.DatetimeIndex(d[np.is_busday(d)].astype("datetime64[ns]"))
+
+class MarketSim:
+    """Synthetic market for `seed`. `now` fixes the simulated clock (default: real time), so
+    "today's" gainers and intraday bars are reproducible when it is set."""
+
+    def __init__(self, seed: int = 0, universe=None, now=None):
+        self.seed = int(seed)
+        self.universe = list(universe or DEFAULT_UNIVERSE)
+        self._now = pd.Timestamp(now) if now is not None else None
+        self._daily = {}
+
+    def now(self) -> pd.Timestamp:
+        return self._now if self._now is not None else pd.Timestamp.now()
+
+    def _rng(self, ticker: str, *salt) -> np.random.Generator:
+        key = [self.seed, zlib.crc32(ticker.upper().encode())] + [int(s) for s in salt]
+        return np.random.default_rng(np.random.SeedSequence(key))
+
+    def _history(self, ticker: str, end: pd.Timestamp) -> pd.DataFrame:
+        # Whole history ORIGIN..end. Each random input has its own stream, so a longer
+        # history starts with exactly the bars of a shorter one.
+        ticker = ticker.upper()
+        have = self._daily.get(ticker)
+        if have is not None and have.index[-1] >= end:
+            return have
+        # Generate a year past the request so repeated calls for "today" hit the cache.
+        days = _business_days(ORIGIN, max(end, self.now().normalize()) + pd.Timedelta(days=366))
+        n = len(days)
+        rng = self._rng(ticker)
+        p0 = float(np.exp(rng.uniform(np.log(15), np.log(400))))
+        drift = rng.normal(0.0002, 0.0001)
+        beta = rng.uniform(0.6, 1.6)
+        u = self._rng(ticker, 0, 1).random(n)
+        shocks = self._rng(ticker, 0, 2).standard_t(T_DF, n) * np.sqrt((T_DF - 2) / T_DF)
+        gaps = self._rng(ticker, 0, 3).normal(0, 1, n)
+        wicks = np.stack([self._rng(ticker, 0, 4).random(n), self._rng(ticker, 0, 5).random(n)])
+        vol_noise = self._rng(ticker, 0, 6).normal(0, 0.35, n)
+
+        cum = np.cumsum(TRANSITION, axis=1).tolist()
+        regime, h_path = [0] * n, [0.0] * n
+        state, h, last = 1, 1.0, 0.0
+        for i, (x, z) in enumerate(zip(u.tolist(), shocks.tolist())):
+            row = cum[state]
+            state = 0 if x < row[0] else 1 if x < row[1] else 2
+            # GARCH on the variance ratio to the regime level; unconditional mean 1.
+            h = (1 - GARCH_ALPHA - GARCH_BETA) + GARCH_ALPHA * last * last + GARCH_BETA * h
+            regime[i], h_path[i] = state, h
+            last = z * math.sqrt(h)
+        regime = np.array(regime)
+        sigma = REGIME_VOL[regime] * beta * np.sqrt(h_path)
+        r = drift + sigma * shocks
+
+        close = p0 * np.exp(np.cumsum(r))
+        prev = np.concatenate([[p0], close[:-1]])
+        open_ = prev * np.exp(0.3 * sigma * gaps)
+        top = np.maximum(open_, close)
+        bottom = np.minimum(open_, close)
+        high = top * np.exp(0.6 * sigma * wicks[0])
+        low = bottom * np.exp(-0.6 * sigma * wicks[1])
+        volume = np.round(2e6 * (sigma / REGIME_VOL[1]) ** 1.5 * np.exp(vol_noise) / max(p0 / 100, 0.2))
+        df = pd.DataFrame({"Open": open_, "High": high, "Low": low, "Close": close, "Volume": volume,
+                           "regime": regime, "sigma": sigma}, index=pd.DatetimeIndex(days, name="Date"))
+        self._daily[ticker] = df
+        return df
+
+    def daily(self, ticker: str, start=None, end=None) -> pd.DataFrame:
+        """Open/High/Low/Close/Volume business-day bars in [start, end) (yfinance layout).
+        end defaults to today (exclusive, like yf.download), start to a year before end."""
+        end = _day(end) if end is not None else self.now().normalize() + pd.Timedelta(days=1)
+        start = _day(start) if start is not None else end - pd.Timedelta(days=365)
+        hist = self._history(ticker, end)
+        return hist.loc[(hist.index >= start) & (hist.index < end), ["Open", "High", "Low", "Close", "Volume"]]
+
+    def _at(self, ticker: str, day: pd.Timestamp):
+        # (history, position of the last bar on or before day)
+        hist = self._history(ticker, day)
+        return hist, max(int(hist.index.searchsorted(day, "right")) - 1, 1)
+
+    def _bar(self, ticker: str, day: pd.Timestamp) -> pd.Series:
+        hist, i = self._at(ticker, day)
+        return hist.iloc[i]
+
+    def intraday(self, ticker: str, day, minutes: int = 1) -> pd.DataFrame:
+        """Lowercase open/high/low/close/volume bars of the last session (09:30-16:00) on or
+        before day, at `minutes` resolution: a Brownian bridge from the day's open to its
+        close with U-shaped volume, consistent with the daily bar."""
+        hist, i = self._at(ticker, _day(day))
+        bar, day = hist.iloc[i], hist.index[i]
+        rng = self._rng(ticker, day.toordinal())
+        n = MINUTES_PER_DAY
+        step = bar["sigma"] / np.sqrt(n)
+        walk = np.concatenate([[0.0], np.cumsum(rng.standard_t(T_DF, n) * step * np.sqrt((T_DF - 2) / T_DF))])
+        t = np.linspace(0, 1, n + 1)
+        path = walk - t * walk[-1] + t * np.log(bar["Close"] / bar["Open"])
+        px = bar["Open"] * np.exp(path)
+        o, c = px[:-1], px[1:]
+        wick = np.abs(rng.normal(0, 0.5 * step, (2, n)))
+        shape = 1 + 2.5 * ((t[:-1] - 0.5) * 2) ** 2
+        vol = np.round(bar["Volume"] * shape / shape.sum() * np.exp(rng.normal(0, 0.3, n)))
+        idx = day + SESSION_OPEN + pd.to_timedelta(np.arange(n), unit="min")
+        df = pd.DataFrame({"open": o, "high": np.maximum(o, c) * np.exp(wick[0]),
+                           "low": np.minimum(o, c) * np.exp(-wick[1]), "close": c, "volume": vol}, index=idx)
+        if minutes > 1:
+            df = df.resample(f"{minutes}min", origin="start").agg(
+                {"open": "first", "high": "max", "low": "min", "close": "last", "volume": "sum"}).dropna()
+        return df
+
+    def intraday_range(self, ticker: str, start, end, minutes: int = 1) -> pd.DataFrame:
+        """intraday() for every business day in [start, end]."""
+        days = _business_days(_day(start), _day(end) + pd.Timedelta(days=1))
+        if not len(days):
+            return pd.DataFrame(columns=["open", "high", "low", "close", "volume"], dtype=float)
+        return pd.concat([self.intraday(ticker, d, minutes) for d in days])
+
+    def ticks(self, ticker: str, start_price: float = None, seed_salt: int = 0):
+        """Endless generator of (price, size) trades continuing from the last close, for the
+        live feed. Per-trade volatility follows the ticker's current regime."""
+        today = self.now().normalize()
+        bar = self._bar(ticker, today)
+        rng = self._rng(ticker, today.toordinal(), 1, seed_salt)
+        price = float(start_price or bar["Close"])
+        step = bar["sigma"] / np.sqrt(MINUTES_PER_DAY * 20)
+        while True:
+            z = rng.standard_t(T_DF, 256) * step
+            sizes = np.maximum(1, np.round(rng.lognormal(4, 1, 256)))
+            for dz, size in zip(z, sizes):
+                price *= float(np.exp(dz))
+                yield round(price, 4), float(size)
+
+    def snapshot(self, day=None) -> pd.DataFrame:
+        """One row per universe ticker for `day` (default today): prev_close, open, high, low,
+        close, volume, change and change_pct."""
+        day = _day(day) if day is not None else self.now().normalize()
+        rows = []
+        for t in self.universe:
+            hist, i = self._at(t, day)
+            bar, prev = hist.iloc[i], hist.iloc[i - 1]
+            rows.append({"ticker": t, "prev_close": prev["Close"], "open": bar["Open"], "high": bar["High"],
+                         "low": bar["Low"], "close": bar["Close"], "volume": bar["Volume"],
+                         "change": bar["Close"] - prev["Close"],
+                         "change_pct": 100 * (bar["Close"] / prev["Close"] - 1), "date": hist.index[i]})
+        return pd.DataFrame(rows)
+
+    def gainers(self, limit: int = 20, day=None) -> pd.DataFrame:
+        return self.snapshot(day).sort_values("change_pct", ascending=False).head(limit).reset_index(drop=True)
+
+    def losers(self, limit: int = 20, day=None) -> pd.DataFrame:
+        return self.snapshot(day).sort_values("change_pct").head(limit).reset_index(drop=True)
+
+    def news(self, ticker: str, limit: int = 10, day=None) -> list:
+        """Headlines for the days leading up to `day`; their tone follows the returns."""
+        day = _day(day) if day is not None else self.now().normalize()
+        hist, i = self._at(ticker, day)
+        rng = self._rng(ticker, day.toordinal(), 2)
+        out = []
+        for k in range(limit):
+            j = max(i - k, 1)
+            ret = hist["Close"].iloc[j] / hist["Close"].iloc[j - 1] - 1
+            pool = _NEWS_UP if ret > 0.01 else _NEWS_DOWN if ret < -0.01 else _NEWS_FLAT
+            ts = hist.index[j] + timedelta(hours=int(rng.integers(6, 20)), minutes=int(rng.integers(0, 60)))
+            out.append({"title": f"{ticker.upper()} {pool[int(rng.integers(len(pool)))]}",
+                        "published": ts.to_pydatetime().replace(tzinfo=timezone.utc),
+                        "id": f"sim-{ticker.upper()}-{hist.index[j]:%Y%m%d}-{k}"})
+        return out
@@ -0,0 +1,238 @@
+# simulation/http_server.py
+# Local HTTP stand-in for the Polygon and Alpha Vantage REST endpoints the app calls, backed
+# by MarketSim. Responses have the providers' JSON (and Alpha Vantage CSV) shapes, so the
+# clients run unchanged with POLYGON_BASE_URL / ALPHAVANTAGE_BASE_URL pointing here. Any
+# API key is accepted. Optional upstream latency and an Alpha Vantage per-minute call limit
+# (answered with the provider's "Thank you for using Alpha Vantage" note) make load tests
+# see the same back-pressure as production.
+import json
+import re
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+import numpy as np
+import pandas as pd
+from .generator import MarketSim
+
+AV_NOTE = ("Thank you for using Alpha Vantage! Our standard API rate limit is 25 requests per day. "
+           "Please subscribe to any of the premium plans to instantly remove all daily rate limits.")
+AV_COMPACT_BARS = 100
+AV_INTERVALS = {"1min": 1, "5min": 5, "15min": 15, "30min": 30, "60min": 60}
+POLYGON_SPANS = {"minute": 1, "hour": 60, "day": None}
+
+def _ms(ts) -> int:
+    return int(pd.Timestamp(ts).value // 1_000_000)
+
+def _num(x, nd=4) -> str:
+    return f"{float(x):.{nd}f}"
+
+class SimHandler(BaseHTTPRequestHandler):
+    server_version = "MarketSim/1.0"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, fmt, *args):
+        if self.server.verbose:
+            super().log_message(fmt, *args)
+
+    def _send(self, status: int, body, content_type="application/json"):
+        data = body.encode() if isinstance(body, str) else json.dumps(body, default=str).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        q = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        srv = self.server
+        srv.count(url.path)
+        if srv.latency_ms:
+            time.sleep((srv.latency_ms + srv.jitter_ms * float(np.random.random())) / 1000)
+        try:
+            if url.path == "/query":
+                status, body, ctype = self._alphavantage(q)
+            else:
+                status, body, ctype = self._polygon(url.path, q)
+        except Exception as e:
+            status, body, ctype = 500, {"status": "ERROR", "error": f"{type(e).__name__}: {e}"}, "application/json"
+        self._send(status, body, ctype)
+
+    # ---- Polygon -----------------------------------------------------------------
+    def _polygon(self, path, q):
+        sim = self.server.sim
+        ok = lambda body: (200, {"status": "OK", "request_id": "sim", **body}, "application/json")
+        if path == "/v2/reference/news":
+            items = sim.news(q.get("ticker", "AAPL"), int(q.get("limit", 10)))
+            return ok({"count": len(items), "results": [
+                {"id": it["id"], "title": it["title"], "tickers": [q.get("ticker", "AAPL").upper()],
+                 "published_utc": it["published"].strftime("%Y-%m-%dT%H:%M:%SZ"),
+                 "article_url": f"https://news.example.invalid/{it['id']}",
+                 "publisher": {"name": "MarketSim Wire"}} for it in items]})
+        if path in ("/v2/snapshot/locale/us/markets/stocks/gainers", "/v2/snapshot/locale/us/markets/stocks/losers"):
+            rows = sim.gainers(20) if path.endswith("gainers") else sim.losers(20)
+            return ok({"tickers": [self._snapshot_row(r) for r in rows.itertuples()]})
+        if path == "/v3/reference/tickers":
+            limit = int(q.get("limit", 100))
+            return ok({"count": min(limit, len(sim.universe)), "results": [
+                {"ticker": t, "name": f"{t} (simulated)", "market": "stocks", "locale": "us", "active": True}
+                for t in sim.universe[:limit]]})
+        m = re.fullmatch(r"/v2/aggs/ticker/([^/]+)/prev", path)
+        if m:
+            bars = sim.daily(m.group(1)).tail(1)
+            return ok({"ticker": m.group(1).upper(), "adjusted": True, "resultsCount": len(bars),
+                       "results": self._aggs(m.group(1), bars)})
+        m = re.fullmatch(r"/v2/aggs/ticker/([^/]+)/range/(\d+)/(\w+)/([^/]+)/([^/]+)", path)
+        if m:
+            ticker, mult, span, start, end = m.groups()
+            if span not in POLYGON_SPANS:
+                return 400, {"status": "ERROR", "error": f"unsupported timespan {span}"}, "application/json"
+            start, end = pd.Timestamp(start), pd.Timestamp(end)
+            if POLYGON_SPANS[span] is None:
+                bars = sim.daily(ticker, start, end + pd.Timedelta(days=1)).rename(columns=str.lower)
+            else:
+                bars = sim.intraday_range(ticker, start, end, POLYGON_SPANS[span] * int(mult))
+            bars = bars.head(int(q.get("limit", 50000)))
+            if q.get("sort") == "desc":
+                bars = bars.iloc[::-1]
+            return ok({"ticker": ticker.upper(), "adjusted": True, "resultsCount": len(bars),
+                       "results": self._aggs(ticker, bars)})
+        return 404, {"status": "NOT_FOUND", "message": f"no simulated route for {path}"}, "application/json"
+
+    @staticmethod
+    def _aggs(ticker, bars):
+        bars = bars.rename(columns=str.lower)
+        return [{"T": ticker.upper(), "o": r.open, "h": r.high, "l": r.low, "c": r.close, "v": r.volume,
+                 "vw": (r.high + r.low + r.close) / 3, "t": _ms(ts)} for ts, r in zip(bars.index, bars.itertuples())]
+
+    def _snapshot_row(self, r):
+        t = _ms(self.server.sim.now())
+        return {"ticker": r.ticker, "todaysChange": r.change, "todaysChangePerc": r.change_pct, "updated": t * 1_000_000,
+                "day": {"o": r.open, "h": r.high, "l": r.low, "c": r.close, "v": r.volume},
+                "prevDay": {"c": r.prev_close},
+                "lastTrade": {"p": r.close, "s": 100, "t": t * 1_000_000}}
+
+    # ---- Alpha Vantage -------------------------------------------------------------
+    def _alphavantage(self, q):
+        srv, sim = self.server, self.server.sim
+        if not srv.av_allow():
+            return 200, {"Note": AV_NOTE}, "application/json"
+        fn = q.get("function", "")
+        symbol = q.get("symbol", "").upper()
+        csv = q.get("datatype") == "csv"
+        if fn == "GLOBAL_QUOTE":
+            bars = sim.daily(symbol).tail(2)
+            last, prev = bars.iloc[-1], bars.iloc[0]
+            return 200, {"Global Quote": {
+                "01. symbol": symbol, "02. open": _num(last.Open), "03. high": _num(last.High),
+                "04. low": _num(last.Low), "05. price": _num(last.Close), "06. volume": str(int(last.Volume)),
+                "07. latest trading day": f"{bars.index[-1]:%Y-%m-%d}", "08. previous close": _num(prev.Close),
+                "09. change": _num(last.Close - prev.Close),
+                "10. change percent": f"{100 * (last.Close / prev.Close - 1):.4f}%"}}, "application/json"
+        if fn == "TIME_SERIES_INTRADAY":
+            interval = q.get("interval", "1min")
+            if interval not in AV_INTERVALS:
+                return 200, {"Error Message": f"Invalid API call. Unknown interval {interval}."}, "application/json"
+            if q.get("month"):
+                first = pd.Timestamp(q["month"] + "-01")
+                last = min(first + pd.offsets.MonthEnd(0), sim.now().normalize())
+                bars = sim.intraday_range(symbol, first, last, AV_INTERVALS[interval])
+            else:
+                # compact: the latest 100 bars; full: the last 30 days.
+                today = sim.now().normalize()
+                days = 1 if q.get("outputsize", "compact") == "compact" else 30
+                bars = sim.intraday_range(symbol, today - pd.Timedelta(days=days + 4), today, AV_INTERVALS[interval])
+                bars = bars.tail(AV_COMPACT_BARS) if days == 1 else bars[bars.index >= today - pd.Timedelta(days=days)]
+            return self._av_series(symbol, bars, f"Time Series ({interval})", "%Y-%m-%d %H:%M:%S", csv,
+                                   {"1. Information": f"Intraday ({interval}) open, high, low, close prices and volume",
+                                    "4. Interval": interval})
+        if fn in ("TIME_SERIES_DAILY", "TIME_SERIES_DAILY_ADJUSTED"):
+            bars = sim.daily(symbol, start=sim.now() - pd.Timedelta(days=365 * 20)).rename(columns=str.lower)
+            if q.get("outputsize", "compact") == "compact":
+                bars = bars.tail(AV_COMPACT_BARS)
+            return self._av_series(symbol, bars, "Time Series (Daily)", "%Y-%m-%d", csv,
+                                   {"1. Information": "Daily Prices (open, high, low, close) and Volumes"})
+        if fn == "TOP_GAINERS_LOSERS":
+            snap = sim.snapshot()
+            row = lambda r: {"ticker": r.ticker, "price": _num(r.close), "change_amount": _num(r.change),
+                             "change_percentage": f"{r.change_pct:.4f}%", "volume": str(int(r.volume))}
+            return 200, {
+                "metadata": "Top gainers, losers, and most actively traded US tickers (simulated)",
+                "last_updated": f"{sim.now():%Y-%m-%d %H:%M:%S} US/Eastern",
+                "top_gainers": [row(r) for r in snap.sort_values("change_pct", ascending=False).head(20).itertuples()],
+                "top_losers": [row(r) for r in snap.sort_values("change_pct").head(20).itertuples()],
+                "most_actively_traded": [row(r) for r in snap.sort_values("volume", ascending=False).head(20).itertuples()],
+            }, "application/json"
+        return 200, {"Error Message": f"Invalid API call. Unknown function {fn!r}."}, "application/json"
+
+    @staticmethod
+    def _av_series(symbol, bars, key, fmt, csv, meta):
+        bars = bars.iloc[::-1]  # newest first, as the provider sends them
+        stamps = bars.index.strftime(fmt)
+        if csv:
+            lines = ["timestamp,open,high,low,close,volume"]
+            lines += [f"{t},{_num(r.open)},{_num(r.high)},{_num(r.low)},{_num(r.close)},{int(r.volume)}"
+                      for t, r in zip(stamps, bars.itertuples())]
+            return 200, "\r\n".join(lines) + "\r\n", "application/x-download"
+        series = {t: {"1. open": _num(r.open), "2. high": _num(r.high), "3. low": _num(r.low),
+                      "4. close": _num(r.close), "5. volume": str(int(r.volume))}
+                  for t, r in zip(stamps, bars.itertuples())}
+        meta = {**meta, "2. Symbol": symbol, "3. Last Refreshed": stamps[0] if len(stamps) else "",
+                "6. Time Zone": "US/Eastern"}
+        return 200, {"Meta Data": meta, key: series}, "application/json"
+
+class SimHTTPServer(ThreadingHTTPServer):
+    """Threaded server on host:port (port 0 picks a free one); start() serves from a daemon
+    thread and returns the base URL. stats() has per-path request counts."""
+    daemon_threads = True
+
+    def __init__(self, sim: MarketSim = None, host: str = "127.0.0.1", port: int = 0, latency_ms: float = 0.0,
+                 jitter_ms: float = 0.0, av_calls_per_minute: int = None, verbose: bool = False):
+        super().__init__((host, port), SimHandler)
+        self.sim = sim or MarketSim()
+        self.latency_ms, self.jitter_ms = latency_ms, jitter_ms
+        self.av_calls_per_minute = av_calls_per_minute
+        self.verbose = verbose
+        self._lock = threading.Lock()
+        self._counts = {}
+        self._av_calls = deque()
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count(self, path: str):
+        with self._lock:
+            self._counts[path] = self._counts.get(path, 0) + 1
+
+    def av_allow(self) -> bool:
+        # Sliding 60 s window, like the provider's per-minute limit.
+        if not self.av_calls_per_minute:
+            return True
+        now = time.monotonic()
+        with self._lock:
+            while self._av_calls and now - self._av_calls[0] >= 60:
+                self._av_calls.popleft()
+            if len(self._av_calls) >= self.av_calls_per_minute:
+                return False
+            self._av_calls.append(now)
+            return True
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._counts)
+
+    def start(self) -> str:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+            self._thread.start()
+        return self.url
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+        self._thread = None
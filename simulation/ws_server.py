@@ -0,0 +1,110 @@
+# simulation/ws_server.py
+# Local WebSocket stand-in for the Finnhub trade feed, backed by MarketSim.ticks. Clients
+# send {"type": "subscribe" | "unsubscribe", "symbol": ...} and receive
+# {"type": "trade", "data": [{"s", "p", "t", "v", "c"}, ...]} batches every `interval`
+# seconds with `trades_per_second` trades per subscribed symbol, plus {"type": "ping"}
+# keep-alives, so FinnhubWS runs unchanged with FINNHUB_WS_URL pointing here.
+import asyncio
+import json
+import threading
+import time
+import websockets
+from .generator import MarketSim
+
+class SimWSServer:
+    """start() serves from a daemon thread with its own event loop and returns the ws://
+    URL; port 0 picks a free port. stats() has connection and message counts."""
+
+    def __init__(self, sim: MarketSim = None, host: str = "127.0.0.1", port: int = 0, trades_per_second: float = 5.0,
+                 interval: float = 0.2, ping_seconds: float = 30.0):
+        self.sim = sim or MarketSim()
+        self.host, self.port = host, port
+        self.trades_per_second = trades_per_second
+        self.interval = interval
+        self.ping_seconds = ping_seconds
+        self.connections = 0
+        self.messages = 0
+        self._loop = None
+        self._server = None
+        self._thread = None
+        self._ready = threading.Event()
+
+    @property
+    def url(self) -> str:
+        return f"ws://{self.host}:{self.port}"
+
+    async def _handler(self, ws, *_):
+        self.connections += 1
+        subs, feeds = set(), {}
+        salt = self.connections
+
+        async def reader():
+            async for raw in ws:
+                try:
+                    msg = json.loads(raw)
+                except ValueError:
+                    await ws.send(json.dumps({"type": "error", "msg": "Invalid message"}))
+                    continue
+                symbol = str(msg.get("symbol", "")).upper()
+                if msg.get("type") == "subscribe" and symbol:
+                    subs.add(symbol)
+                    feeds.setdefault(symbol, self.sim.ticks(symbol, seed_salt=salt))
+                elif msg.get("type") == "unsubscribe":
+                    subs.discard(symbol)
+
+        task = asyncio.ensure_future(reader())
+        per_batch, carry, last_ping = self.trades_per_second * self.interval, 0.0, time.monotonic()
+        try:
+            while not task.done():
+                await asyncio.sleep(self.interval)
+                carry += per_batch
+                n, carry = int(carry), carry - int(carry)
+                now_ms = int(time.time() * 1000)
+                data = []
+                for s in sorted(subs):
+                    for k in range(n):
+                        price, size = next(feeds[s])
+                        data.append({"s": s, "p": price, "t": now_ms - (n - 1 - k), "v": size, "c": None})
+                if data:
+                    await ws.send(json.dumps({"type": "trade", "data": data}))
+                    self.messages += 1
+                if time.monotonic() - last_ping >= self.ping_seconds:
+                    await ws.send(json.dumps({"type": "ping"}))
+                    last_ping = time.monotonic()
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            task.cancel()
+
+    def _main(self):
+        # Own loop in this thread; asyncio.run is avoided because it installs a SIGINT handler.
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+
+        async def start():
+            return await websockets.serve(self._handler, self.host, self.port)
+
+        self._server = self._loop.run_until_complete(start())
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._ready.set()
+        self._loop.run_forever()
+        self._server.close()
+        self._loop.run_until_complete(self._server.wait_closed())
+        self._loop.close()
+
+    def start(self) -> str:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._main, daemon=True)
+            self._thread.start()
+            self._ready.wait(10)
+        return self.url
+
+    def stop(self):
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(10)
+        self._thread = self._loop = None
+        self._ready.clear()
+
+    def stats(self) -> dict:
+        return {"connections": self.connections, "messages": self.messages}
@@ -82,9 +82,11 @@ if OPENAI_KEY.startswith("sk-proj-"):
     )
     st.stop()
 
-from tools import get_quote, forecast, news_sentiment, screen_top_movers, default_universe, _download_yf
+from tools import get_quote, forecast, forecast_multi, news_sentiment, screen_top_movers, default_universe, _download_yf, POLYGON_BASE_URL
 from llm import respond
 
+CHAT_PRECISION = os.getenv("CHAT_PRECISION", "reduced")
+
 tab_chat, tab_analysis = st.tabs(["💬 Chat", "📈 Analysis"])
 
 with st.sidebar:
@@ -104,9 +106,9 @@ with st.sidebar:
             st.error(f"OpenAI ❌ {e}")
     if st.button("Test Polygon"):
         try:
-            import requests
+            import http_client
             key = POLYGON_KEY
-            r = requests.get(f"https://api.polygon.io/v3/reference/tickers?limit=1&apiKey={key}", timeout=15)
+            r = http_client.get(f"{POLYGON_BASE_URL}/v3/reference/tickers?limit=1&apiKey={key}", timeout=15)
             if r.status_code == 200:
                 st.success("Polygon ✅")
             else:
@@ -133,7 +135,7 @@ with tab_chat:
         try:
             answer = respond(user_text, {
                 "get_quote": get_quote,
-                "forecast": forecast,
+                "forecast": lambda t, h="7d": forecast(t, h, precision=CHAT_PRECISION),
                 "news_sentiment": news_sentiment,
                 "screen_top_movers": screen_top_movers,
                 "default_universe": default_universe
@@ -161,7 +163,8 @@ with tab_analysis:
             st.line_chart(chart_df)
 
             st.subheader(f"Forecast — next {horizon}")
-            res = forecast(ticker, horizon)
+            # One fit covers every horizon; switching the selector afterwards is a cache hit.
+            res = forecast_multi(ticker, ["1d", "7d", "30d"], precision="full")[horizon]
             if not res.get("ok"):
                 st.error(res.get("error"))
             else:
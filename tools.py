@@ -1,10 +1,17 @@
 
 import os
-from datetime import datetime, timedelta
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, wait
 import pandas as pd
 import yfinance as yf
-import requests
+import http_client
 from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+from ohlcv_store import OHLCVStore, STORE_DIR, panel_ticker
+from forecast_cache import ForecastCache
+from prophet_state import WarmStartStore, fit_prophet
+from modules.forecast_fallback import horizon_days as _horizon_days, prob_up_from_bands, Z_INTERVAL
 
 analyzer = SentimentIntensityAnalyzer()
 
@@ -18,28 +25,66 @@ def _get_secret(name: str) -> str:
     return os.getenv(name, "")
 
 POLYGON_API_KEY = _get_secret("POLYGON_API_KEY")
+POLYGON_BASE_URL = os.getenv("POLYGON_BASE_URL", "https://api.polygon.io").rstrip("/")
+# Set to serve yfinance downloads from simulation.MarketSim(seed) instead (offline / load tests).
+MARKET_SIM_SEED = os.getenv("MARKET_SIM_SEED", "")
+PROPHET_PARAMS = {"daily_seasonality": True, "weekly_seasonality": True}
+# Posterior samples Prophet draws for the intervals; "analytic" skips sampling altogether.
+PRECISION_SAMPLES = {"full": 1000, "reduced": 100, "analytic": 0}
+FORECAST_PRECISION = os.getenv("FORECAST_PRECISION", "full")
+SCREEN_PRECISION = os.getenv("SCREEN_PRECISION", "reduced")
+PROPHET_MIN_BUDGET_MS = float(os.getenv("PROPHET_MIN_BUDGET_MS", "2000"))
+SCREEN_WORKERS = int(os.getenv("SCREEN_WORKERS", "0") or 0)
+SCREEN_TIMEOUT = float(os.getenv("SCREEN_TIMEOUT_SECONDS", "120") or 120)
 
-def _horizon_days(horizon: str) -> int:
-    h = (horizon or "").lower().strip()
-    if h in ["today", "1d", "1 day"]:
-        return 1
-    if "week" in h or h in ["7d", "7 days"]:
-        return 7
-    if "month" in h or h in ["30d", "30 days"]:
-        return 30
-    return 7
+_market_sim = None
 
-def _download_yf(ticker: str, lookback_days=365):
-    end = datetime.utcnow()
-    start = end - timedelta(days=lookback_days)
+def _sim():
+    global _market_sim
+    if _market_sim is None:
+        from simulation import MarketSim
+        _market_sim = MarketSim(int(MARKET_SIM_SEED))
+    return _market_sim
+
+def _fetch_yf(ticker: str, start, end) -> pd.DataFrame:
+    if MARKET_SIM_SEED:
+        return _sim().daily(ticker, start, end)
     data = yf.download(ticker, start=start, end=end, progress=False, auto_adjust=True, threads=False)
     if data is None or data.empty:
         return pd.DataFrame()
     if isinstance(data.columns, pd.MultiIndex):
         data.columns = data.columns.get_level_values(0)
-    data = data.reset_index()
     return data
 
+def _fetch_yf_many(tickers, start, end) -> dict:
+    if MARKET_SIM_SEED:
+        return {t: _sim().daily(t, start, end) for t in tickers}
+    data = yf.download(list(tickers), start=start, end=end, progress=False, auto_adjust=True,
+                       threads=True, group_by="ticker")
+    if data is None or data.empty:
+        return {}
+    if not isinstance(data.columns, pd.MultiIndex):
+        return {tickers[0]: data}
+    out = {}
+    for t in tickers:
+        if t in data.columns.get_level_values(0):
+            df = data[t].dropna(how="all")
+            if not df.empty:
+                out[t] = df
+    return out
+
+_store = OHLCVStore(_fetch_yf, bulk_fetch_fn=_fetch_yf_many,
+                    root=os.path.join(STORE_DIR, f"sim-{MARKET_SIM_SEED}") if MARKET_SIM_SEED else STORE_DIR)
+_forecast_cache = ForecastCache()
+_warm_store = WarmStartStore()
+
+def _download_yf(ticker: str, lookback_days=365):
+    return _store.history(ticker, lookback_days)
+
+def download_panel(tickers, lookback_days=365) -> pd.DataFrame:
+    """Whole-universe history in one batched download: dates x (field, ticker) columns."""
+    return _store.panel(tickers, lookback_days)
+
 def get_quote(ticker: str) -> dict:
     df = _download_yf(ticker, 30)
     if df.empty:
@@ -51,37 +96,17 @@ def get_quote(ticker: str) -> dict:
     pct = (change / float(prev["Close"])) * 100 if prev["Close"] else 0.0
     return {"ok": True, "ticker": ticker, "price": round(price, 4), "day_change_pct": round(pct, 3)}
 
-def forecast(ticker: str, horizon: str = "7d") -> dict:
-    try:
-        from prophet import Prophet
-    except Exception as e:
-        return {"ok": False, "error": f"Prophet not installed: {e}"}
-
-    days = _horizon_days(horizon)
-    hist = _download_yf(ticker, 500)
-    if hist.empty or "Close" not in hist.columns:
-        return {"ok": False, "error": f"No historical data for {ticker}"}
+def _forecast_key(ticker: str, hist: pd.DataFrame, days: int, precision: str) -> tuple:
+    last = hist.iloc[-1]
+    return _forecast_cache.make_key(ticker, last["Date"], last_close=float(last["Close"]),
+                                    horizon_days=days, precision=precision, **PROPHET_PARAMS)
 
-    df = hist[["Date", "Close"]].rename(columns={"Date": "ds", "Close": "y"})
-    model = Prophet(daily_seasonality=True, weekly_seasonality=True)
-    model.fit(df)
-    future = model.make_future_dataframe(periods=days)
-    fc = model.predict(future).tail(days)[["ds", "yhat", "yhat_lower", "yhat_upper"]]
-
-    current = float(df["y"].iloc[-1])
+def _summarize_forecast(ticker: str, current: float, fc: pd.DataFrame, days: int) -> dict:
     mean_pred = float(fc["yhat"].mean())
     expected_return_pct = (mean_pred - current) / current * 100.0
 
-    up_probs = []
-    for _, row in fc.iterrows():
-        low = float(row["yhat_lower"]); mid = float(row["yhat"]); high = float(row["yhat_upper"])
-        p = 0.5
-        if mid > current: p += 0.2
-        if low > current * 0.995: p += 0.2
-        if high > current * 1.01: p += 0.1
-        p = max(0.0, min(1.0, p))
-        up_probs.append(p)
-    prob_up = sum(up_probs)/len(up_probs)
+    prob_up = float(prob_up_from_bands(current, fc["yhat"].to_numpy(), fc["yhat_lower"].to_numpy(),
+                                       fc["yhat_upper"].to_numpy()))
 
     fc = fc.rename(columns={"ds": "date", "yhat": "pred", "yhat_lower": "lower", "yhat_upper": "upper"})
     fc["date"] = fc["date"].dt.strftime("%Y-%m-%d")
@@ -96,27 +121,209 @@ def forecast(ticker: str, horizon: str = "7d") -> dict:
         "forecast": fc.to_dict(orient="records"),
     }
 
-def news_sentiment(ticker_or_query: str, limit: int = 10) -> dict:
+def _use_fallback(latency_budget_ms) -> bool:
+    return latency_budget_ms is not None and latency_budget_ms < PROPHET_MIN_BUDGET_MS
+
+def _predict(model, df: pd.DataFrame, days: int, precision: str) -> pd.DataFrame:
+    future = model.make_future_dataframe(periods=days)
+    if precision != "analytic":
+        return model.predict(future.tail(days))[["ds", "yhat", "yhat_lower", "yhat_upper"]]
+    # No posterior sampling: bands from the in-sample residual scale.
+    pred = model.predict(future)[["ds", "yhat"]]
+    resid = df["y"].to_numpy() - pred["yhat"].to_numpy()[:len(df)]
+    band = Z_INTERVAL * float(resid.std(ddof=1))
+    pred = pred.tail(days).copy()
+    pred["yhat_lower"] = pred["yhat"] - band
+    pred["yhat_upper"] = pred["yhat"] + band
+    return pred
+
+def forecast_multi(ticker: str, horizons=("1d", "7d", "30d"), hist: pd.DataFrame = None,
+                   latency_budget_ms: float = None, precision: str = None) -> dict:
+    """Fit Prophet once, predict out to the longest horizon and slice it per horizon.
+    Returns {horizon: result} with each result shaped like `forecast`.
+    Uses the NumPy fallback forecaster when Prophet is missing or the latency budget
+    is below PROPHET_MIN_BUDGET_MS.
+    precision: "full" (Prophet's default sampling), "reduced" (fewer samples) or
+    "analytic" (no sampling, residual-based bands); default FORECAST_PRECISION."""
+    horizons = list(horizons)
+    precision = precision or FORECAST_PRECISION
+    if precision not in PRECISION_SAMPLES:
+        return {h: {"ok": False, "error": f"Unknown precision mode: {precision}"} for h in horizons}
+    try:
+        from prophet import Prophet
+    except Exception:
+        Prophet = None
+
+    if hist is None:
+        hist = _download_yf(ticker, 500)
+    if hist.empty or "Close" not in hist.columns:
+        return {h: {"ok": False, "error": f"No historical data for {ticker}"} for h in horizons}
+
+    if Prophet is None or _use_fallback(latency_budget_ms):
+        from modules.forecast_fallback import forecast_from_history
+        return {h: forecast_from_history(ticker, hist, h) for h in horizons}
+
+    results, pending = {}, {}
+    for h in horizons:
+        days = _horizon_days(h)
+        key = _forecast_key(ticker, hist, days, precision)
+        cached = _forecast_cache.get(key)
+        if cached is not None:
+            results[h] = cached
+        else:
+            pending[h] = (days, key)
+
+    if pending:
+        max_days = max(days for days, _ in pending.values())
+        df = hist[["Date", "Close"]].rename(columns={"Date": "ds", "Close": "y"})
+        model = fit_prophet(lambda: Prophet(uncertainty_samples=PRECISION_SAMPLES[precision], **PROPHET_PARAMS),
+                            df, ticker, _warm_store)
+        pred = _predict(model, df, max_days, precision)
+        current = float(df["y"].iloc[-1])
+        for h, (days, key) in pending.items():
+            results[h] = _summarize_forecast(ticker, current, pred.head(days), days)
+            _forecast_cache.put(key, results[h])
+
+    return {h: dict(results[h]) for h in horizons}
+
+def forecast(ticker: str, horizon: str = "7d", hist: pd.DataFrame = None, latency_budget_ms: float = None,
+             precision: str = None) -> dict:
+    return forecast_multi(ticker, [horizon], hist=hist, latency_budget_ms=latency_budget_ms,
+                          precision=precision)[horizon]
+
+def forecast_cache_stats() -> dict:
+    return _forecast_cache.stats()
+
+def _news_url(ticker_or_query: str, limit: int) -> str:
+    return f"{POLYGON_BASE_URL}/v2/reference/news?ticker={ticker_or_query.upper()}&limit={limit}&apiKey={POLYGON_API_KEY}"
+
+def _news_result(ticker_or_query: str, payload) -> dict:
     results = []
+    for item in payload or []:
+        title = item.get("title", "")
+        score = analyzer.polarity_scores(title)["compound"]
+        results.append({"title": title, "url": item.get("article_url"), "sentiment": round(score, 3)})
+    avg = round(sum(x["sentiment"] for x in results)/len(results), 3) if results else None
+    return {"ok": True, "query": ticker_or_query, "avg_sentiment": avg, "items": results}
+
+def news_sentiment(ticker_or_query: str, limit: int = 10) -> dict:
+    payload = []
     if POLYGON_API_KEY:
-        url = f"https://api.polygon.io/v2/reference/news?ticker={ticker_or_query.upper()}&limit={limit}&apiKey={POLYGON_API_KEY}"
         try:
-            r = requests.get(url, timeout=20)
+            r = http_client.get(_news_url(ticker_or_query, limit))
             if r.status_code == 200:
                 payload = r.json().get("results", [])
-                for item in payload:
-                    title = item.get("title", "")
-                    score = analyzer.polarity_scores(title)["compound"]
-                    results.append({"title": title, "url": item.get("article_url"), "sentiment": round(score, 3)})
         except Exception:
             pass
-    avg = round(sum(x["sentiment"] for x in results)/len(results), 3) if results else None
-    return {"ok": True, "query": ticker_or_query, "avg_sentiment": avg, "items": results}
+    return _news_result(ticker_or_query, payload)
 
-def screen_top_movers(tickers, horizon: str = "7d"):
-    rows = []
+def news_sentiment_many(tickers, limit: int = 10) -> dict:
+    """news_sentiment for several tickers, fetched concurrently: {ticker: result}."""
+    tickers = list(tickers)
+    pages = http_client.fetch_all([_news_url(t, limit) for t in tickers]) if POLYGON_API_KEY else [{}] * len(tickers)
+    return {t: _news_result(t, p.get("results", []) if isinstance(p, dict) else [])
+            for t, p in zip(tickers, pages)}
+
+def _warm_worker():
+    # Import Prophet and load its cmdstan backend once per worker instead of once per ticker.
+    try:
+        from prophet import Prophet
+        Prophet()
+    except Exception:
+        pass
+
+_pool = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+def _screen_pool(workers: int) -> ProcessPoolExecutor:
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                                        initializer=_warm_worker)
+            _pool_workers = workers
+        return _pool
+
+def _discard_pool():
+    # A running future cannot be cancelled: terminate the workers, or a stuck fit keeps
+    # running (and holding its CPU) after the pool is dropped.
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is None:
+        return
+    if hasattr(pool, "terminate_workers"):  # Python 3.14+
+        pool.terminate_workers()
+        return
+    # The broken pool fails the futures still queued; cancelling them as well trips up
+    # its management thread (InvalidStateError), so they are left alone.
+    for proc in list((getattr(pool, "_processes", None) or {}).values()):
+        if proc.is_alive():
+            proc.terminate()
+    pool.shutdown(wait=False)
+
+def _forecast_parallel(tickers, horizon, panel, workers, timeout, precision):
+    pool = _screen_pool(workers)
+    # One deadline for the whole screen, not `timeout` per ticker in turn.
+    deadline = time.monotonic() + timeout
+    days = _horizon_days(horizon)
+    futures, keys = [], []
     for t in tickers:
-        fc = forecast(t, horizon)
+        hist = panel_ticker(panel, t)
+        key = _forecast_key(t, hist, days, precision) if not hist.empty and "Close" in hist.columns else None
+        cached = _forecast_cache.get(key) if key is not None else None
+        futures.append(cached if cached is not None else
+                       pool.submit(forecast, t, horizon, hist, None, precision))
+        keys.append(key)
+    done, pending = wait([f for f in futures if not isinstance(f, dict)],
+                         timeout=max(0.0, deadline - time.monotonic()))
+    results, timed_out = [], bool(pending)
+    for fut, key in zip(futures, keys):
+        if isinstance(fut, dict):
+            results.append(dict(fut))
+            continue
+        if fut not in done:
+            results.append({"ok": False, "error": f"Forecast timed out after {timeout}s"})
+            continue
+        try:
+            res = fut.result()
+            if res.get("ok") and key is not None:
+                _forecast_cache.put(key, res)
+            results.append(res)
+        except Exception as e:
+            results.append({"ok": False, "error": str(e)})
+    if timed_out:
+        # A stuck fit keeps its worker busy; start the next screen on a fresh pool.
+        _discard_pool()
+    return results
+
+def screen_top_movers(tickers, horizon: str = "7d", workers: int = None, timeout: float = None,
+                      latency_budget_ms: float = None, precision: str = None):
+    """Forecast each ticker and rank by expected return.
+    workers > 1 spreads the Prophet fits over a process pool (default SCREEN_WORKERS);
+    timeout caps the wait for the whole screen in that mode (default SCREEN_TIMEOUT_SECONDS);
+    fits still running then are abandoned and their workers terminated.
+    A latency budget below PROPHET_MIN_BUDGET_MS screens the whole panel with the
+    NumPy fallback forecaster in one pass instead. precision defaults to SCREEN_PRECISION."""
+    workers = SCREEN_WORKERS if workers is None else workers
+    timeout = SCREEN_TIMEOUT if timeout is None else timeout
+    precision = precision or SCREEN_PRECISION
+    tickers = list(tickers)
+    rows = []
+    panel = download_panel(tickers, 500)
+    if _use_fallback(latency_budget_ms):
+        from modules.forecast_fallback import forecast_batch
+        closes = panel["Close"] if not panel.empty else pd.DataFrame(columns=tickers)
+        batch = forecast_batch(closes, horizon)
+        results = [batch.get(t, {"ok": False}) for t in tickers]
+    elif workers > 1 and len(tickers) > 1:
+        results = _forecast_parallel(tickers, horizon, panel, workers, timeout, precision)
+    else:
+        results = [forecast(t, horizon, hist=panel_ticker(panel, t), precision=precision) for t in tickers]
+    for t, fc in zip(tickers, results):
         if fc.get("ok"):
             rows.append({
                 "Ticker": t,